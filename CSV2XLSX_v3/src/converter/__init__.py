@@ -6,11 +6,21 @@ CSV2XLSX 変換エンジンパッケージ
 - csv_to_excel: CSV → Excel変換エンジン
 - excel_to_csv: Excel → CSV変換エンジン
 - csv_encoding: CSV → CSV エンコーディング変換エンジン
+- context: 変換ジョブのコンテキスト（検出結果・キャンセル要求・進捗の通知先）
 - encoding: エンコーディング検出
+- probe: エンコーディング・区切り文字などの一括検出（ファイルプローブ）
 - data_types: データ型推論
 - styles: Excelスタイル適用
+- xlsx_writer: 定数メモリのストリーミングXLSXライター
+- xlsx_reader: XLSXブックのメタデータ（シート構成）読み取り
 """
 
+from .context import (
+    CancelToken,
+    ConversionCancelledError,
+    ConversionContext,
+    ProgressSink,
+)
 from .csv_encoding import CSVEncodingConverter
 from .csv_to_excel import CSVConverter
 from .excel_to_csv import ExcelToCSVConverter
@@ -19,4 +29,8 @@ __all__ = [
     "CSVConverter",
     "ExcelToCSVConverter",
     "CSVEncodingConverter",
+    "CancelToken",
+    "ConversionCancelledError",
+    "ConversionContext",
+    "ProgressSink",
 ]
@@ -0,0 +1,97 @@
+"""
+変換ジョブのコンテキスト
+1回の変換に必要な状態（検出結果・キャンセル要求・進捗の通知先）をまとめる
+
+変換エンジンはジョブごとの状態をインスタンスに持たず、このコンテキストと
+メソッドの引数（出力先・スタイル・出力エンコーディングなどの設定）だけで
+変換する。そのため1つのエンジンを複数のスレッドや asyncio のタスク
+（asyncio.to_thread 経由）から同時に使える。
+"""
+
+from dataclasses import dataclass, field
+import threading
+from typing import Any, Callable, Optional
+
+from .data_types import TableSchema
+from .probe import FileProbe
+from .xlsx_reader import XlsxProbe
+
+
+class ConversionCancelledError(Exception):
+    """変換がキャンセルされた"""
+
+
+class CancelToken:
+    """
+    変換のキャンセル要求
+
+    スレッドセーフ。呼び出し側が cancel() し、変換エンジンが処理の区切り
+    （チャンク・一定行数ごと）で確認する。プロセスプールのワーカーと共有する
+    場合は multiprocessing.Event を渡して作成し、ワーカーの初期化時に渡す。
+    """
+
+    def __init__(self, event: Optional[Any] = None):
+        """
+        Args:
+            event: キャンセル要求を保持するイベント（省略時は threading.Event）
+        """
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        """キャンセルを要求"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        キャンセルが要求されていれば例外を送出
+
+        Raises:
+            ConversionCancelledError: キャンセルが要求された場合
+        """
+        if self._event.is_set():
+            raise ConversionCancelledError("Conversion cancelled")
+
+
+@dataclass(frozen=True)
+class ProgressSink:
+    """進捗の通知先"""
+
+    file_progress: Optional[Callable[[int], None]] = None  # ファイル単位 (0-100%)
+    row_progress: Optional[Callable[[int, int], None]] = (
+        None  # 行単位 (current_row, total_rows)
+    )
+
+    def file(self, percent: int) -> None:
+        if self.file_progress:
+            self.file_progress(percent)
+
+    def rows(self, current_row: int, total_rows: int) -> None:
+        if self.row_progress:
+            self.row_progress(current_row, total_rows)
+
+
+@dataclass(frozen=True)
+class ConversionContext:
+    """変換ジョブのコンテキスト（不変）"""
+
+    probe: Optional[FileProbe] = None  # CSVの検出結果（省略時は変換時にプローブ）
+    schema: Optional[TableSchema] = None  # 前回の変換で確定した列の型
+    xlsx_probe: Optional[XlsxProbe] = None  # Excel（xlsx）のシート構成と大きさ
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+    progress: ProgressSink = ProgressSink()
+
+    @classmethod
+    def create(
+        cls,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        row_progress_callback: Optional[Callable[[int, int], None]] = None,
+        **kwargs,
+    ) -> "ConversionContext":
+        """コールバックからコンテキストを作成（変換エンジンの従来の引数用）"""
+        return cls(
+            progress=ProgressSink(progress_callback, row_progress_callback), **kwargs
+        )
@@ -1,111 +1,136 @@
 """
 CSV→CSV エンコーディング変換モジュール
 Shift_JIS ⇔ UTF-8 変換をサポート
+
+CSVを解析せずにバイト列のまま文字コードだけを変換するため、
+区切り文字・引用符・改行コード・先頭のゼロや数値の表記は入力のまま保たれる。
+ジョブごとの状態はインスタンスに持たないため、1つのインスタンスを
+複数のスレッドから同時に使える（context.ConversionContext を参照）。
+キャンセル要求はブロック（4MB）ごとに確認し、キャンセルされた場合は
+書きかけの出力を残さない。
 """
 
 import logging
 from pathlib import Path
+from typing import Callable, Optional
 
-import pandas as pd
-
-from .encoding import detect_delimiter, detect_encoding
+from .context import ConversionCancelledError, ConversionContext
+from .probe import FileProbe, probe_file
+from .transcode import transcode_file
 
 logger = logging.getLogger(__name__)
 
 
 class CSVEncodingConverter:
-    """CSV エンコーディング変換クラス"""
+    """
+    CSV エンコーディング変換クラス
 
+    既定では1プロセスで変換する。大きなファイル（transcode.PARALLEL_MIN_SIZE 以上）を
+    並列に変換する場合は、呼び出し側が max_workers でプロセス数を指定する。
+    """
+
+    # Shift_JIS系はcp932で出力する（①や髙などのWindows機種依存文字対応）
     SUPPORTED_ENCODINGS = {
-        "shift_jis": "shift_jis",
-        "sjis": "shift_jis",
-        "cp932": "shift_jis",
+        "shift_jis": "cp932",
+        "sjis": "cp932",
+        "cp932": "cp932",
         "utf-8": "utf-8",
         "utf8": "utf-8",
     }
 
+    def __init__(self, max_workers: Optional[int] = 1):
+        """
+        Args:
+            max_workers: 大きなファイルを並列に変換するプロセス数
+                （既定の1なら並列化しない、NoneならCPUコア数）
+        """
+        self.max_workers = max_workers
+
     def convert_encoding(
         self,
         input_path: Path,
         output_path: Path,
         output_encoding: str = "utf-8",
         add_bom: bool = True,
+        probe: Optional[FileProbe] = None,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        row_progress_callback: Optional[Callable[[int, int], None]] = None,
+        context: Optional[ConversionContext] = None,
+        max_workers: Optional[int] = None,
     ) -> bool:
         """
         CSVファイルのエンコーディングを変換
 
+        context を渡した場合、検出結果・進捗の通知先は context のものを使う
+        （probe・コールバックの引数は使わない）。
+
         Args:
             input_path: 入力CSVパス
             output_path: 出力CSVパス
             output_encoding: 出力エンコーディング ('utf-8' or 'shift_jis')
             add_bom: UTF-8の場合にBOM付与（デフォルト: True）
+            probe: 検出済みのプローブ結果（省略時はここでプローブする）
+            progress_callback: ファイル単位進捗コールバック (0-100%)
+            row_progress_callback: 行単位進捗コールバック (current_row, total_rows)
+                行数は処理済みバイト数とプローブの行数から求める
+            context: 変換ジョブのコンテキスト
+            max_workers: 大きなファイルを並列に変換するプロセス数
+                （省略時はインスタンスの max_workers）
 
         Returns:
             変換成功ならTrue
         """
+        context = context or ConversionContext.create(
+            progress_callback, row_progress_callback, probe=probe
+        )
+        progress = context.progress
         try:
-            # 入力エンコーディング自動検出
-            input_encoding = detect_encoding(input_path)
-            logger.info(f"Input encoding: {input_encoding}")
-
-            # 区切り文字検出
-            delimiter = detect_delimiter(input_path, input_encoding)
+            context.cancel_token.raise_if_cancelled()
 
-            # CSVを読み込み
-            df = pd.read_csv(input_path, encoding=input_encoding, delimiter=delimiter)
-
-            # 改行コード検出（入力ファイルと同じものを使用）
-            line_terminator = self._detect_line_terminator(input_path, input_encoding)
+            # 入力エンコーディングはプローブで検出
+            probe = context.probe or probe_file(input_path)
+            input_encoding = probe.encoding
+            logger.info(f"Input encoding: {input_encoding}")
 
             # 出力エンコーディングの正規化
             normalized_encoding = self.SUPPORTED_ENCODINGS.get(
                 output_encoding.lower(), "utf-8"
             )
-
-            # UTF-8 BOM付与の処理
             if normalized_encoding == "utf-8" and add_bom:
-                # UTF-8 with BOM
-                with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
-                    df.to_csv(f, index=False, line_terminator=line_terminator)
-            else:
-                # その他のエンコーディング
-                df.to_csv(
-                    output_path,
-                    index=False,
-                    encoding=normalized_encoding,
-                    line_terminator=line_terminator,
-                )
+                normalized_encoding = "utf-8-sig"  # UTF-8 with BOM
+
+            progress.file(10)
+
+            total_rows = max(probe.estimated_rows, 1)
+
+            def on_progress(done: int, total: int) -> None:
+                context.cancel_token.raise_if_cancelled()
+                fraction = done / total if total else 1.0
+                progress.file(10 + int(fraction * 80))
+                progress.rows(int(fraction * total_rows), total_rows)
+
+            transcode_file(
+                input_path,
+                output_path,
+                input_encoding,
+                normalized_encoding,
+                progress_callback=on_progress,
+                max_workers=max_workers or self.max_workers,
+                cancel_token=context.cancel_token,
+            )
+
+            progress.file(100)
 
             logger.info(
                 f"Encoding conversion successful: {input_encoding} → {normalized_encoding}"
             )
             return True
 
+        except ConversionCancelledError:
+            logger.info(f"Encoding conversion cancelled: {input_path}")
+            output_path.unlink(missing_ok=True)
+            return False
         except Exception as e:
             logger.error(f"Encoding conversion failed: {e}")
+            output_path.unlink(missing_ok=True)
             return False
-
-    @staticmethod
-    def _detect_line_terminator(file_path: Path, encoding: str) -> str:
-        """
-        改行コードを検出
-
-        Args:
-            file_path: ファイルパス
-            encoding: エンコーディング
-
-        Returns:
-            検出された改行コード ('\\r\\n' or '\\n')
-        """
-        try:
-            with open(file_path, "rb") as f:
-                sample = f.read(1024)
-
-            if b"\r\n" in sample:
-                return "\r\n"  # CRLF (Windows)
-            if b"\n" in sample:
-                return "\n"  # LF (Unix/Mac)
-            return "\n"  # デフォルト
-        except Exception as e:
-            logger.warning(f"Line terminator detection failed: {e}, using default LF")
-            return "\n"
@@ -1,6 +1,13 @@
 """
 CSV → Excel 変換エンジン
 高性能なCSV to Excel変換機能を提供
+
+ファイルサイズに関わらず、同じチャンク単位のストリーミング処理
+（検出 → 型推論 → 書き込み・スタイル適用）で変換する。
+ジョブごとの状態はインスタンスに持たないため、1つのインスタンスを
+複数のスレッドから同時に使える（context.ConversionContext を参照）。
+キャンセル要求は進捗の更新と同じ間隔（500行または100msごと）で確認し、
+キャンセルされた場合は書きかけの出力を残さない。
 """
 
 import logging
@@ -8,12 +15,27 @@ from pathlib import Path
 import time
 from typing import Any, Callable, Optional
 
-from openpyxl import Workbook
 import pandas as pd
 
-from .data_types import infer_data_types
-from .encoding import detect_delimiter, detect_encoding
-from .styles import apply_styles
+from .context import ConversionCancelledError, ConversionContext
+from .data_types import (
+    TableSchema,
+    apply_schema,
+    find_schema_file,
+    infer_schema,
+    load_schema,
+)
+from .metadata_cache import MetadataCache
+from .probe import FileProbe, probe_file
+from .row_counter import BackgroundRowCounter
+from .styles import (
+    StylePlan,
+    build_style_plan,
+    column_display_widths,
+    display_width,
+    excel_column_width,
+)
+from .xlsx_writer import StreamingXlsxWriter
 
 logger = logging.getLogger(__name__)
 
@@ -21,36 +43,26 @@ logger = logging.getLogger(__name__)
 class CSVConverter:
     """CSV→Excel変換エンジン"""
 
-    def __init__(self):
-        self.encoding: Optional[str] = None
-        self.delimiter: str = ","
-        self.has_header: bool = True
+    def __init__(self, metadata_cache: Optional[MetadataCache] = None):
+        """
+        Args:
+            metadata_cache: 検出結果・行数・スキーマのキャッシュ（省略時は使わない）
+        """
+        self.metadata_cache = metadata_cache
         self.chunk_size: int = 10000  # 大容量ファイル対応
         # 行単位進捗更新の制御（大容量ファイル向けに最適化）
         self.row_update_interval: int = 500  # 500行ごと（進捗表示改善）
         self.time_update_interval: float = 0.1  # 100ms間隔（体感速度向上）
 
-    def _estimate_total_rows(self, csv_path: Path) -> int:
-        """
-        CSVファイルの総行数を高速推定
-
-        Args:
-            csv_path: CSVファイルパス
-
-        Returns:
-            推定行数
-        """
-        try:
-            file_size = csv_path.stat().st_size
-            # 1行あたり平均100バイトと仮定（ヘッダー含む）
-            estimated_rows = max(file_size // 100, 100)
-            logger.debug(
-                f"Estimated rows: {estimated_rows:,} (file size: {file_size:,} bytes)"
-            )
-            return estimated_rows
-        except Exception as e:
-            logger.warning(f"Failed to estimate rows: {e}")
-            return 10000  # フォールバック値
+    @staticmethod
+    def _resolve_total_rows(
+        counter: Optional[BackgroundRowCounter], total_rows: int, processed_rows: int
+    ) -> int:
+        """正確な行数が得られていればそれを、なければ推定値を返す（処理済み行数以上）"""
+        counted = counter.result if counter else None
+        if counted is not None:
+            total_rows = counted
+        return max(total_rows, processed_rows)
 
     def convert_to_excel(
         self,
@@ -59,221 +71,212 @@ class CSVConverter:
         progress_callback: Optional[Callable[[int], None]] = None,
         row_progress_callback: Optional[Callable[[int, int], None]] = None,
         style_options: Optional[dict[str, Any]] = None,
+        schema_path: Optional[Path] = None,
+        probe: Optional[FileProbe] = None,
+        schema: Optional[TableSchema] = None,
+        context: Optional[ConversionContext] = None,
     ) -> bool:
         """
         CSVファイルをExcelに変換
 
+        context を渡した場合、検出結果・スキーマ・進捗の通知先は context のものを
+        使う（probe・schema・コールバックの引数は使わない）。
+
         Args:
             csv_path: 入力CSVファイルパス
             excel_path: 出力Excelファイルパス
             progress_callback: ファイル単位進捗コールバック (0-100%)
             row_progress_callback: 行単位進捗コールバック (current_row, total_rows)
             style_options: スタイル設定オプション
+            schema_path: スキーマファイル（省略時はCSVと同じ場所の
+                <名前>.schema.json / .schema.toml を使用）
+            probe: 検出済みのプローブ結果（省略時はここでプローブする）
+            schema: 前回の変換で確定したスキーマ（スキーマファイルがあればそちらを優先）
+            context: 変換ジョブのコンテキスト
 
         Returns:
             変換成功可否
         """
+        context = context or ConversionContext.create(
+            progress_callback, row_progress_callback, probe=probe, schema=schema
+        )
+        probe, schema = context.probe, context.schema
         try:
             logger.info(f"Converting {csv_path} to {excel_path}")
+            context.cancel_token.raise_if_cancelled()
 
-            # エンコーディングと区切り文字の検出
-            self.encoding = detect_encoding(csv_path)
-            self.delimiter = detect_delimiter(csv_path, self.encoding)
-
-            if progress_callback:
-                progress_callback(10)
-
-            # ファイルサイズをチェックして処理方法を決定
-            file_size = csv_path.stat().st_size
-            if file_size > 50 * 1024 * 1024:  # 50MB以上
-                return self._convert_large_file(
-                    csv_path,
-                    excel_path,
-                    progress_callback,
-                    row_progress_callback,
-                    style_options,
-                )
-            return self._convert_standard_file(
-                csv_path,
-                excel_path,
-                progress_callback,
-                row_progress_callback,
-                style_options,
-            )
-
-        except Exception as e:
-            logger.error(f"Conversion failed: {e}")
-            return False
-
-    def _convert_standard_file(
-        self,
-        csv_path: Path,
-        excel_path: Path,
-        progress_callback: Optional[Callable[[int], None]] = None,
-        row_progress_callback: Optional[Callable[[int, int], None]] = None,
-        style_options: Optional[dict[str, Any]] = None,
-    ) -> bool:
-        """標準サイズファイルの変換"""
-        try:
-            # CSV読み込み
-            df = pd.read_csv(
-                csv_path,
-                encoding=self.encoding,
-                sep=self.delimiter,
-                dtype=str,  # データ型を保持
+            # 前回の変換結果がキャッシュにあれば、検出・行数カウント・型推論を省略する
+            cached = (
+                self.metadata_cache.get(csv_path)
+                if self.metadata_cache is not None and (probe is None or schema is None)
+                else None
             )
+            if cached:
+                probe = cached.probe
+                schema = schema or cached.schema
 
-            total_rows = len(df)
-            if row_progress_callback:
-                row_progress_callback(0, total_rows)
-
-            if progress_callback:
-                progress_callback(50)
-
-            # データ型の自動推定
-            df = infer_data_types(df)
-
-            if progress_callback:
-                progress_callback(70)
-
-            # Excel書き込み
-            with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-                df.to_excel(writer, index=False, sheet_name="Sheet1")
+            # 型が既知のファイルはスキーマファイルで型推論を省略する
+            schema_path = schema_path or find_schema_file(csv_path)
+            known_schema = load_schema(schema_path) if schema_path else schema
 
-                # スタイル適用
-                if style_options:
-                    worksheet = writer.sheets["Sheet1"]
-                    apply_styles(worksheet, df, style_options)
+            # エンコーディング・区切り文字などは一度のプローブで検出する
+            probe = probe or probe_file(csv_path)
 
-            if row_progress_callback:
-                row_progress_callback(total_rows, total_rows)
+            context.progress.file(10)
 
-            if progress_callback:
-                progress_callback(100)
-
-            logger.info(f"Successfully converted {total_rows} rows to Excel")
-            return True
+            return self._convert_stream(
+                csv_path, excel_path, probe, context, style_options, known_schema
+            )
 
+        except ConversionCancelledError:
+            logger.info(f"Conversion cancelled: {csv_path}")
+            return False
         except Exception as e:
-            logger.error(f"Standard file conversion failed: {e}")
+            logger.error(f"Conversion failed: {e}")
             return False
 
-    def _convert_large_file(
+    def _convert_stream(
         self,
         csv_path: Path,
         excel_path: Path,
-        progress_callback: Optional[Callable[[int], None]] = None,
-        row_progress_callback: Optional[Callable[[int, int], None]] = None,
+        probe: FileProbe,
+        context: ConversionContext,
         style_options: Optional[dict[str, Any]] = None,
+        known_schema: Optional[TableSchema] = None,
     ) -> bool:
-        """大容量ファイルのチャンク処理変換"""
-        try:
-            logger.info("Processing large file with chunking")
-
-            # 総行数を推定
-            estimated_total_rows = self._estimate_total_rows(csv_path)
+        """
+        チャンク単位のストリーミング変換
 
-            # Excelワークブック作成
-            workbook = Workbook()
-            worksheet = workbook.active
-            worksheet.title = "Sheet1"
+        先頭チャンクで型を推定し、以降のチャンクにも同じ型を適用する。
+        known_schema の列は読み込み時にその型で変換され、推論の対象外となる。
+        スタイルは先頭チャンクの時点でスタイル計画として確定し、行の書き込みと
+        同時に適用するため、メモリ使用量はチャンクサイズで頭打ちになる。
+        """
+        row_counter: Optional[BackgroundRowCounter] = None
+        try:
+            # 正確な行数はバックグラウンドで数え、それまでは推定値を使う
+            # （ファイル全体をプローブで読めた場合は数え済み）
+            progress = context.progress
+            cancel_token = context.cancel_token
+            if not probe.rows_exact:
+                row_counter = BackgroundRowCounter(
+                    csv_path, probe.encoding, probe.quotechar
+                ).start()
+            total_rows = max(probe.estimated_rows, 1)
 
-            row_num = 1
             processed_rows = 0
             last_update_time = time.time()
-            inferred_dtypes = None  # 型推論結果を保持
-
-            # チャンク単位で処理
-            for chunk_num, chunk in enumerate(
-                pd.read_csv(
-                    csv_path,
-                    encoding=self.encoding,
-                    sep=self.delimiter,
-                    dtype=str,
-                    chunksize=self.chunk_size,
-                )
-            ):
-                # データ型推定（最初のチャンクのみ）
-                if chunk_num == 0:
-                    chunk = infer_data_types(chunk)
-                    # 型情報を保存して以降のチャンクで再利用
-                    inferred_dtypes = {col: chunk[col].dtype for col in chunk.columns}
-                elif inferred_dtypes:
-                    # 2チャンク目以降は保存した型情報を適用（型推論スキップ）
-                    try:
-                        for col, dtype in inferred_dtypes.items():
-                            if col in chunk.columns and dtype != "object":
-                                chunk[col] = pd.to_numeric(chunk[col], errors="ignore")
-                    except Exception as e:
-                        logger.debug(f"型適用スキップ（チャンク{chunk_num}）: {e}")
-
-                # 最初のチャンクでヘッダーを追加
-                if chunk_num == 0:
-                    # ヘッダー行をappendで追加（高速化）
-                    worksheet.append(list(chunk.columns))
-                    row_num += 1
-
-                # データ行を一括書き込み（.append()による高速化）
-                for row_values in chunk.to_numpy():
-                    # append()は行全体を一度に追加（.cell()より3-5倍高速）
-                    worksheet.append(list(row_values))
-                    processed_rows += 1
-
-                    # ハイブリッド更新: 500行ごと または 100ms間隔
-                    current_time = time.time()
-                    should_update = (
-                        processed_rows % self.row_update_interval == 0
-                    ) or (current_time - last_update_time >= self.time_update_interval)
-
-                    if should_update and row_progress_callback:
-                        row_progress_callback(processed_rows, estimated_total_rows)
-                        last_update_time = current_time
-
-                # ファイル単位進捗更新（チャンク完了時）
-                if progress_callback:
-                    progress = min(
-                        90, int((processed_rows / estimated_total_rows) * 90)
-                    )
-                    progress_callback(progress)
-
-            # スタイル適用（大容量ファイルでは簡略化）
-            if style_options:
-                # 大容量ファイル判定: 50,000行以上は簡略化モード
-                is_large_file = processed_rows > 50000
-                if is_large_file:
-                    logger.info(
-                        f"Large file detected ({processed_rows:,} rows), using simplified styling"
-                    )
-
-                # 大容量ファイル処理ではDataFrameを作成して日付検出
-                temp_df = None
-                if processed_rows > 0:
-                    # サンプルデータで日付列を検出
-                    sample_chunk = pd.read_csv(
+            schema = TableSchema()
+            read_options = (
+                known_schema.read_csv_options() if known_schema else {"dtype": str}
+            )
+            plan = StylePlan()
+            auto_width = bool(style_options and style_options.get("auto_width"))
+            column_widths: list[int] = []
+
+            with StreamingXlsxWriter(
+                excel_path, sheet_name="Sheet1", cancel_token=cancel_token
+            ) as xlsx:
+                for chunk_num, chunk in enumerate(
+                    pd.read_csv(
                         csv_path,
-                        encoding=self.encoding,
-                        sep=self.delimiter,
-                        dtype=str,
-                        nrows=100,  # サンプルとして100行だけ読み込み
+                        encoding=probe.encoding,
+                        sep=probe.delimiter,
+                        quotechar=probe.quotechar,
+                        chunksize=self.chunk_size,
+                        **read_options,
                     )
-                    temp_df = infer_data_types(sample_chunk)
-                apply_styles(
-                    worksheet, temp_df, style_options, is_large_file=is_large_file
-                )
-
-            # ファイル保存
-            workbook.save(excel_path)
+                ):
+                    if chunk_num == 0:
+                        # スキーマは先頭チャンクのサンプルから確定する
+                        schema = infer_schema(chunk, known=known_schema)
+                        header = list(chunk.columns)
+                        plan = build_style_plan(
+                            xlsx,
+                            style_options,
+                            [column.is_datetime for column in schema.columns],
+                            header=header,
+                            number_formats=[
+                                column.number_format for column in schema.columns
+                            ],
+                        )
+                        xlsx.append_row(
+                            header,
+                            styles=plan.header_style,
+                            height=plan.header_height,
+                        )
+                        if auto_width:
+                            column_widths = [
+                                display_width(str(name)) for name in header
+                            ]
+
+                    # 各チャンクを同じスキーマで変換（合わない値があれば型を広げる）
+                    chunk = apply_schema(chunk, schema)
+
+                    if auto_width:
+                        # 列幅はチャンク単位のベクトル演算で最大値を更新
+                        column_widths = [
+                            max(current, width)
+                            for current, width in zip(
+                                column_widths, column_display_widths(chunk)
+                            )
+                        ]
+
+                    for row_values in chunk.itertuples(index=False, name=None):
+                        processed_rows += 1
+                        # ヘッダーが1行目のため、データ行はprocessed_rows + 1行目
+                        xlsx.append_row(
+                            row_values, styles=plan.for_row(processed_rows + 1)
+                        )
+
+                        current_time = time.time()
+                        should_update = (
+                            processed_rows % self.row_update_interval == 0
+                        ) or (
+                            current_time - last_update_time >= self.time_update_interval
+                        )
+                        if should_update:
+                            cancel_token.raise_if_cancelled()
+                            if progress.row_progress:
+                                total_rows = self._resolve_total_rows(
+                                    row_counter, total_rows, processed_rows
+                                )
+                                progress.rows(processed_rows, total_rows)
+                            last_update_time = current_time
+
+                    # ファイル単位進捗更新（チャンク完了時）
+                    if progress.file_progress:
+                        total_rows = self._resolve_total_rows(
+                            row_counter, total_rows, processed_rows
+                        )
+                        progress.file(min(90, int((processed_rows / total_rows) * 90)))
+
+                plan.apply_to(xlsx)
+                if auto_width:
+                    xlsx.column_widths = {
+                        index: excel_column_width(width)
+                        for index, width in enumerate(column_widths, 1)
+                    }
 
             # 最終的な行数で更新（推定値を実際の値に補正）
-            if row_progress_callback:
-                row_progress_callback(processed_rows, processed_rows)
+            progress.rows(processed_rows, processed_rows)
+            progress.file(100)
 
-            if progress_callback:
-                progress_callback(100)
+            if self.metadata_cache is not None:
+                self.metadata_cache.put_result(csv_path, probe, processed_rows, schema)
 
-            logger.info(f"Successfully converted {processed_rows} rows (large file)")
+            logger.info(f"Successfully converted {processed_rows} rows to Excel")
             return True
 
+        except ConversionCancelledError:
+            logger.info(f"Conversion cancelled: {csv_path}")
+            excel_path.unlink(missing_ok=True)
+            return False
         except Exception as e:
-            logger.error(f"Large file conversion failed: {e}")
+            logger.error(f"Streaming conversion failed: {e}")
+            excel_path.unlink(missing_ok=True)
             return False
+        finally:
+            # 変換が終わったファイルの行数カウントは続けない
+            if row_counter is not None:
+                row_counter.stop()
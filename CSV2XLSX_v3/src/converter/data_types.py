@@ -1,14 +1,559 @@
 """
 データ型推論モジュール
-pandasデータフレームの列データ型を自動推定
+先頭の一部（サンプル）から列の型（スキーマ）を確定し、各チャンクをそのスキーマで変換する
+
+型は文字列・整数・小数・日時のいずれかで、後続のチャンクに型に合わない値が
+現れた場合は、その列の型を広げる（整数→小数→文字列、日時→文字列）。
+日時列は書式を明示した一括変換を行い、検出した書式は値の形ごとにキャッシュする。
+全角数字・和暦（令和5年4月1日）・年月日表記（2024年1月2日）は、
+NFKC正規化と元号表による一括変換で数値・日時として扱う。
+
+型が既知の定期ファイルは、CSVと同じ場所のスキーマファイル
+（<名前>.schema.json / <名前>.schema.toml）で型・日時書式・表示形式を指定でき、
+指定した列はCSV読み込み時に変換されるため型推論を行わない。
 """
 
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field, replace
+from enum import Enum
+import json
 import logging
+from pathlib import Path
+import threading
+from typing import Any, Callable, Optional
 
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10以前
+    tomllib = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+# スキーマファイルの拡張子（CSVの拡張子を置き換える）
+SCHEMA_FILE_SUFFIXES = (".schema.json", ".schema.toml")
+
+# 型推論に使うサンプル行数
+SAMPLE_ROWS = 1000
+
+# 整数として扱う絶対値の上限（これを超える桁数はExcelで精度が失われる）
+MAX_SAFE_INTEGER = 2**53
+
+# 推測できなかった場合に試す日時書式
+DATE_FORMAT_CANDIDATES = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y年%m月%d日",
+    "%Y年%m月%d日 %H:%M:%S",
+    "%Y年%m月%d日 %H:%M",
+)
+
+# 和暦の日付を表す書式（元号表で変換）
+WAREKI_DATE_FORMAT = "wareki"
+
+# 元号と元年の西暦
+JAPANESE_ERAS = {
+    "明治": 1868,
+    "大正": 1912,
+    "昭和": 1926,
+    "平成": 1989,
+    "令和": 2019,
+}
+
+# 元号の略記（R5.4.1 など）
+ERA_INITIALS = {"M": "明治", "T": "大正", "S": "昭和", "H": "平成", "R": "令和"}
+
+# 元号・略記 → 元年の西暦
+_ERA_START_YEARS = {
+    **JAPANESE_ERAS,
+    **{initial: JAPANESE_ERAS[era] for initial, era in ERA_INITIALS.items()},
+}
+
+# 和暦の日付（NFKC正規化後）: 元号, 年, 月, 日
+_WAREKI_PATTERN = (
+    r"^\s*(明治|大正|昭和|平成|令和|[MTSHR])\s*(元|\d{1,2})\s*[年./-]\s*"
+    r"(\d{1,2})\s*[月./-]\s*(\d{1,2})\s*日?\s*$"
+)
+
+# ASCII以外の文字（正規化が必要かどうかの判定用）
+_NON_ASCII_PATTERN = r"[^\x00-\x7f]"
+
+# 書式の異なる日時が混在する列の書式（要素ごとに解析）
+MIXED_DATE_FORMAT = "mixed"
+
+# 日時列とみなす値の形（数字を9に置き換えた文字列）の種類数の上限
+MAX_DATE_SHAPES = 16
+
+# 日時書式キャッシュの上限件数
+DATE_FORMAT_CACHE_SIZE = 256
+
+# 値の形の組 → 日時書式（日時でない場合はNone）
+_date_format_cache: "OrderedDict[tuple[str, ...], Optional[str]]" = OrderedDict()
+# 複数のワーカースレッドから同時に検出するため、キャッシュの操作は排他する
+_date_format_cache_lock = threading.Lock()
+
+
+class ColumnType(Enum):
+    """列の型"""
+
+    STRING = "string"
+    INTEGER = "integer"
+    FLOAT = "float"
+    DATETIME = "datetime"
+
+
+@dataclass
+class ColumnSchema:
+    """列のスキーマ"""
+
+    name: str
+    type: ColumnType = ColumnType.STRING
+    date_format: Optional[str] = None  # 日時列の書式（strftime形式）
+    normalize: bool = False  # 変換前にNFKC正規化するか（全角数字・和暦）
+    number_format: Optional[str] = None  # Excelの表示形式（スキーマファイルで指定）
+
+    @property
+    def is_datetime(self) -> bool:
+        """日時列かどうか"""
+        return self.type == ColumnType.DATETIME
+
+
+@dataclass
+class TableSchema:
+    """表全体のスキーマ（列順）"""
+
+    columns: list[ColumnSchema] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> ColumnSchema:
+        for column in self.columns:
+            if column.name == name:
+                return column
+        raise KeyError(name)
+
+    def __contains__(self, name: object) -> bool:
+        return any(column.name == name for column in self.columns)
+
+    @property
+    def names(self) -> list[str]:
+        """列名の一覧"""
+        return [column.name for column in self.columns]
+
+    def read_csv_options(self) -> dict[str, Any]:
+        """
+        スキーマの型でCSVを読み込むための pd.read_csv の引数
+
+        整数・小数列は dtype、書式が指定された日時列は parse_dates / date_format で
+        読み込み時に変換する。それ以外（文字列・正規化が必要な列・未指定の列）は
+        文字列として読み込む。
+
+        Returns:
+            dtype / parse_dates / date_format
+        """
+        dtype: dict[str, Any] = defaultdict(lambda: str)
+        parse_dates = []
+        date_format = {}
+        for column in self.columns:
+            if column.normalize:
+                continue
+            if column.type == ColumnType.INTEGER:
+                dtype[column.name] = "Int64"
+            elif column.type == ColumnType.FLOAT:
+                dtype[column.name] = "float64"
+            elif (
+                column.is_datetime
+                and column.date_format
+                and column.date_format not in (WAREKI_DATE_FORMAT, MIXED_DATE_FORMAT)
+            ):
+                parse_dates.append(column.name)
+                date_format[column.name] = column.date_format
+
+        options: dict[str, Any] = {"dtype": dtype}
+        if parse_dates:
+            options["parse_dates"] = parse_dates
+            options["date_format"] = date_format
+        return options
+
+    def widen(self, name: str, column_type: ColumnType) -> None:
+        """
+        列の型を広げる
+
+        Args:
+            name: 列名
+            column_type: 新しい値が必要とする型
+        """
+        column = self[name]
+        widened = _widen_type(column.type, column_type)
+        if widened != column.type:
+            logger.info(
+                f"Widening column '{name}': {column.type.value} -> {widened.value}"
+            )
+            column.type = widened
+            column.date_format = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """スキーマファイルと同じ形式の columns テーブル"""
+        columns: dict[str, Any] = {}
+        for column in self.columns:
+            spec: dict[str, Any] = {"type": column.type.value}
+            if column.date_format:
+                spec["format"] = column.date_format
+            if column.normalize:
+                spec["normalize"] = True
+            if column.number_format:
+                spec["number_format"] = column.number_format
+            columns[column.name] = spec
+        return columns
+
+    @classmethod
+    def from_dict(cls, columns: dict[str, Any]) -> "TableSchema":
+        """
+        columns テーブルからスキーマを作成
+
+        Args:
+            columns: 列名 → 型名、または type / format / number_format /
+                normalize の辞書
+
+        Returns:
+            スキーマ
+
+        Raises:
+            ValueError: 形式が正しくない場合
+        """
+        schema = cls()
+        for name, spec in columns.items():
+            if isinstance(spec, str):
+                spec = {"type": spec}
+            if not isinstance(spec, dict):
+                raise ValueError(f"Invalid schema for column '{name}': {spec!r}")
+            try:
+                column_type = ColumnType(spec.get("type", "string"))
+            except ValueError:
+                raise ValueError(
+                    f"Invalid type for column '{name}': {spec.get('type')!r}"
+                ) from None
+            date_format = spec.get("format")
+            schema.columns.append(
+                ColumnSchema(
+                    name=name,
+                    type=column_type,
+                    date_format=(
+                        date_format if column_type == ColumnType.DATETIME else None
+                    ),
+                    normalize=bool(
+                        spec.get("normalize", date_format == WAREKI_DATE_FORMAT)
+                    ),
+                    number_format=spec.get("number_format"),
+                )
+            )
+        return schema
+
+
+def _widen_type(current: ColumnType, required: ColumnType) -> ColumnType:
+    """2つの型を両方表現できる型"""
+    if current == required:
+        return current
+    if {current, required} == {ColumnType.INTEGER, ColumnType.FLOAT}:
+        return ColumnType.FLOAT
+    return ColumnType.STRING
+
+
+def _classify(name: str, values: pd.Series) -> ColumnSchema:
+    """
+    欠損値を除いた値の列から型を判定（すべての値が変換できる型）
+
+    そのままでは文字列となるASCII以外を含む列は、NFKC正規化して判定し直す。
+    """
+    if values.empty:
+        return ColumnSchema(name=name)
+
+    text = values.astype(str)
+    column_type, date_format = _classify_text(text)
+    if column_type == ColumnType.STRING and text.str.contains(_NON_ASCII_PATTERN).any():
+        column_type, date_format = _classify_text(normalize_text(text))
+        if column_type != ColumnType.STRING:
+            return ColumnSchema(name, column_type, date_format, normalize=True)
+    return ColumnSchema(name, column_type, date_format)
+
+
+def _classify_text(text: pd.Series) -> tuple[ColumnType, Optional[str]]:
+    """
+    文字列の値の列から型を判定
+
+    Returns:
+        (型, 日時書式)
+    """
+    try:
+        numbers = pd.to_numeric(text, errors="coerce")
+        if numbers.notna().all():
+            return _numeric_type(numbers), None
+
+        date_format = detect_date_format(text)
+        if date_format is not None:
+            return ColumnType.DATETIME, date_format
+    except (ValueError, TypeError, OverflowError) as e:
+        logger.debug(f"型判定スキップ: {e}")
+
+    return ColumnType.STRING, None
+
+
+def normalize_text(text: pd.Series) -> pd.Series:
+    """
+    全角英数字・記号・元号の合字（㋿など）をNFKC正規化で半角に揃える
+
+    Args:
+        text: 文字列の値
+
+    Returns:
+        正規化後の値（欠損値はそのまま）
+    """
+    return _map_unique(text, lambda values: values.str.normalize("NFKC"))
+
+
+def parse_wareki(text: pd.Series) -> pd.Series:
+    """
+    和暦の日付（令和5年4月1日、平成元年1月8日、R5.4.1 など）を一括変換
+
+    Args:
+        text: NFKC正規化済みの文字列の値
+
+    Returns:
+        日時の値（変換できない値はNaT）
+    """
+    return _map_unique(text, _parse_wareki_values)
+
+
+def _parse_wareki_values(text: pd.Series) -> pd.Series:
+    """和暦の日付を元号表で西暦に変換"""
+    parts = text.str.extract(_WAREKI_PATTERN)
+    era_start = parts[0].map(_ERA_START_YEARS)
+    year_in_era = pd.to_numeric(parts[1].replace("元", "1"), errors="coerce")
+    return pd.to_datetime(
+        pd.DataFrame(
+            {
+                "year": era_start + year_in_era - 1,
+                "month": pd.to_numeric(parts[2], errors="coerce"),
+                "day": pd.to_numeric(parts[3], errors="coerce"),
+            }
+        ),
+        errors="coerce",
+    )
+
+
+def _map_unique(
+    values: pd.Series, convert: Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    """
+    重複を除いた値だけを変換して元の並びに戻す
+
+    日付やコード値は重複が多いため、要素ごとの処理（正規化・正規表現）の
+    回数を値の種類数まで減らせる。
+    """
+    codes, uniques = pd.factorize(values)
+    converted = convert(pd.Series(uniques, dtype=object)).array
+    return pd.Series(
+        converted.take(codes, allow_fill=True), index=values.index, name=values.name
+    )
+
+
+def _to_datetime(text: pd.Series, date_format: Optional[str]) -> pd.Series:
+    """書式を指定して日時に一括変換（変換できない値はNaT）"""
+    if date_format == WAREKI_DATE_FORMAT:
+        return parse_wareki(text)
+    return pd.to_datetime(text, format=date_format, errors="coerce")
+
+
+def detect_date_format(values: pd.Series) -> Optional[str]:
+    """
+    日時の書式を検出
+
+    値の形（数字を9に置き換えた文字列）の組ごとに結果をキャッシュし、
+    同じ形の列（後続のチャンク・同じスキーマの別ファイル）では検出を省略する。
+
+    Args:
+        values: 欠損値を除いた文字列の値
+
+    Returns:
+        すべての値を変換できる書式（日時でない場合はNone）
+    """
+    text = values.astype(str)
+    # 全角数字は正規化前後で区別するため、半角数字のみを置き換える
+    shapes = text.str.replace(r"[0-9]", "9", regex=True).unique()
+    if len(shapes) > MAX_DATE_SHAPES:
+        return None
+    key = tuple(sorted(shapes))
+
+    # 書式の検出・検証はロックの外で行い、キャッシュの参照・更新だけを排他する
+    cached: Optional[str] = None
+    with _date_format_cache_lock:
+        found = key in _date_format_cache
+        if found:
+            _date_format_cache.move_to_end(key)
+            cached = _date_format_cache[key]
+    if found and (cached is None or _parses_all(text, cached)):
+        return cached
+
+    date_format = _find_date_format(text)
+    with _date_format_cache_lock:
+        _date_format_cache[key] = date_format
+        _date_format_cache.move_to_end(key)
+        if len(_date_format_cache) > DATE_FORMAT_CACHE_SIZE:
+            _date_format_cache.popitem(last=False)
+    return date_format
+
+
+def _find_date_format(text: pd.Series) -> Optional[str]:
+    """候補の書式を順に試し、すべての値を変換できる書式を返す"""
+    candidates: list[str] = []
+    for value in text.drop_duplicates().head(MAX_DATE_SHAPES):
+        guessed = guess_datetime_format(value)
+        if guessed and guessed not in candidates:
+            candidates.append(guessed)
+    candidates.extend(f for f in DATE_FORMAT_CANDIDATES if f not in candidates)
+
+    candidates.append(WAREKI_DATE_FORMAT)
+
+    for date_format in candidates:
+        if _parses_all(text, date_format):
+            return date_format
+    return None
+
+
+def _parses_all(text: pd.Series, date_format: str) -> bool:
+    """すべての値が書式で変換できるか"""
+    try:
+        parsed = _to_datetime(text, date_format)
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return bool(parsed.notna().all())
+
+
+def _numeric_type(numbers: pd.Series) -> ColumnType:
+    """数値の列が整数として扱えるか判定"""
+    if numbers.empty:
+        return ColumnType.INTEGER
+    if pd.api.types.is_integer_dtype(numbers.dtype):
+        if numbers.abs().max() <= MAX_SAFE_INTEGER:
+            return ColumnType.INTEGER
+        return ColumnType.STRING
+    if (numbers % 1 == 0).all() and numbers.abs().max() <= MAX_SAFE_INTEGER:
+        return ColumnType.INTEGER
+    return ColumnType.FLOAT
+
+
+def infer_schema(
+    df: pd.DataFrame,
+    sample_rows: int = SAMPLE_ROWS,
+    known: Optional[TableSchema] = None,
+) -> TableSchema:
+    """
+    先頭のサンプル行から表のスキーマを推定
+
+    Args:
+        df: 文字列として読み込んだデータフレーム
+        sample_rows: 型推論に使う行数
+        known: 型が既知の列のスキーマ（スキーマファイル）。これらの列は推論しない
+
+    Returns:
+        推定したスキーマ（列順はdfと同じ）
+    """
+    sample = df.head(sample_rows)
+    columns = []
+    for name in df.columns:
+        if known is not None and name in known:
+            columns.append(replace(known[name]))
+        else:
+            columns.append(_classify(name, sample[name].dropna()))
+    return TableSchema(columns=columns)
+
+
+def apply_schema(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """
+    データフレームをスキーマの型に変換
+
+    スキーマの型に変換できない値がある列は型を広げ、スキーマも更新する。
+    文字列列には何もしない。
+
+    Args:
+        df: 文字列として読み込んだデータフレーム
+        schema: 適用するスキーマ（型を広げた場合は更新される）
+
+    Returns:
+        変換後のデータフレーム
+    """
+    for column in schema.columns:
+        if column.type == ColumnType.STRING or column.name not in df.columns:
+            continue
+        if _has_column_dtype(df[column.name], column.type):
+            # 読み込み時に変換済み（スキーマファイル）
+            continue
+        converted = _convert_column(df[column.name], column)
+        if converted is None:
+            # 変換できない値の型を判定して広げる
+            detected = _classify(column.name, df[column.name].dropna())
+            column.normalize = column.normalize or detected.normalize
+            if (
+                column.is_datetime
+                and detected.is_datetime
+                and WAREKI_DATE_FORMAT not in (column.date_format, detected.date_format)
+            ):
+                # 日時のまま書式だけが異なる場合は要素ごとの解析に切り替える
+                logger.info(f"Mixed date formats in column '{column.name}'")
+                column.date_format = MIXED_DATE_FORMAT
+            elif detected.type != column.type or not column.is_datetime:
+                schema.widen(column.name, detected.type)
+            else:
+                # 和暦と西暦の混在
+                schema.widen(column.name, ColumnType.STRING)
+            converted = _convert_column(df[column.name], column)
+            if converted is None:
+                schema.widen(column.name, ColumnType.STRING)
+        if converted is not None:
+            df[column.name] = converted
+    return df
+
+
+def _has_column_dtype(series: pd.Series, column_type: ColumnType) -> bool:
+    """列がすでにスキーマの型か"""
+    if column_type == ColumnType.DATETIME:
+        return bool(pd.api.types.is_datetime64_any_dtype(series.dtype))
+    if column_type == ColumnType.INTEGER:
+        return bool(pd.api.types.is_integer_dtype(series.dtype))
+    if column_type == ColumnType.FLOAT:
+        return bool(pd.api.types.is_float_dtype(series.dtype))
+    return False
+
+
+def _convert_column(series: pd.Series, column: ColumnSchema) -> Optional[pd.Series]:
+    """列をスキーマの型に変換（欠損値以外に変換できない値があればNone）"""
+    column_type = column.type
+    if column_type == ColumnType.STRING:
+        return None
+    try:
+        text = normalize_text(series) if column.normalize else series
+        if column_type == ColumnType.DATETIME:
+            converted = _to_datetime(text, column.date_format)
+        else:
+            converted = pd.to_numeric(text, errors="coerce")
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+    if (converted.isna() & series.notna()).any():
+        return None
+    if column_type == ColumnType.INTEGER:
+        if _numeric_type(converted.dropna()) != ColumnType.INTEGER:
+            return None
+        return converted.astype("Int64")
+    if column_type == ColumnType.FLOAT:
+        return converted.astype("float64")
+    return converted
+
 
 def infer_data_types(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -21,37 +566,67 @@ def infer_data_types(df: pd.DataFrame) -> pd.DataFrame:
         型推定後のデータフレーム
     """
     try:
-        # 数値型の推定
-        for column in df.columns:
-            # 数値変換を試行
-            try:
-                # まず整数を試行
-                numeric_series = pd.to_numeric(df[column], errors="coerce")
-                if not numeric_series.isna().all():
-                    # NaNでない値が存在する場合
-                    if (numeric_series % 1 == 0).all():  # 全て整数
-                        df[column] = numeric_series.astype("Int64")
-                    else:  # 小数点を含む
-                        df[column] = numeric_series
-            except (ValueError, TypeError):
-                pass
-
-            # 日付型の推定（数値列でない場合のみ）
-            try:
-                # 既に数値型として処理された場合はスキップ
-                if pd.api.types.is_numeric_dtype(df[column]):
-                    continue
-
-                date_series = pd.to_datetime(df[column], errors="coerce")
-                if not date_series.isna().all():
-                    # 有効な日付が80%以上の場合に日付型として扱う
-                    valid_dates = date_series.notna().sum()
-                    if valid_dates / len(df) > 0.8:
-                        df[column] = date_series
-            except (ValueError, TypeError):
-                pass
-
+        return apply_schema(df, infer_schema(df))
     except Exception as e:
         logger.warning(f"Data type inference failed: {e}")
+        return df
 
-    return df
+
+def find_schema_file(csv_path: Path) -> Optional[Path]:
+    """
+    CSVと同じ場所にあるスキーマファイルを探す
+
+    Args:
+        csv_path: CSVファイルパス
+
+    Returns:
+        スキーマファイルパス（なければNone）
+    """
+    for suffix in SCHEMA_FILE_SUFFIXES:
+        schema_path = csv_path.with_name(csv_path.stem + suffix)
+        if schema_path.is_file():
+            return schema_path
+    return None
+
+
+def load_schema(schema_path: Path) -> TableSchema:
+    """
+    スキーマファイル（JSON / TOML）を読み込む
+
+    形式::
+
+        {"columns": {
+            "ID": "integer",
+            "入社日": {"type": "datetime", "format": "%Y-%m-%d",
+                       "number_format": "yyyy/mm/dd"},
+            "給与": {"type": "integer", "number_format": "#,##0"}
+        }}
+
+    type は string / integer / float / datetime、format は日時の書式
+    （strftime形式または "wareki"）、number_format はExcelの表示形式。
+
+    Args:
+        schema_path: スキーマファイルパス
+
+    Returns:
+        スキーマ（ファイルに記載した列のみ）
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    if schema_path.suffix.lower() == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML schema files require Python 3.11 or later")
+        with open(schema_path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(schema_path, encoding="utf-8") as f:
+            data = json.load(f)
+
+    columns = data.get("columns") if isinstance(data, dict) else None
+    if not isinstance(columns, dict):
+        raise ValueError(f"Schema file must have a 'columns' table: {schema_path}")
+
+    schema = TableSchema.from_dict(columns)
+    logger.info(f"Loaded schema for {len(schema.columns)} columns: {schema_path}")
+    return schema
@@ -3,13 +3,41 @@
 CSVファイルのエンコーディングと区切り文字を自動検出
 """
 
+import codecs
 import logging
 from pathlib import Path
+import re
 
-import chardet
+from chardet import UniversalDetector
 
 logger = logging.getLogger(__name__)
 
+# エンコーディング判定に読む先頭部分のサイズ
+HEAD_SAMPLE_SIZE = 1024 * 1024
+
+# 先頭以外から読むブロックの数とサイズ
+SAMPLE_BLOCKS = 8
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+# UniversalDetectorに一度に渡すサイズ
+DETECTOR_FEED_SIZE = 16 * 1024
+
+# 区切り文字の候補と、検出に使う先頭部分の文字数
+DELIMITERS = (",", "\t", ";", "|")
+DELIMITER_SAMPLE_SIZE = 1024
+
+# 厳密なデコードで判定する日本語のエンコーディング（優先順）
+_JAPANESE_ENCODINGS = ("cp932", "euc_jp")
+
+# BOMとエンコーディング（UTF-32はUTF-16より先に判定する）
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
 
 def _normalize_encoding(encoding: str) -> str:
     """
@@ -48,6 +76,9 @@ def detect_encoding(file_path: Path) -> str:
     """
     ファイルのエンコーディングを検出
 
+    ファイルサイズによらず一定量のサンプル（先頭と、ファイル全体に分散した
+    ブロック）だけを読み、detect_sample_encoding で判定する。
+
     Args:
         file_path: 対象ファイルパス
 
@@ -55,27 +86,66 @@ def detect_encoding(file_path: Path) -> str:
         検出されたエンコーディング名
     """
     try:
-        with open(file_path, "rb") as f:
-            # ファイル全体を読み込んで精度を上げる
-            raw_data = f.read()
-            result = chardet.detect(raw_data)
+        return detect_sample_encoding(read_samples(file_path))
+    except Exception as e:
+        logger.error(f"Encoding detection failed: {e}")
+        return "utf-8"  # デフォルト
 
-        encoding = result.get("encoding", "utf-8")
-        if encoding is None:
-            encoding = "utf-8"
-        confidence = result.get("confidence", 0.0)
 
-        logger.info(f"Encoding detected: {encoding} (confidence: {confidence:.2f})")
+def detect_sample_encoding(samples: list[bytes]) -> str:
+    """
+    読み込み済みのサンプルからエンコーディングを判定
+
+    次の順に判定する。
+
+    1. BOM（UTF-8 / UTF-16 / UTF-32）
+    2. UTF-8として厳密にデコードできるか
+    3. cp932・EUC-JPのどちらか一方だけでデコードできるか
+    4. chardetのUniversalDetector（確定した時点で打ち切り）。信頼度が低い場合は
+       デコードできた日本語のエンコーディング（cp932優先）
 
-        # 信頼度が低い場合のフォールバック
-        if confidence < 0.7:
-            # 日本語ファイルの一般的なエンコーディングを試行
-            # cp932を優先（Windows環境で作成されたファイルが多いため）
-            for fallback_encoding in ["cp932", "utf-8", "shift_jis"]:
-                if _test_encoding(file_path, fallback_encoding):
-                    encoding = fallback_encoding
-                    logger.warning(f"Low confidence, using fallback: {encoding}")
+    Args:
+        samples: read_samples で読んだサンプル（先頭が最初）
+
+    Returns:
+        検出されたエンコーディング名
+    """
+    try:
+        head = samples[0] if samples else b""
+
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                logger.info(f"Encoding detected by BOM: {encoding}")
+                return encoding
+
+        if _decodes(samples, "utf-8"):
+            logger.info("Encoding detected: utf-8 (strict decode)")
+            return "utf-8"
+
+        # 日本語のマルチバイトエンコーディングは、一方だけがデコードできれば確定
+        decodable = [enc for enc in _JAPANESE_ENCODINGS if _decodes(samples, enc)]
+        if len(decodable) == 1:
+            logger.info(f"Encoding detected: {decodable[0]} (strict decode)")
+            return decodable[0]
+
+        detector = UniversalDetector()
+        for sample in samples:
+            for start in range(0, len(sample), DETECTOR_FEED_SIZE):
+                detector.feed(sample[start : start + DETECTOR_FEED_SIZE])
+                if detector.done:
                     break
+            if detector.done:
+                break
+        result = detector.close()
+
+        encoding = result.get("encoding") or "utf-8"
+        confidence = result.get("confidence") or 0.0
+        logger.info(f"Encoding detected: {encoding} (confidence: {confidence:.2f})")
+
+        # 信頼度が低い場合は、デコードできた日本語のエンコーディングを優先
+        if confidence < 0.7 and decodable:
+            encoding = decodable[0]
+            logger.warning(f"Low confidence, using fallback: {encoding}")
 
         # エンコーディング名を正規化（shift_jis -> cp932）
         return _normalize_encoding(encoding)
@@ -85,13 +155,46 @@ def detect_encoding(file_path: Path) -> str:
         return "utf-8"  # デフォルト
 
 
-def _test_encoding(file_path: Path, encoding: str) -> bool:
-    """エンコーディングのテスト読み込み"""
+def read_samples(file_path: Path) -> list[bytes]:
+    """
+    判定用のサンプルを読み込む
+
+    先頭ブロックと、残りの範囲に等間隔に配置したブロック（末尾を含む）を返す。
+    途中のブロックは最初の改行の直後から使う
+    （0x0AはUTF-8・cp932のマルチバイト文字に現れないため、文字の途中から始まらない）。
+    """
+    with open(file_path, "rb") as f:
+        samples = [f.read(HEAD_SAMPLE_SIZE)]
+        size = f.seek(0, 2)
+        if size <= HEAD_SAMPLE_SIZE:
+            return samples
+
+        rest = size - HEAD_SAMPLE_SIZE
+        offsets = {
+            HEAD_SAMPLE_SIZE + rest * i // SAMPLE_BLOCKS for i in range(SAMPLE_BLOCKS)
+        }
+        offsets.add(max(size - SAMPLE_BLOCK_SIZE, HEAD_SAMPLE_SIZE))
+        for offset in sorted(offsets):
+            f.seek(offset)
+            block = f.read(SAMPLE_BLOCK_SIZE)
+            start = block.find(b"\n") + 1
+            if 0 < start < len(block):
+                samples.append(block[start:])
+    return samples
+
+
+def _decodes(samples: list[bytes], encoding: str) -> bool:
+    """
+    すべてのサンプルが厳密にデコードできるか
+
+    サンプル末尾の途中で切れた文字はエラーとしない。
+    """
     try:
-        with open(file_path, encoding=encoding) as f:
-            f.read(1000)  # 最初の1000文字を試行
+        for sample in samples:
+            decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+            decoder.decode(sample, final=False)
         return True
-    except (UnicodeDecodeError, UnicodeError):
+    except (UnicodeDecodeError, LookupError):
         return False
 
 
@@ -109,26 +212,44 @@ def detect_delimiter(file_path: Path, encoding: str) -> str:
     try:
         with open(file_path, encoding=encoding) as f:
             # 最初の数行を読み取り
-            sample = f.read(1024)
+            sample = f.read(DELIMITER_SAMPLE_SIZE)
+        return detect_text_delimiter(sample)
 
-        # 一般的な区切り文字をテスト
-        delimiters = [",", "\t", ";", "|"]
-        delimiter_counts: dict[str, int] = {}
+    except Exception as e:
+        logger.error(f"Delimiter detection failed: {e}")
 
-        for delimiter in delimiters:
-            count = sample.count(delimiter)
-            if count > 0:
-                delimiter_counts[delimiter] = count
+    return ","  # デフォルト
 
-        if delimiter_counts:
-            # 最も多く使われている区切り文字を選択
-            detected_delimiter = max(
-                delimiter_counts, key=lambda x: delimiter_counts[x]
-            )
-            logger.info(f"Delimiter detected: '{detected_delimiter}'")
-            return detected_delimiter
 
-    except Exception as e:
-        logger.error(f"Delimiter detection failed: {e}")
+def detect_text_delimiter(sample: str, quotechar: str = '"') -> str:
+    """
+    テキストの先頭部分からCSVの区切り文字を検出
+
+    引用符で囲まれた値の中の文字は数えない。
+
+    Args:
+        sample: ファイル先頭のテキスト
+        quotechar: 引用符
+
+    Returns:
+        検出された区切り文字
+    """
+    sample = sample[:DELIMITER_SAMPLE_SIZE]
+    if quotechar in sample:
+        escaped = re.escape(quotechar)
+        sample = re.sub(f"{escaped}[^{escaped}]*{escaped}", "", sample)
+
+    # 一般的な区切り文字をテスト
+    delimiter_counts: dict[str, int] = {}
+    for delimiter in DELIMITERS:
+        count = sample.count(delimiter)
+        if count > 0:
+            delimiter_counts[delimiter] = count
+
+    if delimiter_counts:
+        # 最も多く使われている区切り文字を選択
+        detected_delimiter = max(delimiter_counts, key=lambda x: delimiter_counts[x])
+        logger.info(f"Delimiter detected: '{detected_delimiter}'")
+        return detected_delimiter
 
     return ","  # デフォルト
@@ -1,91 +1,443 @@
 """
 Excel → CSV 変換エンジン
 ExcelファイルをCSV形式に変換する機能を提供
+
+シートXMLを1行ずつ読み（xlsx_reader.SheetReader）、そのままCSVに書き出す。
+シート全体をメモリに読み込まないため、メモリ使用量はファイルサイズに
+よらず一定。
+
+全シートの書き出しでは、共有文字列などのブック共通の表を一度だけ読み、
+プロセスプールの各ワーカーに初期化時に渡して、シートごとに並列で変換する。
+大きいシートから順に投入するため、全体の時間は最も大きいシートの変換時間に近づく。
+
+ジョブごとの状態はインスタンスに持たないため、1つのインスタンスを
+複数のスレッドから同時に使える（context.ConversionContext を参照）。
+キャンセル要求は進捗の更新と同じ間隔（500行または100msごと）で確認し、
+並列変換ではワーカーとプロセス間で共有するイベントで伝える。
+キャンセルされた場合は書きかけの出力を残さない。
 """
 
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import csv
 import logging
+import multiprocessing
+import os
 from pathlib import Path
-from typing import Callable, Optional
+import re
+import time
+from typing import Callable, Optional, Union
 
-import pandas as pd
+from .context import (
+    CancelToken,
+    ConversionCancelledError,
+    ConversionContext,
+    ProgressSink,
+)
+from .xlsx_reader import (
+    SheetInfo,
+    SheetReader,
+    WorkbookTables,
+    XlsxProbe,
+    list_sheets,
+    probe_xlsx,
+    read_workbook_tables,
+    resolve_sheet,
+)
 
 logger = logging.getLogger(__name__)
 
+# 出力ファイルの書き込みバッファサイズ
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# ファイル名に使用できない文字
+_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+# 並列変換でキャンセル要求を確認する間隔（秒）
+CANCEL_POLL_INTERVAL = 0.1
+
+# ワーカープロセスで共有するブック共通の表とキャンセル要求（_init_worker で設定）
+_worker_tables: Optional[WorkbookTables] = None
+_worker_cancel_token: Optional[CancelToken] = None
+
 
 class ExcelToCSVConverter:
     """Excel→CSV変換エンジン"""
 
     def __init__(self):
-        pass
+        # 進捗更新の設定（CSVConverterと同じ間隔）
+        self.row_update_interval: int = 500
+        self.time_update_interval: float = 0.1
 
     def convert_to_csv(
         self,
         excel_path: Path,
         csv_path: Path,
-        sheet_name: Optional[str] = None,
+        sheet_name: Optional[Union[str, int]] = None,
         encoding: str = "utf-8",
         add_bom: bool = True,
         progress_callback: Optional[Callable[[int], None]] = None,
+        row_progress_callback: Optional[Callable[[int, int], None]] = None,
+        context: Optional[ConversionContext] = None,
     ) -> bool:
         """
         ExcelファイルをCSVに変換
 
+        context を渡した場合、シート構成・進捗の通知先は context のものを使う
+        （コールバックの引数は使わない）。
+
         Args:
             excel_path: 入力Excelファイルパス
             csv_path: 出力CSVファイルパス
-            sheet_name: 変換するシート名（Noneの場合は最初のシート）
+            sheet_name: 変換するシート名または0始まりのインデックス
+                （Noneの場合は最初のワークシート）
             encoding: 出力エンコーディング（"utf-8" or "shift_jis"）
             add_bom: UTF-8にBOMを追加するか
-            progress_callback: 進捗コールバック関数
+            progress_callback: ファイル単位進捗コールバック (0-100%)
+            row_progress_callback: 行単位進捗コールバック (current_row, total_rows)
+            context: 変換ジョブのコンテキスト
 
         Returns:
             変換成功可否
         """
+        context = context or ConversionContext.create(
+            progress_callback, row_progress_callback
+        )
         try:
             logger.info(f"Converting {excel_path} to {csv_path}")
+            context.cancel_token.raise_if_cancelled()
 
-            if progress_callback:
-                progress_callback(10)
+            context.progress.file(10)
 
-            # Excel読み込み
+            # 対象シートはブックのメタデータだけで決め、そのシートのみ読み込む
             try:
-                df = pd.read_excel(excel_path, sheet_name=sheet_name, engine="openpyxl")
-
-                # 複数シートが返された場合は最初のシートを使用
-                if isinstance(df, dict):
-                    sheet_names = list(df.keys())
-                    if sheet_names:
-                        df = df[sheet_names[0]]
-                        logger.info(f"Multiple sheets found, using: {sheet_names[0]}")
-                    else:
-                        logger.error("No sheets found in Excel file")
-                        return False
-
+                sheets = (
+                    [sheet.sheet for sheet in context.xlsx_probe.sheets]
+                    if context.xlsx_probe is not None
+                    else list_sheets(excel_path)
+                )
+                sheet = resolve_sheet(sheets, sheet_name)
+                tables = read_workbook_tables(excel_path)
             except Exception as e:
                 logger.error(f"Excel file reading failed: {e}")
                 return False
 
-            if progress_callback:
-                progress_callback(70)
-
-            # 出力エンコーディングの設定
-            if encoding == "utf-8":
-                output_encoding = "utf-8-sig" if add_bom else "utf-8"
-            elif encoding == "shift_jis":
-                output_encoding = "shift_jis"
-            else:
-                # デフォルトはUTF-8
-                output_encoding = "utf-8-sig" if add_bom else "utf-8"
-
-            # CSV出力
-            df.to_csv(csv_path, index=False, encoding=output_encoding)
+            logger.info(f"Reading sheet: {sheet.name}")
+            try:
+                processed_rows = self._write_sheet(
+                    excel_path,
+                    sheet,
+                    tables,
+                    csv_path,
+                    _output_encoding(encoding, add_bom),
+                    context.progress,
+                    context.cancel_token,
+                )
+            finally:
+                tables.close()
 
-            if progress_callback:
-                progress_callback(100)
+            context.progress.file(100)
 
-            logger.info(f"Successfully converted {len(df)} rows to CSV")
+            # 1行目はヘッダー
+            logger.info(
+                f"Successfully converted {max(processed_rows - 1, 0)} rows to CSV"
+            )
             return True
 
+        except ConversionCancelledError:
+            logger.info(f"Conversion cancelled: {excel_path}")
+            csv_path.unlink(missing_ok=True)
+            return False
         except Exception as e:
             logger.error(f"Excel to CSV conversion failed: {e}")
+            csv_path.unlink(missing_ok=True)
             return False
+
+    def convert_all_sheets(
+        self,
+        excel_path: Path,
+        csv_path: Path,
+        encoding: str = "utf-8",
+        add_bom: bool = True,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        row_progress_callback: Optional[Callable[[int, int], None]] = None,
+        max_workers: Optional[int] = 1,
+        context: Optional[ConversionContext] = None,
+    ) -> list[Path]:
+        """
+        全ワークシートをそれぞれCSVに変換
+
+        出力は csv_path と同じフォルダの <csv_path の stem>_<シート名>.csv。
+        シートを並列に変換する場合は、呼び出し側が max_workers でプロセス数を指定する。
+        1シートでも失敗した場合は、書き出したファイルをすべて削除する。
+        context を渡した場合、シート構成・進捗の通知先は context のものを使う
+        （コールバックの引数は使わない）。
+
+        Args:
+            excel_path: 入力Excelファイルパス
+            csv_path: 出力CSVファイルパス（出力ファイル名の基準）
+            encoding: 出力エンコーディング（"utf-8" or "shift_jis"）
+            add_bom: UTF-8にBOMを追加するか
+            progress_callback: ファイル単位進捗コールバック (0-100%)
+            row_progress_callback: 行単位進捗コールバック (current_row, total_rows)
+                並列変換ではシートの完了ごとに報告する
+            max_workers: 並列変換のプロセス数（既定の1なら並列化しない、
+                NoneならCPUコア数）
+            context: 変換ジョブのコンテキスト
+
+        Returns:
+            出力ファイルのリスト（シートの順序。失敗した場合は空）
+        """
+        context = context or ConversionContext.create(
+            progress_callback, row_progress_callback
+        )
+        progress = context.progress
+        outputs: list[Path] = []
+        try:
+            logger.info(f"Converting all sheets of {excel_path}")
+            context.cancel_token.raise_if_cancelled()
+
+            progress.file(10)
+
+            # シート構成・大きさはブックのメタデータだけで求める
+            try:
+                probe = context.xlsx_probe or probe_xlsx(excel_path)
+                if not probe.sheets:
+                    raise ValueError("No worksheets found in Excel file")
+                tables = read_workbook_tables(excel_path)
+            except Exception as e:
+                logger.error(f"Excel file reading failed: {e}")
+                return []
+
+            try:
+                sheets = [sheet.sheet for sheet in probe.sheets]
+                outputs = _sheet_output_paths(csv_path, sheets)
+                output_encoding = _output_encoding(encoding, add_bom)
+                workers = min(max_workers or os.cpu_count() or 1, len(sheets))
+                # 行数の合計は dimension から求める（記録がない場合は書き出した行数）
+                total_rows = probe.total_rows
+
+                if workers == 1:
+                    processed_rows = 0
+                    for index, (sheet, output) in enumerate(zip(sheets, outputs)):
+                        processed_rows += self._write_sheet(
+                            excel_path,
+                            sheet,
+                            tables,
+                            output,
+                            output_encoding,
+                            cancel_token=context.cancel_token,
+                        )
+                        progress.rows(
+                            processed_rows,
+                            max(total_rows or processed_rows, processed_rows),
+                        )
+                        progress.file(10 + int((index + 1) / len(sheets) * 80))
+                else:
+                    processed_rows = self._write_sheets_parallel(
+                        excel_path,
+                        probe,
+                        tables,
+                        outputs,
+                        output_encoding,
+                        workers,
+                        progress,
+                        context.cancel_token,
+                    )
+            finally:
+                tables.close()
+
+            progress.file(100)
+
+            logger.info(
+                f"Successfully converted {len(sheets)} sheets "
+                f"({processed_rows} rows) to CSV"
+            )
+            return outputs
+
+        except ConversionCancelledError:
+            logger.info(f"Conversion cancelled: {excel_path}")
+            for output in outputs:
+                output.unlink(missing_ok=True)
+            return []
+        except Exception as e:
+            logger.error(f"Excel to CSV conversion failed: {e}")
+            for output in outputs:
+                output.unlink(missing_ok=True)
+            return []
+
+    def _write_sheets_parallel(
+        self,
+        excel_path: Path,
+        probe: XlsxProbe,
+        tables: WorkbookTables,
+        outputs: list[Path],
+        output_encoding: str,
+        workers: int,
+        progress: ProgressSink,
+        cancel_token: CancelToken,
+    ) -> int:
+        """
+        シートをプロセスプールで並列に変換（大きいシートから投入）
+
+        キャンセル要求・シートの失敗はワーカーと共有するイベントに転送し、
+        未着手のシートは取り消す。
+        """
+        logger.info(f"Converting {len(probe.sheets)} sheets with {workers} processes")
+        total_size = max(sum(sheet.size for sheet in probe.sheets), 1)
+        total_rows = probe.total_rows
+        done_size = 0
+        processed_rows = 0
+        worker_cancel_token = CancelToken(multiprocessing.Event())
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(tables, worker_cancel_token),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _export_sheet, excel_path, sheet.sheet, output, output_encoding
+                ): sheet
+                for sheet, output in sorted(
+                    zip(probe.sheets, outputs), key=lambda item: -item[0].size
+                )
+            }
+            pending = set(futures)
+            try:
+                while pending:
+                    cancel_token.raise_if_cancelled()
+                    done, pending = wait(
+                        pending,
+                        timeout=CANCEL_POLL_INTERVAL,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        processed_rows += future.result()
+                        done_size += futures[future].size
+                        progress.rows(
+                            processed_rows,
+                            max(total_rows or processed_rows, processed_rows),
+                        )
+                        progress.file(10 + int(done_size / total_size * 80))
+            except BaseException:
+                # 変換中のシートを中断し、未着手のシートを取り消してから後始末する
+                worker_cancel_token.cancel()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        return processed_rows
+
+    def _write_sheet(
+        self,
+        excel_path: Path,
+        sheet: SheetInfo,
+        tables: WorkbookTables,
+        csv_path: Path,
+        output_encoding: str,
+        progress: ProgressSink = ProgressSink(),
+        cancel_token: Optional[CancelToken] = None,
+    ) -> int:
+        """
+        シートの行を順にCSVへ書き出す
+
+        空行は後ろに値のある行が続く場合のみ出力する（末尾の空行は出力しない）。
+
+        Returns:
+            書き出した行数（ヘッダーを含む）
+
+        Raises:
+            ConversionCancelledError: キャンセルが要求された場合
+        """
+        processed_rows = 0
+        pending_empty_rows = 0
+        last_update_time = time.time()
+
+        with (
+            SheetReader(excel_path, sheet, tables) as reader,
+            open(
+                csv_path,
+                "w",
+                encoding=output_encoding,
+                newline="",
+                buffering=WRITE_BUFFER_SIZE,
+            ) as f,
+        ):
+            # 行数はシートの範囲（dimension）から求める。記録がない場合は不明
+            total_rows = max(reader.max_row or 0, 1)
+            writer = csv.writer(f)
+            for row_number, row in enumerate(reader, 1):
+                if all(value is None for value in row):
+                    pending_empty_rows += 1
+                else:
+                    writer.writerows([(None,) * len(row)] * pending_empty_rows)
+                    writer.writerow(row)
+                    processed_rows += pending_empty_rows + 1
+                    pending_empty_rows = 0
+
+                current_time = time.time()
+                should_update = (row_number % self.row_update_interval == 0) or (
+                    current_time - last_update_time >= self.time_update_interval
+                )
+                if should_update:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    total_rows = max(total_rows, row_number)
+                    progress.rows(row_number, total_rows)
+                    progress.file(10 + int(row_number / total_rows * 80))
+                    last_update_time = current_time
+
+        # 最終的な行数で更新
+        progress.rows(processed_rows, processed_rows)
+
+        return processed_rows
+
+
+def _output_encoding(encoding: str, add_bom: bool) -> str:
+    """出力エンコーディングの設定"""
+    if encoding == "shift_jis":
+        # Windows機種依存文字も出力できるようcp932を使用
+        return "cp932"
+    # デフォルトはUTF-8
+    return "utf-8-sig" if add_bom else "utf-8"
+
+
+def _sheet_output_paths(csv_path: Path, sheets: list[SheetInfo]) -> list[Path]:
+    """
+    シートごとの出力パス（<stem>_<シート名>.csv）
+
+    使用できない文字を置き換えたファイル名が重なる場合（"A<B" と "A_B" など）は、
+    後のシートに連番を付ける（<stem>_<シート名>_2.csv）。Windowsのファイル名に
+    合わせて、大文字・小文字は区別せずに比較する。
+    """
+    paths = []
+    used: set[str] = set()
+    for sheet in sheets:
+        base = f"{csv_path.stem}_{_INVALID_FILENAME_CHARS.sub('_', sheet.name)}"
+        name = base
+        suffix = 2
+        while name.casefold() in used:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        used.add(name.casefold())
+        paths.append(csv_path.with_name(f"{name}.csv"))
+    return paths
+
+
+def _init_worker(tables: WorkbookTables, cancel_token: CancelToken) -> None:
+    """ワーカープロセスの初期化（ブック共通の表とキャンセル要求を受け取る）"""
+    global _worker_tables, _worker_cancel_token
+    _worker_tables = tables
+    _worker_cancel_token = cancel_token
+
+
+def _export_sheet(
+    excel_path: Path, sheet: SheetInfo, csv_path: Path, output_encoding: str
+) -> int:
+    """1シートをCSVに変換（プロセスプールで実行）"""
+    assert _worker_tables is not None
+    return ExcelToCSVConverter()._write_sheet(
+        excel_path,
+        sheet,
+        _worker_tables,
+        csv_path,
+        output_encoding,
+        cancel_token=_worker_cancel_token,
+    )
@@ -0,0 +1,235 @@
+"""
+ファイルメタデータキャッシュモジュール
+検出結果（プローブ・行数・スキーマ）をセッションをまたいで保存する
+
+同じファイルを何度も追加・変換する場合に、エンコーディング検出や型推論を
+やり直さないためのディスクキャッシュ。ファイルはパス・サイズ・更新時刻
+（ナノ秒）・先頭と末尾のハッシュで識別し、いずれかが変われば無効になる。
+エントリ数が上限を超えると、最も長く使われていないものから削除する（LRU）。
+"""
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+import hashlib
+import json
+import logging
+from pathlib import Path
+import threading
+from typing import Any, Optional
+
+from .data_types import TableSchema
+from .probe import FileProbe, probe_file
+
+logger = logging.getLogger(__name__)
+
+# キャッシュファイル（config.jsonと同じ場所）
+DEFAULT_CACHE_FILE = Path("metadata_cache.json")
+
+# 保持するファイル数の上限
+DEFAULT_MAX_ENTRIES = 500
+
+# フィンガープリントに使う先頭・末尾のサイズ
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+# キャッシュの形式（FileProbe の項目や行数の数え方を変えたら上げる）
+CACHE_VERSION = 2
+
+
+@dataclass
+class CachedMetadata:
+    """キャッシュされたファイルのメタデータ"""
+
+    probe: FileProbe
+    schema: Optional[TableSchema] = None  # 変換時に確定したスキーマ
+
+
+def file_fingerprint(file_path: Path) -> str:
+    """
+    ファイルの先頭と末尾のハッシュ
+
+    Args:
+        file_path: 対象ファイルパス
+
+    Returns:
+        16進数のハッシュ値
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        size = f.seek(0, 2)
+        if size > FINGERPRINT_BLOCK_SIZE:
+            f.seek(max(size - FINGERPRINT_BLOCK_SIZE, FINGERPRINT_BLOCK_SIZE))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class MetadataCache:
+    """
+    ファイルメタデータのディスクキャッシュ
+
+    スレッドセーフ。更新のたびにキャッシュファイルへ書き出す。
+    """
+
+    def __init__(
+        self,
+        cache_file: Path = DEFAULT_CACHE_FILE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._entries: Optional[OrderedDict[str, dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def get(self, file_path: Path) -> Optional[CachedMetadata]:
+        """
+        キャッシュされたメタデータを取得
+
+        Args:
+            file_path: 対象ファイルパス
+
+        Returns:
+            メタデータ（未登録・ファイルが変更された場合はNone）
+        """
+        try:
+            key, stat = self._key(file_path), file_path.stat()
+            with self._lock:
+                entry = self._load().get(key)
+            if (
+                entry is None
+                or entry["size"] != stat.st_size
+                or entry["mtime_ns"] != stat.st_mtime_ns
+                or entry["fingerprint"] != file_fingerprint(file_path)
+            ):
+                return None
+
+            probe = FileProbe(path=file_path, **entry["probe"])
+            schema = entry.get("schema")
+            metadata = CachedMetadata(
+                probe=probe,
+                schema=TableSchema.from_dict(schema) if schema is not None else None,
+            )
+            with self._lock:
+                if key in self._load():
+                    self._load().move_to_end(key)
+            logger.debug(f"Metadata cache hit: {file_path.name}")
+            return metadata
+
+        except Exception as e:
+            logger.warning(f"Failed to read metadata cache for {file_path}: {e}")
+            return None
+
+    def put(
+        self,
+        file_path: Path,
+        probe: FileProbe,
+        schema: Optional[TableSchema] = None,
+    ) -> None:
+        """
+        メタデータを登録
+
+        スキーマを省略した場合は、登録済みのスキーマを残す。
+
+        Args:
+            file_path: 対象ファイルパス
+            probe: プローブ結果
+            schema: 変換時に確定したスキーマ
+        """
+        try:
+            key, stat = self._key(file_path), file_path.stat()
+            if stat.st_size != probe.size or stat.st_mtime_ns != probe.mtime_ns:
+                return  # プローブ後にファイルが変更された
+            probe_data = asdict(probe)
+            del probe_data["path"]
+            entry: dict[str, Any] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "fingerprint": file_fingerprint(file_path),
+                "probe": probe_data,
+                "schema": schema.to_dict() if schema is not None else None,
+            }
+            with self._lock:
+                entries = self._load()
+                previous = entries.pop(key, None)
+                if (
+                    schema is None
+                    and previous is not None
+                    and previous["fingerprint"] == entry["fingerprint"]
+                ):
+                    entry["schema"] = previous.get("schema")
+                entries[key] = entry
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                self._save(entries)
+
+        except Exception as e:
+            logger.warning(f"Failed to update metadata cache for {file_path}: {e}")
+
+    def lookup(self, file_path: Path) -> CachedMetadata:
+        """
+        キャッシュを優先してメタデータを取得
+
+        キャッシュにない場合はプローブして登録する（スキーマはなし）。
+
+        Args:
+            file_path: 対象ファイルパス
+
+        Returns:
+            メタデータ
+        """
+        cached = self.get(file_path)
+        if cached is not None:
+            return cached
+        probe = probe_file(file_path)
+        self.put(file_path, probe)
+        return CachedMetadata(probe=probe)
+
+    def put_result(
+        self, file_path: Path, probe: FileProbe, rows: int, schema: TableSchema
+    ) -> None:
+        """変換で確定した行数とスキーマを登録"""
+        self.put(
+            file_path, replace(probe, estimated_rows=rows, rows_exact=True), schema
+        )
+
+    def clear(self) -> None:
+        """すべてのエントリを削除"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._save(self._entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return str(file_path.resolve())
+
+    def _load(self) -> OrderedDict[str, dict[str, Any]]:
+        """キャッシュファイルを読み込む（初回のみ。ロック内で呼ぶ）"""
+        if self._entries is None:
+            self._entries = OrderedDict()
+            try:
+                if self.cache_file.exists():
+                    with open(self.cache_file, encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("version") == CACHE_VERSION:
+                        self._entries.update(data.get("entries", {}))
+            except Exception as e:
+                logger.warning(f"Failed to load metadata cache: {e}")
+        return self._entries
+
+    def _save(self, entries: OrderedDict[str, dict[str, Any]]) -> None:
+        """キャッシュファイルに書き出す（一時ファイルから置き換え。ロック内で呼ぶ）"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": CACHE_VERSION, "entries": entries},
+                    f,
+                    ensure_ascii=False,
+                )
+            temp_file.replace(self.cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to save metadata cache: {e}")
@@ -0,0 +1,149 @@
+"""
+ファイルプローブモジュール
+CSVファイルを一度だけ読み、変換・検証に必要な情報をまとめて検出する
+
+エンコーディング判定用のサンプル（先頭と分散したブロック）を一度読むだけで、
+エンコーディング・区切り文字・引用符・改行コード・列数・
+行数の推定値を求める。変換エンジンとバリデーターはこの結果を受け取り、
+同じファイルを検出のために開き直さない。
+
+変換エンジンは常に先頭のレコード（空行を除く）をヘッダーとして扱うため、
+データ行数も先頭のレコードを除いて数える。
+"""
+
+import codecs
+import csv
+from dataclasses import dataclass
+import io
+import logging
+from pathlib import Path
+
+from .encoding import detect_sample_encoding, detect_text_delimiter, read_samples
+
+logger = logging.getLogger(__name__)
+
+# 区切り文字以外の判定に使う先頭の行数
+PROBE_LINES = 20
+
+
+@dataclass(frozen=True)
+class FileProbe:
+    """CSVファイルの検出結果"""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    encoding: str
+    delimiter: str = ","
+    quotechar: str = '"'
+    line_terminator: str = "\n"
+    column_count: int = 0
+    estimated_rows: int = 0  # データ行数（先頭のヘッダー行・空行を除く）
+    rows_exact: bool = False  # ファイル全体を読んでレコードを数えた場合True
+
+
+def probe_file(file_path: Path) -> FileProbe:
+    """
+    CSVファイルをプローブ
+
+    Args:
+        file_path: CSVファイルパス
+
+    Returns:
+        検出結果
+    """
+    stat = file_path.stat()
+    samples = read_samples(file_path)
+    head = samples[0] if samples else b""
+    encoding = detect_sample_encoding(samples)
+
+    # 先頭部分をデコード（BOMは除かれる。途中で切れた末尾の文字は無視する）
+    whole_file = len(head) >= stat.st_size
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    text = decoder.decode(head, final=whole_file)
+
+    quotechar = _detect_quotechar(text)
+    delimiter = detect_text_delimiter(text, quotechar)
+    rows = _first_rows(text, delimiter, quotechar, whole_file)
+    if whole_file:
+        records = _count_records(text, delimiter, quotechar)
+        estimated_rows = max(records - 1, 0)
+    else:
+        estimated_rows = _estimate_rows(text, len(head), stat.st_size)
+
+    probe = FileProbe(
+        path=file_path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        encoding=encoding,
+        delimiter=delimiter,
+        quotechar=quotechar,
+        line_terminator=_detect_line_terminator(text),
+        column_count=len(rows[0]) if rows else 0,
+        estimated_rows=estimated_rows,
+        rows_exact=whole_file,
+    )
+    logger.debug(f"Probed {file_path.name}: {probe}")
+    return probe
+
+
+def _detect_quotechar(text: str) -> str:
+    """引用符を検出（ダブルクォートがなく、シングルクォートで囲まれた値がある場合のみ'）"""
+    sample = text[:4096]
+    if '"' in sample or "'" not in sample:
+        return '"'
+    try:
+        return csv.Sniffer().sniff(sample).quotechar or '"'
+    except csv.Error:
+        return '"'
+
+
+def _detect_line_terminator(text: str) -> str:
+    """改行コードを検出（'\\r\\n' / '\\n' / '\\r'）"""
+    newline = text.find("\n")
+    carriage_return = text.find("\r")
+    if carriage_return == -1:
+        return "\n"
+    if newline == -1 or carriage_return < newline - 1:
+        return "\r"  # CRのみ（旧Mac）
+    return "\r\n" if carriage_return == newline - 1 else "\n"
+
+
+def _first_rows(
+    text: str, delimiter: str, quotechar: str, whole_file: bool
+) -> list[list[str]]:
+    """先頭の数レコードを解析（途中で切れた最終レコードは除く）"""
+    rows: list[list[str]] = []
+    try:
+        reader = csv.reader(
+            io.StringIO(text, newline=""), delimiter=delimiter, quotechar=quotechar
+        )
+        for row in reader:
+            rows.append(row)
+            if len(rows) > PROBE_LINES:
+                break
+    except csv.Error:
+        pass
+    if not whole_file and 1 < len(rows) <= PROBE_LINES:
+        rows.pop()
+    return rows
+
+
+def _count_records(text: str, delimiter: str, quotechar: str) -> int:
+    """レコード数を数える（空行は除く。解析できない場合は行数）"""
+    try:
+        reader = csv.reader(
+            io.StringIO(text, newline=""), delimiter=delimiter, quotechar=quotechar
+        )
+        return sum(1 for row in reader if row)
+    except csv.Error:
+        return len(text.splitlines())
+
+
+def _estimate_rows(text: str, head_bytes: int, file_size: int) -> int:
+    """先頭部分の平均行長からファイル全体のデータ行数を推定（ヘッダー行を除く）"""
+    lines = text.count("\n") or text.count("\r")
+    if lines:
+        return max(int(file_size / (head_bytes / lines)) - 1, 1)
+    # 1行あたり平均100バイトと仮定
+    return max(file_size // 100, 1)
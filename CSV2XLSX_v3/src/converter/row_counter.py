@@ -0,0 +1,305 @@
+"""
+CSV行数カウントモジュール
+mmapしたファイルをブロック単位にベクトル演算で走査し、
+引用符内の改行を除いてレコード数を数える
+
+変換の総行数として数える場合は、pandas.read_csv と同じく空行
+（空白・タブのみの行を含む）を除く。
+"""
+
+import codecs
+import logging
+import mmap
+from pathlib import Path
+import threading
+from typing import Optional
+
+import numpy as np
+
+from .context import CancelToken, ConversionCancelledError
+
+logger = logging.getLogger(__name__)
+
+# 走査するブロックサイズ（1MB、CPUキャッシュに収まる大きさ）
+BLOCK_SIZE = 1024 * 1024
+
+# 空行の判定で無視する文字（pandas.read_csv と同じく空白・タブのみの行は空行）
+_BLANK_BYTES = (ord(" "), ord("\t"), ord("\r"))
+_BLANK_CHARS = " \t\r"
+
+
+def _is_ascii_compatible(encoding: Optional[str]) -> bool:
+    """
+    改行・引用符をバイト単位で数えられるエンコーディングか
+
+    UTF-8やcp932では0x0A・0x22がマルチバイト文字の一部に現れないため、
+    デコードせずにバイト列のまま数えられる。UTF-16/32は不可。
+    """
+    if not encoding:
+        return True
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return True
+    return not name.startswith(("utf-16", "utf-32"))
+
+
+def count_csv_records(
+    file_path: Path,
+    encoding: Optional[str] = None,
+    quotechar: str = '"',
+    block_size: int = BLOCK_SIZE,
+    cancel_token: Optional[CancelToken] = None,
+    skip_blank_lines: bool = False,
+) -> int:
+    """
+    CSVファイルのレコード数（ヘッダー行を含む）を数える
+
+    引用符で囲まれたフィールド内の改行はレコードの区切りとして数えない。
+    skip_blank_lines が False の場合は空行もレコードとして数える。
+
+    Args:
+        file_path: 対象ファイルパス
+        encoding: ファイルのエンコーディング
+        quotechar: 引用符
+        block_size: 走査するブロックサイズ
+        cancel_token: キャンセル要求（ブロックごとに確認）
+        skip_blank_lines: 空行（空白・タブのみの行を含む）を数えないか
+
+    Returns:
+        レコード数
+
+    Raises:
+        ConversionCancelledError: キャンセルが要求された場合
+    """
+    if not _is_ascii_compatible(encoding):
+        return _count_records_decoded(
+            file_path, encoding, quotechar, cancel_token, skip_blank_lines
+        )
+
+    quote = ord(quotechar)
+    newline = ord("\n")
+    records = 0
+    in_quotes = 0
+
+    with open(file_path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # UTF-8のBOMは行の内容に含めない（BOMだけのファイルは0件）
+            offset = len(codecs.BOM_UTF8) if mm[:3] == codecs.BOM_UTF8 else 0
+            if offset >= size:
+                return 0
+            data = np.frombuffer(mm, dtype=np.uint8)
+            for start in range(offset, size, block_size):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                block = data[start : start + block_size]
+                quotes = np.flatnonzero(block == quote)
+                if quotes.size == 0:
+                    if in_quotes:
+                        continue
+                    is_newline = block == newline
+                    records += int(np.count_nonzero(is_newline))
+                    if skip_blank_lines and _may_have_blank_lines(block, is_newline):
+                        newlines = np.flatnonzero(is_newline) + start
+                        records -= _count_blank_lines(data, newlines, offset)
+                    continue
+                # 改行より前にある引用符の数が偶数なら、その改行は引用符の外側
+                newlines = np.flatnonzero(block == newline)
+                quotes_before = np.searchsorted(quotes, newlines)
+                newlines = newlines[((quotes_before + in_quotes) & 1) == 0]
+                in_quotes = (in_quotes + quotes.size) & 1
+                records += newlines.size
+                if skip_blank_lines:
+                    records -= _count_blank_lines(data, newlines + start, offset)
+
+            # 末尾に改行のない最終行
+            if skip_blank_lines:
+                last_line_end = np.array([size], dtype=np.int64)
+                records += 1 - _count_blank_lines(data, last_line_end, offset)
+            elif data[-1] != newline:
+                records += 1
+            # mmapを閉じる前にバッファの参照を解放する
+            del data, block
+    return records
+
+
+def _may_have_blank_lines(block: np.ndarray, is_newline: np.ndarray) -> bool:
+    """
+    ブロック内で終わる空行があり得るか（引用符のないブロック用の事前判定）
+
+    空行は改行の直後（またはブロックの先頭）が空白・改行で始まるため、
+    改行の直後のバイトが0x20以下の箇所がなければ空行はない。
+    """
+    if block[0] <= 0x20:
+        return True
+    starts_blank = block[1:] <= 0x20
+    np.logical_and(starts_blank, is_newline[:-1], out=starts_blank)
+    return bool(starts_blank.any())
+
+
+def _count_blank_lines(data: np.ndarray, line_ends: np.ndarray, offset: int) -> int:
+    """
+    行末の位置のうち、空行（空白・タブ・CRのみの行）の行末の数
+
+    行末の直前のバイトから空白を読み飛ばして前の改行（またはファイルの先頭）に
+    届くかを調べる。ほとんどの行は1〜2バイトで判定できるため、行数に比例する
+    わずかな処理で済む（ブロック全体は走査しない）。
+
+    Args:
+        data: ファイル全体のバイト列
+        line_ends: 引用符の外側の改行の位置（最終行はファイルサイズ）
+        offset: 行の内容の先頭（BOMの直後）
+
+    Returns:
+        空行の数
+    """
+    blank = 0
+    positions = line_ends - 1
+    while positions.size:
+        at_start = positions < offset
+        values = data[np.maximum(positions, 0)]
+        ended = at_start | (values == ord("\n"))
+        blank += int(np.count_nonzero(ended))
+        is_space = (values == _BLANK_BYTES[0]) | (values == _BLANK_BYTES[1])
+        is_space |= values == _BLANK_BYTES[2]
+        is_space &= ~at_start
+        positions = positions[is_space] - 1
+    return blank
+
+
+def _count_records_decoded(
+    file_path: Path,
+    encoding: Optional[str],
+    quotechar: str,
+    cancel_token: Optional[CancelToken] = None,
+    skip_blank_lines: bool = False,
+) -> int:
+    """デコードしてからレコード数を数える（UTF-16/32用）"""
+    if skip_blank_lines:
+        return _count_nonblank_records_decoded(
+            file_path, encoding, quotechar, cancel_token
+        )
+    records = 0
+    in_quotes = False
+    last_char = "\n"
+    with open(file_path, encoding=encoding, newline="") as f:
+        while block := f.read(BLOCK_SIZE):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            parts = block.split(quotechar)
+            outside = parts[1::2] if in_quotes else parts[0::2]
+            records += "".join(outside).count("\n")
+            if (len(parts) - 1) % 2:
+                in_quotes = not in_quotes
+            last_char = block[-1]
+    if last_char != "\n":
+        records += 1
+    return records
+
+
+def _count_nonblank_records_decoded(
+    file_path: Path,
+    encoding: Optional[str],
+    quotechar: str,
+    cancel_token: Optional[CancelToken] = None,
+) -> int:
+    """デコードしてから空行を除いたレコード数を数える（UTF-16/32用）"""
+    records = 0
+    in_quotes = False
+    # 現在の行に空白以外の文字（引用符を含む）があるか
+    has_content = False
+    with open(file_path, encoding=encoding, newline="") as f:
+        while block := f.read(BLOCK_SIZE):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            for index, part in enumerate(block.split(quotechar)):
+                if index:
+                    # 引用符のある行は空行ではない
+                    in_quotes = not in_quotes
+                    has_content = True
+                if in_quotes:
+                    continue
+                *lines, rest = part.split("\n")
+                for line in lines:
+                    if has_content or line.strip(_BLANK_CHARS):
+                        records += 1
+                    has_content = False
+                if rest.strip(_BLANK_CHARS):
+                    has_content = True
+    if has_content:
+        records += 1
+    return records
+
+
+class BackgroundRowCounter:
+    """
+    CSVのデータ行数をバックグラウンドスレッドで数える
+
+    変換開始時にstart()し、完了するまではresultがNoneを返す。
+    データ行数は pandas.read_csv で読み込む行数と同じく、先頭のヘッダー行と
+    空行を除いて数える。変換の終了時（完了・失敗・キャンセル）には stop() で
+    カウントを中断する。
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        encoding: Optional[str] = None,
+        quotechar: str = '"',
+    ):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.quotechar = quotechar
+        self._stop_token = CancelToken()
+        self._result: Optional[int] = None
+        self._thread = threading.Thread(
+            target=self._run, name="csv-row-counter", daemon=True
+        )
+
+    def start(self) -> "BackgroundRowCounter":
+        """カウントを開始"""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """カウントを中断し、スレッドの終了を待つ（完了済みなら何もしない）"""
+        self._stop_token.cancel()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            records = count_csv_records(
+                self.file_path,
+                self.encoding,
+                self.quotechar,
+                cancel_token=self._stop_token,
+                skip_blank_lines=True,
+            )
+            self._result = max(records - 1, 0)
+            logger.debug(f"Counted {self._result:,} rows: {self.file_path}")
+        except ConversionCancelledError:
+            logger.debug(f"Row counting stopped: {self.file_path}")
+        except Exception as e:
+            logger.warning(f"Failed to count rows: {e}")
+
+    @property
+    def result(self) -> Optional[int]:
+        """データ行数（カウント中または失敗時はNone）"""
+        return self._result
+
+    def join(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        カウントの完了を待つ
+
+        Args:
+            timeout: 最大待ち時間（秒）
+
+        Returns:
+            データ行数（未完了または失敗時はNone）
+        """
+        self._thread.join(timeout)
+        return self._result
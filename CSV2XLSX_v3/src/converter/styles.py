@@ -1,198 +1,275 @@
 """
 Excelスタイル適用モジュール
-ワークシートへのスタイル、罫線、列幅調整などを適用
+ヘッダー・罫線・交互の行色・日付書式をスタイル計画として事前に確定し、
+行の書き込み時に適用する。列幅調整もここで扱う。
 """
 
+from collections.abc import Sequence
+from dataclasses import dataclass
 import logging
+import re
 from typing import Any, Optional
 
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
-from openpyxl.worksheet.filters import AutoFilter
 import pandas as pd
 
+from .xlsx_writer import CellStyle, StreamingXlsxWriter, is_valid_table_header
+
 logger = logging.getLogger(__name__)
 
+# 日付列の表示書式
+DATE_NUMBER_FORMAT = "YYYY/M/D"
 
-def apply_styles(
-    worksheet,
-    df: Optional[pd.DataFrame] = None,
-    style_options: Optional[dict[str, Any]] = None,
-    is_large_file: bool = False,
-):
-    """
-    Excelスタイルの適用
+# 交互の行色
+ALTERNATING_ROW_COLOR = "F5F5F5"
 
-    Args:
-        worksheet: openpyxlワークシート
-        df: データフレーム（日付列検出用）
-        style_options: スタイルオプション辞書
-        is_large_file: 大容量ファイルモード（スタイルを簡略化）
-    """
-    try:
-        if is_large_file:
-            logger.info(
-                "Large file mode: applying simplified styles (header + auto-filter only)"
-            )
-            # 大容量ファイルではヘッダースタイルとオートフィルターのみ適用
-            _apply_header_style(worksheet, style_options)
-            if worksheet.max_row > 1:
-                worksheet.auto_filter.ref = worksheet.dimensions
-            logger.info("Simplified styles applied successfully")
-            return
-
-        if not style_options:
-            return
-
-        # スタイルオプションをチェック
-        apply_header_style = style_options.get(
-            "header_bold", False
-        ) or style_options.get("borders", False)
-        auto_width = style_options.get("auto_width", False)
-        freeze_header = style_options.get("freeze_header", False)
-        alternating_rows = style_options.get("alternating_rows", False)
-
-        # ヘッダー行のスタイル（header_bold or bordersが有効な場合）
-        if apply_header_style:
-            _apply_header_style(worksheet, style_options)
-
-        # 罫線の設定
-        if style_options.get("borders", False):
-            _apply_borders(worksheet)
-
-        # 交互の行色設定
-        if alternating_rows and worksheet.max_row > 1:
-            _apply_alternating_rows(worksheet)
-
-        # ヘッダー固定（フリーズペイン）
-        if freeze_header:
-            worksheet.freeze_panes = "A2"
-
-        # オートフィルターの設定
-        if worksheet.max_row > 1 and worksheet.max_column > 0:
-            filter_range = (
-                f"A1:{worksheet.cell(row=1, column=worksheet.max_column).coordinate}"
-            )
-            worksheet.auto_filter = AutoFilter(ref=filter_range)
+# ヘッダー行の高さ（55px ≈ 41.25pt）
+HEADER_ROW_HEIGHT = 41.25
 
-        # 日付列のフォーマット設定
-        format_date_columns(worksheet, df)
+# 罫線・交互の行色の出力方式（style_options["banding"]）
+#   "cells": セルごとに塗りつぶし・罫線スタイルを設定（既定）
+#   "table": Excelテーブル（ListObject）のテーブルスタイルで表現
+#   "conditional": データ範囲への条件付き書式で表現
+BANDING_MODES = ("cells", "table", "conditional")
 
-        # 列幅の自動調整
-        if auto_width:
-            adjust_column_widths(worksheet)
+# テーブルモードのテーブルスタイル（罫線あり / なし）
+TABLE_STYLE_WITH_BORDERS = "TableStyleLight15"
+TABLE_STYLE_PLAIN = "TableStyleLight1"
 
-    except Exception as e:
-        logger.warning(f"Style application failed: {e}")
+# 偶数行を判定する条件付き書式
+EVEN_ROW_FORMULA = "MOD(ROW(),2)=0"
 
+# 自動調整する列幅の範囲（文字数）
+MIN_COLUMN_WIDTH = 12
+MAX_COLUMN_WIDTH = 50
 
-def _apply_header_style(worksheet, style_options: dict[str, Any]):
-    """ヘッダー行のスタイル適用"""
-    header_font = Font(
-        bold=style_options.get("header_bold", True),
-        color=style_options.get("header_color", "000000"),
-    )
-    header_fill = PatternFill(
-        start_color=style_options.get("header_bg", "E0E0E0"),
-        end_color=style_options.get("header_bg", "E0E0E0"),
-        fill_type="solid",
-    )
+# 日付列の表示幅（DATE_NUMBER_FORMATの最大桁数 "YYYY/MM/DD"）
+DATE_DISPLAY_WIDTH = 10
 
-    # ヘッダー行のアライメント設定（文字折り返しを含む）
-    header_alignment = Alignment(
+# 全角（East Asian Width が W / F）の文字。表示幅は半角2文字分
+_WIDE_CHAR_PATTERN = re.compile(
+    "[\u1100-\u115f\u2e80-\u303e\u3041-\u33ff\u3400-\u4dbf\u4e00-\u9fff"
+    "\ua000-\ua4cf\uac00-\ud7a3\uf900-\ufaff\ufe30-\ufe4f\uff00-\uff60"
+    "\uffe0-\uffe6\U00020000-\U0003fffd]"
+)
+
+
+def header_cell_style(style_options: dict[str, Any]) -> CellStyle:
+    """
+    ヘッダー行のスタイル定義
+
+    太字・背景色・中央揃え（折り返しあり）。罫線オプション有効時は罫線も付ける。
+
+    Args:
+        style_options: スタイルオプション辞書
+
+    Returns:
+        ヘッダーセルのスタイル
+    """
+    return CellStyle(
+        bold=style_options.get("header_bold", True),
+        font_color=style_options.get("header_color", "000000"),
+        fill_color=style_options.get("header_bg", "E0E0E0"),
+        border=style_options.get("borders", False),
         horizontal="center",
         vertical="center",
-        wrap_text=True,  # 文字の折り返し
+        wrap_text=True,
     )
 
-    # ヘッダー行にスタイル適用
-    for cell in worksheet[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
 
-    # ヘッダー行の高さを55pxに設定（約41ポイント）
-    worksheet.row_dimensions[1].height = 41.25  # 55px ≈ 41.25pt
+@dataclass(frozen=True)
+class StylePlan:
+    """
+    書き込み前に確定させたスタイル計画
 
+    データ行のスタイルIDは列ごと・行の偶奇ごとに事前登録しておき、
+    書き込み時は行番号の偶奇でタプルを選ぶだけにする。
+    """
 
-def _apply_borders(worksheet):
-    """罫線の適用"""
-    thin_border = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-    for row in worksheet.iter_rows(
-        min_row=1, max_row=worksheet.max_row, min_col=1, max_col=worksheet.max_column
-    ):
-        for cell in row:
-            cell.border = thin_border
+    header_style: int = 0
+    header_height: Optional[float] = None
+    # (偶数行, 奇数行) ごとの列スタイルID
+    row_styles: tuple[tuple[int, ...], tuple[int, ...]] = ((), ())
+    auto_filter: bool = False
+    freeze_panes: Optional[str] = None
+    # Excelネイティブの書式（banding="table" / "conditional"）
+    table_style: Optional[str] = None
+    table_row_stripes: bool = False
+    conditional_formats: tuple[tuple[str, CellStyle], ...] = ()
+
+    def apply_to(self, writer: StreamingXlsxWriter) -> None:
+        """
+        シート単位の設定（フィルター・枠固定・テーブル・条件付き書式）を反映
+
+        Args:
+            writer: 書き込み先ライター
+        """
+        writer.auto_filter = self.auto_filter
+        writer.freeze_panes = self.freeze_panes
+        writer.table_style = self.table_style
+        writer.table_row_stripes = self.table_row_stripes
+        for formula, style in self.conditional_formats:
+            writer.add_conditional_format(formula, style, first_row=2)
+
+    def for_row(self, row_number: int) -> tuple[int, ...]:
+        """
+        データ行のスタイルIDを返す
+
+        Args:
+            row_number: シート上の行番号（ヘッダーが1行目）
+
+        Returns:
+            列ごとのスタイルID
+        """
+        return self.row_styles[row_number % 2]
+
+
+def build_style_plan(
+    writer: StreamingXlsxWriter,
+    style_options: Optional[dict[str, Any]],
+    date_columns: Sequence[bool],
+    header: Optional[Sequence[str]] = None,
+    number_formats: Optional[Sequence[Optional[str]]] = None,
+) -> StylePlan:
+    """
+    スタイルオプションと列の型からスタイル計画を作成
 
+    Args:
+        writer: スタイルを登録する書き込み先ライター
+        style_options: スタイルオプション辞書
+        date_columns: 列ごとの日付列フラグ
+        header: ヘッダー行（テーブルモードの可否判定用）
+        number_formats: 列ごとの表示形式（指定した列は日付書式より優先）
 
-def _apply_alternating_rows(worksheet):
-    """交互の行色設定"""
-    alternating_fill = PatternFill(
-        start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
+    Returns:
+        スタイル計画
+    """
+    formats = list(number_formats or [None] * len(date_columns))
+
+    if not style_options:
+        plain = tuple(
+            writer.register_style(CellStyle(number_format=number_format))
+            if number_format
+            else 0
+            for number_format in formats
+        )
+        return StylePlan(row_styles=(plain, plain))
+
+    header_style = 0
+    header_height = None
+    borders = style_options.get("borders", False)
+    alternating_rows = style_options.get("alternating_rows", False)
+    if style_options.get("header_bold", False) or borders:
+        header_style = writer.register_style(header_cell_style(style_options))
+        header_height = HEADER_ROW_HEIGHT
+
+    banding = style_options.get("banding", "cells")
+    if banding not in BANDING_MODES:
+        logger.warning(f"Unknown banding mode: {banding}, using 'cells'")
+        banding = "cells"
+    if banding == "table" and (header is None or not is_valid_table_header(header)):
+        # テーブル列名に使えないヘッダーは条件付き書式で代替
+        logger.info("Header cannot be used for an Excel table, using conditional")
+        banding = "conditional"
+    if not (borders or alternating_rows):
+        banding = "cells"
+
+    # セル単位で持つのは日付書式のみ（ネイティブ書式モード）
+    cell_borders = borders and banding == "cells"
+    cell_banding = alternating_rows and banding == "cells"
+
+    def column_styles(fill_color: Optional[str]) -> tuple[int, ...]:
+        return tuple(
+            writer.register_style(
+                CellStyle(
+                    fill_color=fill_color,
+                    border=cell_borders,
+                    number_format=number_format
+                    or (DATE_NUMBER_FORMAT if is_date else None),
+                )
+            )
+            for is_date, number_format in zip(date_columns, formats)
+        )
+
+    odd_styles = column_styles(None)
+    even_styles = column_styles(ALTERNATING_ROW_COLOR) if cell_banding else odd_styles
+
+    table_style = None
+    conditional_formats: list[tuple[str, CellStyle]] = []
+    if banding == "table":
+        table_style = TABLE_STYLE_WITH_BORDERS if borders else TABLE_STYLE_PLAIN
+    elif banding == "conditional":
+        if borders:
+            conditional_formats.append(("TRUE", CellStyle(border=True)))
+        if alternating_rows:
+            conditional_formats.append(
+                (EVEN_ROW_FORMULA, CellStyle(fill_color=ALTERNATING_ROW_COLOR))
+            )
+
+    return StylePlan(
+        header_style=header_style,
+        header_height=header_height,
+        row_styles=(even_styles, odd_styles),
+        # テーブルは独自のオートフィルターを持つ
+        auto_filter=table_style is None,
+        freeze_panes="A2" if style_options.get("freeze_header", False) else None,
+        table_style=table_style,
+        table_row_stripes=alternating_rows,
+        conditional_formats=tuple(conditional_formats),
     )
-    for row_idx in range(2, worksheet.max_row + 1):
-        if row_idx % 2 == 0:
-            for col_idx in range(1, worksheet.max_column + 1):
-                cell = worksheet.cell(row=row_idx, column=col_idx)
-                if (
-                    not cell.fill.start_color.rgb
-                    or cell.fill.start_color.rgb == "00000000"
-                ):
-                    cell.fill = alternating_fill
-
-
-def format_date_columns(worksheet, df: Optional[pd.DataFrame] = None):
+
+
+def display_width(text: str) -> int:
     """
-    日付列のフォーマット設定
+    文字列の表示幅（全角文字を2、それ以外を1として数える）
 
     Args:
-        worksheet: openpyxlワークシート
-        df: データフレーム（日付列検出用）
+        text: 対象文字列
+
+    Returns:
+        表示幅
     """
-    try:
-        if df is None:
-            return
+    return len(text) + len(_WIDE_CHAR_PATTERN.findall(text))
 
-        # 日付列を検出してフォーマットを適用
-        for col_idx, column in enumerate(df.columns, 1):
-            if pd.api.types.is_datetime64_any_dtype(df[column]):
-                # 日付列にフォーマット適用
-                column_letter = worksheet.cell(row=1, column=col_idx).column_letter
-                for row_idx in range(2, worksheet.max_row + 1):
-                    cell = worksheet[f"{column_letter}{row_idx}"]
-                    if cell.value:
-                        cell.number_format = "YYYY/M/D"
 
-    except Exception as e:
-        logger.warning(f"Date formatting failed: {e}")
+def column_display_widths(df: pd.DataFrame) -> list[int]:
+    """
+    DataFrameの列ごとの最大表示幅をベクトル演算で計算
 
+    欠損値は数えない。日付列はDATE_NUMBER_FORMATでの表示幅とする。
 
-def adjust_column_widths(worksheet):
+    Args:
+        df: 対象データ
+
+    Returns:
+        列順の最大表示幅（データがない列は0）
     """
-    列幅の自動調整
+    widths = []
+    for _, series in df.items():
+        values = series.dropna()
+        if values.empty:
+            widths.append(0)
+        elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+            widths.append(DATE_DISPLAY_WIDTH)
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(
+            series.dtype
+        ):
+            # 数値は半角のみ
+            widths.append(int(values.astype(str).str.len().max()))
+        else:
+            text = values.astype(str)
+            lengths = text.str.len() + text.str.count(_WIDE_CHAR_PATTERN)
+            widths.append(int(lengths.max()))
+    return widths
+
+
+def excel_column_width(max_width: int) -> int:
+    """
+    最大表示幅からExcelの列幅を決定（余白2文字、最小12・最大50）
 
     Args:
-        worksheet: openpyxlワークシート
+        max_width: 列内の最大表示幅
+
+    Returns:
+        列幅
     """
-    try:
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except (AttributeError, TypeError):
-                    pass
-
-            # 最小12、最大50文字幅
-            adjusted_width = min(max(max_length + 2, 12), 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-
-    except Exception as e:
-        logger.warning(f"Column width adjustment failed: {e}")
+    return min(max(max_width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
@@ -0,0 +1,363 @@
+"""
+ストリーミング文字コード変換モジュール
+CSVを解析せず、バイト列のままエンコーディングだけを変換する
+
+大きなブロック単位でデコード → エンコードするため、メモリ使用量は
+ブロックサイズで一定。ブロック境界で分断されたマルチバイト文字は
+インクリメンタルデコーダーが次のブロックとつなげて処理する。
+区切り文字・引用符・改行コード・数値の表記などはそのまま保たれる。
+
+大きなファイルは改行の直後で区切った断片をプロセスプールで並列に変換し、
+一時ファイルに書いた断片を順に連結する。改行（0x0A）がマルチバイト文字の
+途中に現れないエンコーディングのみが対象で、それ以外は1プロセスで変換する。
+
+進捗コールバックはブロックごと（並列変換では断片ごと）に呼ばれ、
+コールバックが例外を送出すると変換を中断する（未着手の断片は取り消す）。
+キャンセル要求はブロックごとに確認し、並列変換ではワーカーと共有する
+イベントに転送して、変換中の断片もブロックの区切りで中断する。
+"""
+
+import codecs
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import shutil
+from typing import BinaryIO, Callable, Optional
+
+from .context import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# 一度に読み込むブロックのサイズ
+TRANSCODE_BLOCK_SIZE = 4 * 1024 * 1024
+
+# 並列変換の対象とするファイルサイズと、1断片のサイズ
+PARALLEL_MIN_SIZE = 256 * 1024 * 1024
+PARALLEL_PIECE_SIZE = 64 * 1024 * 1024
+
+# 並列変換でキャンセル要求を確認する間隔（秒）
+CANCEL_POLL_INTERVAL = 0.1
+
+# ワーカープロセスで共有するキャンセル要求（_init_worker で設定）
+_worker_cancel_token: Optional[CancelToken] = None
+
+# 改行の直後で区切っても文字が分断されない（状態を持たない）エンコーディング
+_NEWLINE_SAFE_CODECS = (
+    "ascii",
+    "utf-8",
+    "utf-8-sig",
+    "cp932",
+    "shift_jis",
+    "euc_jp",
+    "latin-1",
+    "iso8859-1",
+    "cp1252",
+)
+
+
+def transcode_file(
+    input_path: Path,
+    output_path: Path,
+    input_encoding: str,
+    output_encoding: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    block_size: int = TRANSCODE_BLOCK_SIZE,
+    max_workers: Optional[int] = 1,
+    cancel_token: Optional[CancelToken] = None,
+) -> int:
+    """
+    ファイルのエンコーディングを変換
+
+    入力のBOMは除き、出力のBOMは output_encoding に従う
+    （"utf-8-sig" ならBOM付き）。入出力が同じ文字コードの場合はデコードせずに
+    コピーする。PARALLEL_MIN_SIZE 以上のファイルは max_workers のプロセスで
+    並列に変換する。
+
+    Args:
+        input_path: 入力ファイルパス
+        output_path: 出力ファイルパス
+        input_encoding: 入力エンコーディング
+        output_encoding: 出力エンコーディング
+        progress_callback: 進捗コールバック (読み込んだバイト数, 全体のバイト数)
+        block_size: ブロックサイズ
+        max_workers: 並列変換のプロセス数（Noneの場合はCPUコア数、1なら並列化しない）
+        cancel_token: キャンセル要求（ブロックごとに確認）
+
+    Returns:
+        書き込んだバイト数
+
+    Raises:
+        UnicodeError: 入力をデコードできない・出力で表現できない文字がある場合
+        ConversionCancelledError: キャンセルが要求された場合
+    """
+    total = input_path.stat().st_size
+    workers = max_workers or os.cpu_count() or 1
+    if (
+        workers > 1
+        and total >= PARALLEL_MIN_SIZE
+        and not _same_codec(input_encoding, output_encoding)
+        and _newline_safe(input_encoding)
+        and _newline_safe(output_encoding)
+    ):
+        return _transcode_parallel(
+            input_path,
+            output_path,
+            input_encoding,
+            output_encoding,
+            total,
+            progress_callback,
+            block_size,
+            workers,
+            cancel_token or CancelToken(),
+        )
+
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        if _same_codec(input_encoding, output_encoding):
+            written = _copy(
+                src,
+                dst,
+                input_encoding,
+                output_encoding,
+                total,
+                progress_callback,
+                cancel_token,
+            )
+        else:
+            written = _transcode(
+                src,
+                dst,
+                input_encoding,
+                output_encoding,
+                total,
+                progress_callback,
+                block_size,
+                cancel_token,
+            )
+    if progress_callback:
+        progress_callback(total, total)
+    logger.debug(
+        f"Transcoded {input_path.name}: {input_encoding} -> {output_encoding} "
+        f"({total:,} -> {written:,} bytes)"
+    )
+    return written
+
+
+def _transcode(
+    src: BinaryIO,
+    dst: BinaryIO,
+    input_encoding: str,
+    output_encoding: str,
+    total: int,
+    progress_callback: Optional[Callable[[int, int], None]],
+    block_size: int,
+    cancel_token: Optional[CancelToken] = None,
+) -> int:
+    """ブロック単位でデコード → エンコード"""
+    # UTF-8のBOMはutf-8-sigのデコーダーが除く（UTF-16/32は各デコーダーが処理する）
+    decoder_encoding = "utf-8-sig" if _is_utf8(input_encoding) else input_encoding
+    decoder = codecs.getincrementaldecoder(decoder_encoding)()
+    encoder = codecs.getincrementalencoder(output_encoding)()
+    done = 0
+    while True:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        block = src.read(block_size)
+        final = not block
+        data = encoder.encode(decoder.decode(block, final=final), final=final)
+        if data:
+            dst.write(data)
+        if final:
+            return dst.tell()
+        done += len(block)
+        if progress_callback:
+            progress_callback(done, total)
+
+
+def _transcode_parallel(
+    input_path: Path,
+    output_path: Path,
+    input_encoding: str,
+    output_encoding: str,
+    total: int,
+    progress_callback: Optional[Callable[[int, int], None]],
+    block_size: int,
+    workers: int,
+    cancel_token: CancelToken,
+) -> int:
+    """
+    改行の直後で区切った断片をプロセスプールで変換し、順に連結する
+
+    キャンセル要求・失敗はワーカーと共有するイベントに転送し、変換中の断片は
+    ブロックの区切りで中断し、未着手の断片は取り消す。
+    """
+    bounds = _split_at_newlines(input_path, total, PARALLEL_PIECE_SIZE)
+    parts = [
+        output_path.with_name(f"{output_path.name}.part{index}")
+        for index in range(len(bounds) - 1)
+    ]
+    # BOMは出力の先頭にだけ付け、断片はBOMなしで変換する
+    piece_encoding = "utf-8" if _is_utf8(output_encoding) else output_encoding
+    workers = min(workers, len(parts))
+    logger.info(
+        f"Transcoding {input_path.name} in {len(parts)} pieces with {workers} processes"
+    )
+    worker_cancel_token = CancelToken(multiprocessing.Event())
+    try:
+        done = 0
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(worker_cancel_token,),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _transcode_piece,
+                    input_path,
+                    part,
+                    input_encoding,
+                    piece_encoding,
+                    start,
+                    end,
+                    block_size,
+                ): end - start
+                for part, start, end in zip(parts, bounds, bounds[1:])
+            }
+            pending = set(futures)
+            try:
+                while pending:
+                    cancel_token.raise_if_cancelled()
+                    finished, pending = wait(
+                        pending,
+                        timeout=CANCEL_POLL_INTERVAL,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in finished:
+                        future.result()
+                        done += futures[future]
+                        if progress_callback:
+                            progress_callback(done, total)
+            except BaseException:
+                worker_cancel_token.cancel()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        with open(output_path, "wb") as dst:
+            if _codec_name(output_encoding) == "utf-8-sig":
+                dst.write(codecs.BOM_UTF8)
+            for part in parts:
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, dst, TRANSCODE_BLOCK_SIZE)
+                part.unlink()
+            return dst.tell()
+    finally:
+        for part in parts:
+            part.unlink(missing_ok=True)
+
+
+def _split_at_newlines(input_path: Path, total: int, piece_size: int) -> list[int]:
+    """ファイルを piece_size 程度ごとに、改行の直後で区切った境界のオフセット"""
+    bounds = [0]
+    with open(input_path, "rb") as f:
+        offset = piece_size
+        while offset < total:
+            f.seek(offset)
+            position = offset
+            newline = -1
+            while newline == -1:
+                block = f.read(64 * 1024)
+                if not block:
+                    break
+                newline = block.find(b"\n")
+                if newline == -1:
+                    position += len(block)
+            if newline == -1 or position + newline + 1 >= total:
+                break
+            bounds.append(position + newline + 1)
+            offset = bounds[-1] + piece_size
+    bounds.append(total)
+    return bounds
+
+
+def _init_worker(cancel_token: CancelToken) -> None:
+    """ワーカープロセスの初期化（キャンセル要求を受け取る）"""
+    global _worker_cancel_token
+    _worker_cancel_token = cancel_token
+
+
+def _transcode_piece(
+    input_path: Path,
+    part_path: Path,
+    input_encoding: str,
+    output_encoding: str,
+    start: int,
+    end: int,
+    block_size: int,
+) -> None:
+    """入力の [start, end) を変換して一時ファイルに書く（プロセスプールで実行）"""
+    decoder_encoding = input_encoding
+    if _is_utf8(input_encoding):
+        # 先頭の断片のUTF-8 BOMはutf-8-sigのデコーダーが除く
+        decoder_encoding = "utf-8-sig" if start == 0 else "utf-8"
+    decoder = codecs.getincrementaldecoder(decoder_encoding)()
+    encoder = codecs.getincrementalencoder(output_encoding)()
+    with open(input_path, "rb") as src, open(part_path, "wb") as dst:
+        src.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            if _worker_cancel_token is not None:
+                _worker_cancel_token.raise_if_cancelled()
+            block = src.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            dst.write(encoder.encode(decoder.decode(block)))
+        dst.write(encoder.encode(decoder.decode(b"", final=True), final=True))
+
+
+def _copy(
+    src: BinaryIO,
+    dst: BinaryIO,
+    input_encoding: str,
+    output_encoding: str,
+    total: int,
+    progress_callback: Optional[Callable[[int, int], None]],
+    cancel_token: Optional[CancelToken] = None,
+) -> int:
+    """同じ文字コード同士はBOMだけを付け替えてコピー"""
+    head = src.read(len(codecs.BOM_UTF8))
+    done = len(head)
+    if _is_utf8(input_encoding) and head == codecs.BOM_UTF8:
+        head = b""
+    if _codec_name(output_encoding) == "utf-8-sig":
+        dst.write(codecs.BOM_UTF8)
+    dst.write(head)
+    while block := src.read(TRANSCODE_BLOCK_SIZE):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        dst.write(block)
+        done += len(block)
+        if progress_callback:
+            progress_callback(done, total)
+    return dst.tell()
+
+
+def _codec_name(encoding: str) -> str:
+    return codecs.lookup(encoding).name
+
+
+def _is_utf8(encoding: str) -> bool:
+    return _codec_name(encoding) in ("utf-8", "utf-8-sig")
+
+
+def _newline_safe(encoding: str) -> bool:
+    return _codec_name(encoding) in _NEWLINE_SAFE_CODECS
+
+
+def _same_codec(input_encoding: str, output_encoding: str) -> bool:
+    """BOMの有無を除いて同じ文字コードか（BOMの扱いが異なるUTF-16/32は除く）"""
+    if _is_utf8(input_encoding) and _is_utf8(output_encoding):
+        return True
+    name = _codec_name(input_encoding)
+    return name == _codec_name(output_encoding) and not name.startswith("utf-")
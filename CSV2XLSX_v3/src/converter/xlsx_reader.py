@@ -0,0 +1,675 @@
+"""
+XLSXブック読み取りモジュール
+ブックの構成・大きさの読み取りと、シートの値を1行ずつ読むストリーミングリーダー
+
+XLSXはzipアーカイブで、シートの一覧は workbook.xml に、各シートの
+格納場所はそのリレーションシップ（workbook.xml.rels）に記録されている。
+list_sheets はこの2つの小さなXMLだけを読むため、シートの数や大きさによらず高速。
+probe_xlsx はさらに各シートXMLの先頭の dimension 要素だけを読み、
+行数・列数とzip内のサイズを返す。
+
+SheetReader はシートXMLを iterparse で読み、処理済みの行を破棄するため
+メモリ使用量はシートの大きさによらない。値の解釈（共有文字列・日付）に
+必要なブック共通の表は WorkbookTables として一度だけ読み、複数のシート
+（ワーカープロセス）で共有する。値はopenpyxlの読み取り専用モード
+（data_only=True）と同じ型で返す。
+
+共有文字列表が大きいブックでは、表を一時ファイルに書き出して mmap で
+参照する（SharedStringTable）。メモリ上に置くのは参照された文字列の
+キャッシュのみで、語彙の大きさによらない。
+"""
+
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+import datetime as dt
+import mmap
+import os
+from pathlib import Path
+import posixpath
+import shutil
+import tempfile
+from typing import Any, BinaryIO, Optional, Union
+import weakref
+from xml.etree import ElementTree
+import zipfile
+
+from openpyxl.styles.numbers import (
+    BUILTIN_FORMATS,
+    is_date_format,
+    is_timedelta_format,
+)
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    CALENDAR_WINDOWS_1900,
+    from_excel,
+    from_ISO8601,
+)
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT_REL_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+_WORKSHEET_REL_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+)
+_SHARED_STRINGS_REL_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+)
+_STYLES_REL_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+)
+
+# 共有文字列表をディスクに置く目安（sharedStrings.xml の展開後のサイズ）
+DISK_SHARED_STRINGS_MIN_SIZE = 32 * 1024 * 1024
+
+# ディスク上の共有文字列表でメモリに保持する文字列の数
+SHARED_STRINGS_CACHE_SIZE = 10000
+
+_ROW_TAG = f"{_MAIN_NS}row"
+_CELL_TAG = f"{_MAIN_NS}c"
+_VALUE_TAG = f"{_MAIN_NS}v"
+_TEXT_TAG = f"{_MAIN_NS}t"
+_RUN_TAG = f"{_MAIN_NS}r"
+_INLINE_STRING_TAG = f"{_MAIN_NS}is"
+_SHEET_DATA_TAG = f"{_MAIN_NS}sheetData"
+_DIMENSION_TAG = f"{_MAIN_NS}dimension"
+
+
+@dataclass(frozen=True)
+class SheetInfo:
+    """ブック内のワークシート"""
+
+    name: str
+    part: str  # zip内のシートXMLのパス（例: xl/worksheets/sheet1.xml）
+    state: str = "visible"  # visible / hidden / veryHidden
+
+
+def list_sheets(file_path: Path) -> list[SheetInfo]:
+    """
+    ブック内のワークシートをブックの順序で取得
+
+    グラフシート・ダイアログシートなどワークシート以外のシートは含めない。
+
+    Args:
+        file_path: XLSXファイルパス
+
+    Returns:
+        ワークシートのリスト
+
+    Raises:
+        ValueError: XLSXとして読めない場合
+    """
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            return _list_sheets(zf)
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ValueError(f"Not a valid xlsx workbook: {file_path.name} ({e})") from e
+
+
+@dataclass(frozen=True)
+class SheetProbe:
+    """ワークシートの大きさ（dimension とzip内のサイズ）"""
+
+    sheet: SheetInfo
+    rows: Optional[int]  # 最終行（ヘッダーを含む。dimension がない場合はNone）
+    columns: Optional[int]  # 最終列（dimension がない場合はNone）
+    size: int  # シートXMLのサイズ（展開後）
+    compressed_size: int  # シートXMLのサイズ（zip内）
+
+    @property
+    def name(self) -> str:
+        return self.sheet.name
+
+
+@dataclass(frozen=True)
+class XlsxProbe:
+    """XLSXブックのプローブ結果"""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    sheets: tuple[SheetProbe, ...]
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return [sheet.name for sheet in self.sheets]
+
+    @property
+    def total_rows(self) -> Optional[int]:
+        """全シートの行数の合計（dimension のないシートがあればNone）"""
+        if any(sheet.rows is None for sheet in self.sheets):
+            return None
+        return sum(sheet.rows or 0 for sheet in self.sheets)
+
+
+def probe_xlsx(file_path: Path) -> XlsxProbe:
+    """
+    XLSXブックのシート構成と大きさを取得
+
+    workbook.xml と各シートXMLの先頭（dimension 要素）だけを読むため、
+    シートの大きさによらず数ミリ秒で終わる。行数・列数は dimension の値で、
+    書式だけが設定された空行・空列も含む。
+
+    Args:
+        file_path: XLSXファイルパス
+
+    Returns:
+        プローブ結果
+
+    Raises:
+        ValueError: XLSXとして読めない場合
+    """
+    stat = file_path.stat()
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            sheets = []
+            for sheet in _list_sheets(zf):
+                info = zf.getinfo(sheet.part)
+                rows, columns = _dimension(_read_dimension_ref(zf, sheet.part))
+                sheets.append(
+                    SheetProbe(
+                        sheet=sheet,
+                        rows=rows,
+                        columns=columns,
+                        size=info.file_size,
+                        compressed_size=info.compress_size,
+                    )
+                )
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ValueError(f"Not a valid xlsx workbook: {file_path.name} ({e})") from e
+
+    return XlsxProbe(
+        path=file_path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        sheets=tuple(sheets),
+    )
+
+
+def resolve_sheet(
+    sheets: list[SheetInfo], sheet_name: Optional[Union[str, int]] = None
+) -> SheetInfo:
+    """
+    変換対象のシートを決定
+
+    Args:
+        sheets: list_sheets の結果
+        sheet_name: シート名、0始まりのインデックス、Noneの場合は最初のシート
+
+    Returns:
+        対象のシート
+
+    Raises:
+        ValueError: 該当するシートがない場合
+    """
+    if not sheets:
+        raise ValueError("No worksheets found in Excel file")
+    if sheet_name is None:
+        return sheets[0]
+    if isinstance(sheet_name, int):
+        if 0 <= sheet_name < len(sheets):
+            return sheets[sheet_name]
+        raise ValueError(
+            f"Sheet index {sheet_name} out of range (workbook has {len(sheets)} sheets)"
+        )
+    for sheet in sheets:
+        if sheet.name == sheet_name:
+            return sheet
+    names = ", ".join(repr(sheet.name) for sheet in sheets)
+    raise ValueError(f"Sheet {sheet_name!r} not found (available: {names})")
+
+
+class SharedStringTable(Sequence[str]):
+    """
+    ディスク上の共有文字列表
+
+    文字列をUTF-8で連結したファイルと、各文字列の開始位置のファイルを
+    mmap で開き、参照された文字列だけをデコードする。最近参照した文字列は
+    SHARED_STRINGS_CACHE_SIZE 件までメモリにキャッシュする。
+
+    pickle するとファイルの場所だけが渡り、受け取ったプロセス（ワーカー）は
+    同じファイルを開く。ファイルは build で作成したインスタンスの close
+    （またはガベージコレクション）で削除される。
+    """
+
+    _DATA_FILE = "strings.bin"
+    _OFFSETS_FILE = "offsets.bin"
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._cache: OrderedDict[int, str] = OrderedDict()
+        self._finalizer: Optional[weakref.finalize] = None
+        self._open()
+
+    def _open(self) -> None:
+        """ディレクトリのファイルをメモリマップで開く"""
+        with open(self.directory / self._DATA_FILE, "rb") as f:
+            self._data = _map(f)
+        with open(self.directory / self._OFFSETS_FILE, "rb") as f:
+            self._offsets_map = _map(f)
+        self._offsets = memoryview(self._offsets_map).cast("Q")
+
+    @classmethod
+    def build(cls, strings: Iterable[str]) -> "SharedStringTable":
+        """
+        文字列を一時ディレクトリのファイルに書き出して表を作成
+
+        Args:
+            strings: 共有文字列（先頭から順に）
+
+        Returns:
+            共有文字列表（close でファイルを削除する）
+        """
+        directory = Path(tempfile.mkdtemp(prefix="csv2xlsx_sst_"))
+        try:
+            offsets = array("Q", [0])
+            position = 0
+            with (
+                open(directory / cls._DATA_FILE, "wb") as data,
+                open(directory / cls._OFFSETS_FILE, "wb") as offsets_file,
+            ):
+                for text in strings:
+                    encoded = text.encode("utf-8", "surrogatepass")
+                    data.write(encoded)
+                    position += len(encoded)
+                    offsets.append(position)
+                    if len(offsets) >= 65536:
+                        offsets.tofile(offsets_file)
+                        del offsets[:]
+                offsets.tofile(offsets_file)
+            table = cls(directory)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        table._finalizer = weakref.finalize(
+            table, _remove_table, table._closables(), directory
+        )
+        return table
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("shared string index out of range")
+
+        text = self._cache.get(index)
+        if text is not None:
+            self._cache.move_to_end(index)
+            return text
+        start, end = self._offsets[index], self._offsets[index + 1]
+        text = self._data[start:end].decode("utf-8", "surrogatepass")
+        self._cache[index] = text
+        if len(self._cache) > SHARED_STRINGS_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return text
+
+    def close(self) -> None:
+        """ファイルを閉じる（build で作成した表はファイルも削除する）"""
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            _close_all(self._closables())
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"directory": self.directory}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # 受け取ったプロセスではファイルを開き直すだけで、削除は作成したプロセスが行う
+        self.directory = state["directory"]
+        self._cache = OrderedDict()
+        self._finalizer = None
+        self._open()
+
+    def _closables(self) -> list[Any]:
+        # mmap を閉じる前にその上のビューを解放する
+        return [self._offsets, self._offsets_map, self._data]
+
+
+@dataclass(frozen=True)
+class WorkbookTables:
+    """シートの値の解釈に使うブック共通の表"""
+
+    shared_strings: Sequence[str]
+    # スタイル番号ごとの日付の種類（"date" / "timedelta" / None）
+    cell_formats: tuple[Optional[str], ...] = ()
+    epoch: dt.datetime = CALENDAR_WINDOWS_1900
+
+    def close(self) -> None:
+        """ディスク上の共有文字列表を閉じて削除"""
+        if isinstance(self.shared_strings, SharedStringTable):
+            self.shared_strings.close()
+
+
+def read_workbook_tables(
+    file_path: Path, disk_backed: Optional[bool] = None
+) -> WorkbookTables:
+    """
+    共有文字列・セルの表示形式・日付の基準日を読み込む
+
+    使い終わったら close() を呼ぶ（ディスク上の共有文字列表を削除する）。
+
+    Args:
+        file_path: XLSXファイルパス
+        disk_backed: 共有文字列表をディスクに置くか（Noneの場合は
+            sharedStrings.xml が DISK_SHARED_STRINGS_MIN_SIZE 以上なら置く）
+
+    Returns:
+        ブック共通の表
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        workbook_part = _workbook_part(zf)
+        epoch = CALENDAR_WINDOWS_1900
+        for element in ElementTree.fromstring(zf.read(workbook_part)).iter(
+            f"{_MAIN_NS}workbookPr"
+        ):
+            if element.get("date1904") in ("1", "true"):
+                epoch = CALENDAR_MAC_1904
+
+        cell_formats: tuple[Optional[str], ...] = ()
+        for part in _relationship_targets(zf, workbook_part, _STYLES_REL_TYPE).values():
+            cell_formats = _read_cell_formats(zf, part)
+
+        shared_strings: Sequence[str] = []
+        for part in _relationship_targets(
+            zf, workbook_part, _SHARED_STRINGS_REL_TYPE
+        ).values():
+            if disk_backed is None:
+                disk_backed = zf.getinfo(part).file_size >= DISK_SHARED_STRINGS_MIN_SIZE
+            if disk_backed:
+                shared_strings = SharedStringTable.build(_iter_shared_strings(zf, part))
+            else:
+                shared_strings = list(_iter_shared_strings(zf, part))
+
+    return WorkbookTables(
+        shared_strings=shared_strings, cell_formats=cell_formats, epoch=epoch
+    )
+
+
+class SheetReader:
+    """
+    シートの値を1行ずつ読むリーダー
+
+    使用例:
+        with SheetReader(path, sheet, tables) as reader:
+            for row in reader:
+                ...
+
+    行は1行目から順に返し、値のない行は空のタプルになる。各行はシートの
+    範囲（dimension）の列数まで None で埋める。
+    """
+
+    def __init__(self, file_path: Path, sheet: SheetInfo, tables: WorkbookTables):
+        self.file_path = file_path
+        self.sheet = sheet
+        self.tables = tables
+        self.max_row: Optional[int] = None  # シートの範囲（記録がない場合はNone）
+        self.max_column = 0
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._events: Optional[Iterator[tuple[str, Any]]] = None
+        self._sheet_data: Optional[ElementTree.Element] = None
+
+    def __enter__(self) -> "SheetReader":
+        self._zip = zipfile.ZipFile(self.file_path)
+        self._events = ElementTree.iterparse(
+            self._zip.open(self.sheet.part), events=("start", "end")
+        )
+        # sheetData の手前にある dimension から範囲を読む
+        for event, element in self._events:
+            if event == "start" and element.tag == _SHEET_DATA_TAG:
+                self._sheet_data = element
+                break
+            if event == "end" and element.tag == _DIMENSION_TAG:
+                self._read_dimension(element.get("ref"))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._events = None
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        if self._events is None:
+            raise RuntimeError("SheetReader must be used as a context manager")
+        if self._sheet_data is None:
+            return  # sheetData のないシート
+
+        row_number = 0
+        for event, element in self._events:
+            if event != "end":
+                continue
+            if element.tag == _ROW_TAG:
+                number = element.get("r")
+                current = int(number) if number else row_number + 1
+                for _ in range(current - row_number - 1):
+                    yield ()
+                row_number = current
+                yield self._row_values(element)
+                # 処理済みの行を破棄してメモリ使用量を一定に保つ
+                self._sheet_data.clear()
+            elif element.tag == _SHEET_DATA_TAG:
+                break
+
+    def _read_dimension(self, ref: Optional[str]) -> None:
+        max_row, max_column = _dimension(ref)
+        if max_row is not None:
+            self.max_row = max_row
+        if max_column is not None:
+            self.max_column = max_column
+
+    def _row_values(self, row: ElementTree.Element) -> tuple[Any, ...]:
+        values: list[Any] = []
+        for cell in row.iter(_CELL_TAG):
+            ref = cell.get("r")
+            if ref:
+                column = _column_index(ref)
+                if column > len(values) + 1:
+                    values.extend([None] * (column - len(values) - 1))
+            values.append(self._cell_value(cell))
+        if len(values) < self.max_column:
+            values.extend([None] * (self.max_column - len(values)))
+        return tuple(values)
+
+    def _cell_value(self, cell: ElementTree.Element) -> Any:
+        data_type = cell.get("t", "n")
+        if data_type == "inlineStr":
+            inline = cell.find(_INLINE_STRING_TAG)
+            return _text_content(inline) if inline is not None else None
+
+        value = cell.findtext(_VALUE_TAG) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            number = _cast_number(value)
+            style = int(cell.get("s", 0))
+            formats = self.tables.cell_formats
+            kind = formats[style] if style < len(formats) else None
+            if kind is None:
+                return number
+            try:
+                return from_excel(
+                    number, self.tables.epoch, timedelta=kind == "timedelta"
+                )
+            except (OverflowError, ValueError):
+                return "#VALUE!"
+        if data_type == "s":
+            return self.tables.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value  # str / e
+
+
+def _iter_shared_strings(zf: zipfile.ZipFile, part: str) -> Iterator[str]:
+    """共有文字列を先頭から順に読む（ふりがな（rPh）は含めない）"""
+    root = None
+    with zf.open(part) as f:
+        for event, element in ElementTree.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = element
+            elif event == "end" and element.tag == f"{_MAIN_NS}si":
+                yield _text_content(element)
+                root.clear()
+
+
+def _map(file: BinaryIO) -> Union[mmap.mmap, bytes]:
+    """ファイル全体を読み取り専用で mmap（空のファイルは mmap できない）"""
+    if os.fstat(file.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _close_all(closables: list[Any]) -> None:
+    for closable in closables:
+        if hasattr(closable, "release"):
+            closable.release()
+        elif hasattr(closable, "close"):
+            closable.close()
+
+
+def _remove_table(closables: list[Any], directory: Path) -> None:
+    """ディスク上の共有文字列表を閉じて削除（weakref.finalize から呼ぶ）"""
+    _close_all(closables)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _text_content(element: ElementTree.Element) -> str:
+    """文字列要素（si / is）のテキスト。リッチテキストは連結する"""
+    parts = []
+    for child in element:
+        if child.tag == _TEXT_TAG:
+            parts.append(child.text or "")
+        elif child.tag == _RUN_TAG:
+            parts.extend(text.text or "" for text in child.iter(_TEXT_TAG))
+    return "".join(parts)
+
+
+def _read_cell_formats(zf: zipfile.ZipFile, part: str) -> tuple[Optional[str], ...]:
+    """スタイル番号ごとに、日付・時間の表示形式かを求める"""
+    root = ElementTree.fromstring(zf.read(part))
+    custom_formats = {
+        int(element.get("numFmtId", 0)): element.get("formatCode", "")
+        for element in root.iter(f"{_MAIN_NS}numFmt")
+    }
+    cell_xfs = root.find(f"{_MAIN_NS}cellXfs")
+    if cell_xfs is None:
+        return ()
+
+    kinds: list[Optional[str]] = []
+    for xf in cell_xfs.iter(f"{_MAIN_NS}xf"):
+        format_id = int(xf.get("numFmtId", 0))
+        number_format = custom_formats.get(format_id) or BUILTIN_FORMATS.get(
+            format_id, "General"
+        )
+        if is_timedelta_format(number_format):
+            kinds.append("timedelta")
+        elif is_date_format(number_format):
+            kinds.append("date")
+        else:
+            kinds.append(None)
+    return tuple(kinds)
+
+
+def _cast_number(value: str) -> Union[int, float]:
+    """数値のテキストを int / float に変換（openpyxlと同じ規則）"""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _column_index(ref: str) -> int:
+    """セル参照（例: "AB12"）の列番号（1始まり）"""
+    index = 0
+    for char in ref:
+        if char.isdigit():
+            break
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def _list_sheets(zf: zipfile.ZipFile) -> list[SheetInfo]:
+    workbook_part = _workbook_part(zf)
+    targets = _relationship_targets(zf, workbook_part, _WORKSHEET_REL_TYPE)
+    root = ElementTree.fromstring(zf.read(workbook_part))
+
+    sheets = []
+    for sheet in root.iter(f"{_MAIN_NS}sheet"):
+        part = targets.get(sheet.get(f"{_REL_NS}id", ""))
+        if part is None:
+            continue  # ワークシート以外
+        sheets.append(
+            SheetInfo(
+                name=sheet.get("name", ""),
+                part=part,
+                state=sheet.get("state", "visible"),
+            )
+        )
+    return sheets
+
+
+def _read_dimension_ref(zf: zipfile.ZipFile, part: str) -> Optional[str]:
+    """シートXMLの dimension 要素の範囲（sheetData より後ろは読まない）"""
+    with zf.open(part) as f:
+        for event, element in ElementTree.iterparse(f, events=("start", "end")):
+            if event == "start" and element.tag == _SHEET_DATA_TAG:
+                return None
+            if event == "end" and element.tag == _DIMENSION_TAG:
+                return element.get("ref")
+    return None
+
+
+def _dimension(ref: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """dimension の範囲（例: "A1:C10"）から最終行・最終列を求める"""
+    if not ref:
+        return None, None
+    try:
+        _, _, max_column, max_row = range_boundaries(ref)
+    except (TypeError, ValueError):
+        return None, None
+    return max_row, max_column
+
+
+def _workbook_part(zf: zipfile.ZipFile) -> str:
+    """パッケージのリレーションシップからworkbook.xmlの場所を求める"""
+    targets = _relationship_targets(zf, "", _OFFICE_DOCUMENT_REL_TYPE)
+    return next(iter(targets.values()), "xl/workbook.xml")
+
+
+def _relationship_targets(
+    zf: zipfile.ZipFile, part: str, rel_type: str
+) -> dict[str, str]:
+    """パーツのリレーションシップのうち rel_type のもの（ID → zip内のパス）"""
+    directory, name = posixpath.split(part)
+    rels_part = posixpath.join(directory, "_rels", f"{name}.rels")
+    try:
+        root = ElementTree.fromstring(zf.read(rels_part))
+    except KeyError:
+        return {}
+
+    targets = {}
+    for rel in root.iter(f"{_PKG_REL_NS}Relationship"):
+        rel_id = rel.get("Id")
+        if (
+            rel_id is None
+            or rel.get("Type") != rel_type
+            or rel.get("TargetMode") == "External"
+        ):
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target[1:]
+        else:
+            path = posixpath.normpath(posixpath.join(directory, target))
+        targets[rel_id] = path
+    return targets
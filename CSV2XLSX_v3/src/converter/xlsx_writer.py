@@ -0,0 +1,689 @@
+"""
+ストリーミングXLSXライター
+openpyxlのセルオブジェクトを生成せず、シートXMLを1行ずつ書き出す
+
+行データは一時ファイルへ逐次書き出し、保存時にzipへストリームコピーするため
+メモリ使用量は行数に依存しない。
+"""
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+import datetime as dt
+import io
+import logging
+import math
+from pathlib import Path
+import re
+import tempfile
+from typing import Any, Optional, Union
+from xml.sax.saxutils import escape
+import zipfile
+
+import numpy as np
+from openpyxl.utils.cell import coordinate_from_string, get_column_letter
+import pandas as pd
+
+from .context import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# 一時ファイルからzipへコピーするブロックサイズ
+_COPY_BLOCK_SIZE = 1024 * 1024
+
+# 既定の日時書式（pandas.to_excelと同じ表示）
+DEFAULT_DATETIME_FORMAT = "yyyy-mm-dd h:mm:ss"
+
+# Excelの日付シリアル値の基準日
+_EXCEL_EPOCH = dt.datetime(1899, 12, 30)
+
+# XML 1.0で使用できない制御文字
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_TABLE_REL_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/table"
+)
+
+
+@dataclass(frozen=True)
+class CellStyle:
+    """セルスタイル定義（StreamingXlsxWriter.register_styleで登録）"""
+
+    bold: bool = False
+    font_color: Optional[str] = None
+    fill_color: Optional[str] = None
+    border: bool = False
+    number_format: Optional[str] = None
+    horizontal: Optional[str] = None
+    vertical: Optional[str] = None
+    wrap_text: bool = False
+
+
+class StreamingXlsxWriter:
+    """
+    定数メモリでXLSXを書き出すライター
+
+    使用例:
+        with StreamingXlsxWriter(path) as writer:
+            header = writer.register_style(CellStyle(bold=True))
+            writer.append_row(["名前", "年齢"], styles=header)
+            writer.append_row(["田中", 25])
+            writer.freeze_panes = "A2"
+            writer.auto_filter = True
+
+    table_style を設定すると、1行目をヘッダーとして使用範囲全体を
+    Excelテーブル（ListObject）にする。テーブルは独自のオートフィルターを
+    持つため、その場合シートのオートフィルターは出力しない。
+
+    cancel_token を渡すと、保存時のzipへのコピーでもブロックごとに
+    キャンセル要求を確認する（ConversionCancelledError を送出）。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sheet_name: str = "Sheet1",
+        cancel_token: Optional[CancelToken] = None,
+    ):
+        self.path = Path(path)
+        self.sheet_name = sheet_name
+        self.cancel_token = cancel_token
+        self.freeze_panes: Optional[str] = None
+        self.auto_filter: bool = False
+        self.column_widths: dict[int, float] = {}
+        self.table_style: Optional[str] = None
+        self.table_row_stripes: bool = True
+
+        # 条件付き書式: (数式, 書式, 適用開始行)
+        self._conditional_formats: list[tuple[str, CellStyle, int]] = []
+        self._header: list[str] = []
+
+        self._styles: list[CellStyle] = [CellStyle()]
+        self._style_ids: dict[CellStyle, int] = {CellStyle(): 0}
+        # スタイルIDごとのs属性文字列（セル生成時の書式化を省く）
+        self._style_attrs: list[str] = [""]
+        self._datetime_style: Optional[int] = None
+        self._letters: list[str] = []
+        self._row_count = 0
+        self._max_column = 0
+        self._closed = False
+
+        # 行データの退避先（保存時にzipへストリームコピー）
+        self._spool = tempfile.TemporaryFile()  # noqa: SIM115 (close()で解放)
+        self._rows = io.TextIOWrapper(
+            self._spool, encoding="utf-8", newline="", write_through=False
+        )
+
+    def __enter__(self) -> "StreamingXlsxWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    @property
+    def row_count(self) -> int:
+        """書き込み済み行数（ヘッダー含む）"""
+        return self._row_count
+
+    @property
+    def max_column(self) -> int:
+        """書き込み済みの最大列数"""
+        return self._max_column
+
+    def register_style(self, style: CellStyle) -> int:
+        """
+        スタイルを登録してスタイルIDを返す
+
+        同一内容のスタイルは同じIDに集約される。
+
+        Args:
+            style: セルスタイル
+
+        Returns:
+            セルに指定するスタイルID
+        """
+        style_id = self._style_ids.get(style)
+        if style_id is None:
+            style_id = len(self._styles)
+            self._styles.append(style)
+            self._style_ids[style] = style_id
+            self._style_attrs.append(f' s="{style_id}"')
+        return style_id
+
+    def add_conditional_format(
+        self, formula: str, style: CellStyle, first_row: int = 1
+    ) -> None:
+        """
+        使用範囲に数式ベースの条件付き書式を追加
+
+        範囲は保存時の使用範囲（first_row行目から最終行まで）で確定する。
+        書式は塗りつぶし・罫線・フォント（太字・色）のみ反映される。
+
+        Args:
+            formula: 条件式（例: "MOD(ROW(),2)=0"）
+            style: 条件が真のときの書式
+            first_row: 適用開始行
+        """
+        self._conditional_formats.append((formula, style, first_row))
+
+    def append_row(
+        self,
+        values: Sequence[Any],
+        styles: Union[int, Sequence[int], None] = None,
+        height: Optional[float] = None,
+    ) -> None:
+        """
+        1行を書き込む
+
+        Args:
+            values: セル値のシーケンス
+            styles: 行全体のスタイルID、または列ごとのスタイルID
+            height: 行の高さ（ポイント）
+        """
+        self._row_count += 1
+        row_number = str(self._row_count)
+        column_count = len(values)
+        if column_count > self._max_column:
+            self._max_column = column_count
+        letters = self._column_letters(column_count)
+
+        style_iter: Iterable[int]
+        if styles is None or isinstance(styles, int):
+            style_iter = [styles or 0] * column_count
+        else:
+            style_iter = styles
+
+        cells = [
+            self._cell_xml(letter + row_number, value, style)
+            for letter, value, style in zip(letters, values, style_iter)
+        ]
+
+        if height is None:
+            self._rows.write(f'<row r="{row_number}">')
+        else:
+            self._rows.write(f'<row r="{row_number}" ht="{height}" customHeight="1">')
+        self._rows.write("".join(cells))
+        self._rows.write("</row>")
+
+        if self._row_count == 1:
+            self._header = ["" if value is None else str(value) for value in values]
+
+    def close(self) -> None:
+        """ワークブックをzipとして保存"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._rows.flush()
+            with zipfile.ZipFile(
+                self.path, "w", compression=zipfile.ZIP_DEFLATED
+            ) as zf:
+                zf.writestr("[Content_Types].xml", self._content_types_xml())
+                zf.writestr("_rels/.rels", self._root_rels_xml())
+                zf.writestr("xl/workbook.xml", self._workbook_xml())
+                zf.writestr("xl/_rels/workbook.xml.rels", self._workbook_rels_xml())
+                zf.writestr("xl/styles.xml", self._styles_xml())
+                self._write_sheet(zf)
+                if self._has_table():
+                    zf.writestr(
+                        "xl/worksheets/_rels/sheet1.xml.rels", self._sheet_rels_xml()
+                    )
+                    zf.writestr("xl/tables/table1.xml", self._table_xml())
+        finally:
+            self._rows.close()
+        logger.debug(f"Streaming xlsx saved: {self.path} ({self._row_count:,} rows)")
+
+    def discard(self) -> None:
+        """書き込みを中止して一時データを破棄"""
+        if self._closed:
+            return
+        self._closed = True
+        self._rows.close()
+
+    # セルXML生成
+
+    def _column_letters(self, count: int) -> list[str]:
+        """列番号→列記号の対応を必要な分だけ生成してキャッシュ"""
+        while len(self._letters) < count:
+            self._letters.append(get_column_letter(len(self._letters) + 1))
+        return self._letters
+
+    def _cell_xml(self, ref: str, value: Any, style: int) -> str:
+        """1セル分のXML文字列を生成"""
+        if value is None or value is pd.NA or value is pd.NaT:
+            return f'<c r="{ref}" s="{style}"/>' if style else ""
+
+        if isinstance(value, str):
+            text = _ILLEGAL_XML_CHARS.sub("", value)
+            space = ' xml:space="preserve"' if text != text.strip() else ""
+            style_attr = self._style_attrs[style]
+            return (
+                f'<c r="{ref}"{style_attr} t="inlineStr">'
+                f"<is><t{space}>{escape(text)}</t></is></c>"
+            )
+
+        style_attr = self._style_attrs[style]
+
+        if isinstance(value, (bool, np.bool_)):
+            return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+
+        if isinstance(value, (int, np.integer)):
+            return f'<c r="{ref}"{style_attr}><v>{int(value)}</v></c>'
+
+        if isinstance(value, (float, np.floating)):
+            number = float(value)
+            if math.isnan(number) or math.isinf(number):
+                return f'<c r="{ref}" s="{style}"/>' if style else ""
+            return f'<c r="{ref}"{style_attr}><v>{number!r}</v></c>'
+
+        if isinstance(value, (dt.datetime, dt.date)):
+            if not style:
+                style_attr = self._style_attrs[self._default_datetime_style()]
+            return f'<c r="{ref}"{style_attr}><v>{_to_excel_serial(value)!r}</v></c>'
+
+        text = _ILLEGAL_XML_CHARS.sub("", str(value))
+        return (
+            f'<c r="{ref}"{style_attr} t="inlineStr"><is><t>{escape(text)}</t></is></c>'
+        )
+
+    def _default_datetime_style(self) -> int:
+        """スタイル未指定の日時セル用スタイルID"""
+        if self._datetime_style is None:
+            self._datetime_style = self.register_style(
+                CellStyle(number_format=DEFAULT_DATETIME_FORMAT)
+            )
+        return self._datetime_style
+
+    # パーツXML生成
+
+    def _used_range(self) -> str:
+        """使用範囲（A1:XN形式）"""
+        if self._row_count == 0 or self._max_column == 0:
+            return "A1"
+        last = get_column_letter(self._max_column)
+        return f"A1:{last}{self._row_count}"
+
+    def _has_table(self) -> bool:
+        """テーブルを出力するか（ヘッダー＋データ1行以上が必要）"""
+        return (
+            bool(self.table_style)
+            and self._row_count > 1
+            and self._table_column_names() is not None
+        )
+
+    def _write_sheet(self, zf: zipfile.ZipFile) -> None:
+        """シートXMLを書き出し（行データは一時ファイルからコピー）"""
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as dest:
+            dest.write(self._sheet_head_xml().encode("utf-8"))
+            self._spool.seek(0)
+            while block := self._spool.read(_COPY_BLOCK_SIZE):
+                if self.cancel_token is not None:
+                    self.cancel_token.raise_if_cancelled()
+                dest.write(block)
+            dest.write(self._sheet_tail_xml().encode("utf-8"))
+
+    def _sheet_head_xml(self) -> str:
+        parts = [
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">',
+            f'<dimension ref="{self._used_range()}"/>',
+            '<sheetViews><sheetView workbookViewId="0">',
+        ]
+        if self.freeze_panes:
+            parts.append(self._pane_xml(self.freeze_panes))
+        parts.append("</sheetView></sheetViews>")
+        parts.append('<sheetFormatPr defaultRowHeight="15"/>')
+        if self.column_widths:
+            parts.append("<cols>")
+            for index in sorted(self.column_widths):
+                width = self.column_widths[index]
+                parts.append(
+                    f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+                )
+            parts.append("</cols>")
+        parts.append("<sheetData>")
+        return "".join(parts)
+
+    def _sheet_tail_xml(self) -> str:
+        parts = ["</sheetData>"]
+        has_table = self._has_table()
+        if (
+            self.auto_filter
+            and not has_table
+            and self._row_count > 1
+            and self._max_column > 0
+        ):
+            parts.append(f'<autoFilter ref="{self._used_range()}"/>')
+        parts.extend(self._conditional_formatting_xml())
+        parts.append(
+            '<pageMargins left="0.75" right="0.75" top="1" bottom="1" '
+            'header="0.5" footer="0.5"/>'
+        )
+        if has_table:
+            parts.append('<tableParts count="1"><tablePart r:id="rId1"/></tableParts>')
+        parts.append("</worksheet>")
+        return "".join(parts)
+
+    def _conditional_formatting_xml(self) -> list[str]:
+        """条件付き書式（dxfIdは登録順）"""
+        parts: list[str] = []
+        if self._max_column == 0:
+            return parts
+        last_column = get_column_letter(self._max_column)
+        for priority, (formula, _style, first_row) in enumerate(
+            self._conditional_formats, 1
+        ):
+            if first_row > self._row_count:
+                continue
+            sqref = f"A{first_row}:{last_column}{self._row_count}"
+            parts.append(
+                f'<conditionalFormatting sqref="{sqref}">'
+                f'<cfRule type="expression" dxfId="{priority - 1}" '
+                f'priority="{priority}"><formula>{escape(formula)}</formula>'
+                "</cfRule></conditionalFormatting>"
+            )
+        return parts
+
+    def _table_xml(self) -> str:
+        """テーブル定義（使用範囲全体、1行目がヘッダー）"""
+        ref = self._used_range()
+        columns = "".join(
+            f'<tableColumn id="{index}" name="{_attr(name)}"/>'
+            for index, name in enumerate(self._table_column_names() or [], 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<table xmlns="{_MAIN_NS}" id="1" name="Table1" displayName="Table1" '
+            f'ref="{ref}" totalsRowShown="0">'
+            f'<autoFilter ref="{ref}"/>'
+            f'<tableColumns count="{self._max_column}">{columns}</tableColumns>'
+            f'<tableStyleInfo name="{_attr(self.table_style or "")}" '
+            'showFirstColumn="0" showLastColumn="0" '
+            f'showRowStripes="{int(self.table_row_stripes)}" showColumnStripes="0"/>'
+            "</table>"
+        )
+
+    def _table_column_names(self) -> Optional[list[str]]:
+        """テーブル列名（ヘッダー行の文字列そのもの）。使用できない場合はNone"""
+        if len(self._header) != self._max_column:
+            return None
+        if not is_valid_table_header(self._header):
+            return None
+        return self._header
+
+    @staticmethod
+    def _sheet_rels_xml() -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_TABLE_REL_TYPE}" '
+            'Target="../tables/table1.xml"/>'
+            "</Relationships>"
+        )
+
+    @staticmethod
+    def _pane_xml(top_left: str) -> str:
+        """ウィンドウ枠の固定設定"""
+        column_letter, row = coordinate_from_string(top_left)
+        x_split = _column_index(column_letter) - 1
+        y_split = row - 1
+        if x_split and y_split:
+            pane = "bottomRight"
+        elif y_split:
+            pane = "bottomLeft"
+        else:
+            pane = "topRight"
+        attrs = ""
+        if x_split:
+            attrs += f' xSplit="{x_split}"'
+        if y_split:
+            attrs += f' ySplit="{y_split}"'
+        return (
+            f'<pane{attrs} topLeftCell="{top_left}" activePane="{pane}" '
+            f'state="frozen"/>'
+            f'<selection pane="{pane}" activeCell="{top_left}" sqref="{top_left}"/>'
+        )
+
+    def _workbook_xml(self) -> str:
+        name = escape(self.sheet_name, {'"': "&quot;"})
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            "<bookViews><workbookView/></bookViews>"
+            f'<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+            "</workbook>"
+        )
+
+    @staticmethod
+    def _workbook_rels_xml() -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{_PKG_REL_NS}">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+            "</Relationships>"
+        )
+
+    @staticmethod
+    def _root_rels_xml() -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{_PKG_REL_NS}">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            "</Relationships>"
+        )
+
+    def _content_types_xml(self) -> str:
+        table_override = (
+            '<Override PartName="/xl/tables/table1.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.table+xml"/>'
+            if self._has_table()
+            else ""
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{table_override}"
+            "</Types>"
+        )
+
+    def _styles_xml(self) -> str:
+        """登録済みスタイルからstyles.xmlを生成"""
+        fonts: dict[tuple, int] = {(False, None): 0}
+        fills: dict[Optional[str], int] = {None: 0}
+        num_fmts: dict[str, int] = {}
+        xfs = []
+
+        for style in self._styles:
+            font_key = (style.bold, style.font_color)
+            font_id = fonts.setdefault(font_key, len(fonts))
+            # fillId 0/1 はExcel既定（none/gray125）のため2から採番
+            fill_id = (
+                fills.setdefault(style.fill_color, len(fills) + 1)
+                if style.fill_color
+                else 0
+            )
+            num_fmt_id = 0
+            if style.number_format:
+                num_fmt_id = num_fmts.setdefault(
+                    style.number_format, 164 + len(num_fmts)
+                )
+            border_id = 1 if style.border else 0
+
+            attrs = (
+                f'numFmtId="{num_fmt_id}" fontId="{font_id}" fillId="{fill_id}" '
+                f'borderId="{border_id}" xfId="0"'
+            )
+            if num_fmt_id:
+                attrs += ' applyNumberFormat="1"'
+            if font_id:
+                attrs += ' applyFont="1"'
+            if fill_id:
+                attrs += ' applyFill="1"'
+            if border_id:
+                attrs += ' applyBorder="1"'
+
+            if style.horizontal or style.vertical or style.wrap_text:
+                alignment = ""
+                if style.horizontal:
+                    alignment += f' horizontal="{style.horizontal}"'
+                if style.vertical:
+                    alignment += f' vertical="{style.vertical}"'
+                if style.wrap_text:
+                    alignment += ' wrapText="1"'
+                xfs.append(
+                    f'<xf {attrs} applyAlignment="1"><alignment{alignment}/></xf>'
+                )
+            else:
+                xfs.append(f"<xf {attrs}/>")
+
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+            f'<styleSheet xmlns="{_MAIN_NS}">',
+        ]
+        if num_fmts:
+            parts.append(f'<numFmts count="{len(num_fmts)}">')
+            for code, fmt_id in num_fmts.items():
+                code_attr = escape(code, {'"': "&quot;"})
+                parts.append(f'<numFmt numFmtId="{fmt_id}" formatCode="{code_attr}"/>')
+            parts.append("</numFmts>")
+
+        parts.append(f'<fonts count="{len(fonts)}">')
+        for bold, color in fonts:
+            parts.append(
+                "<font>"
+                + ("<b/>" if bold else "")
+                + '<sz val="11"/>'
+                + (f'<color rgb="FF{color}"/>' if color else '<color theme="1"/>')
+                + '<name val="Calibri"/><family val="2"/><scheme val="minor"/>'
+                "</font>"
+            )
+        parts.append("</fonts>")
+
+        parts.append(f'<fills count="{len(fills) + 1}">')
+        parts.append('<fill><patternFill patternType="none"/></fill>')
+        parts.append('<fill><patternFill patternType="gray125"/></fill>')
+        for color in fills:
+            if color is None:
+                continue
+            parts.append(
+                '<fill><patternFill patternType="solid">'
+                f'<fgColor rgb="FF{color}"/><bgColor rgb="FF{color}"/>'
+                "</patternFill></fill>"
+            )
+        parts.append("</fills>")
+
+        parts.append(
+            '<borders count="2">'
+            "<border><left/><right/><top/><bottom/><diagonal/></border>"
+            '<border><left style="thin"/><right style="thin"/>'
+            '<top style="thin"/><bottom style="thin"/><diagonal/></border>'
+            "</borders>"
+        )
+        parts.append(
+            '<cellStyleXfs count="1">'
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+            "</cellStyleXfs>"
+        )
+        parts.append(f'<cellXfs count="{len(xfs)}">')
+        parts.extend(xfs)
+        parts.append("</cellXfs>")
+        parts.append(
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/>'
+            "</cellStyles>"
+        )
+        if self._conditional_formats:
+            parts.append(f'<dxfs count="{len(self._conditional_formats)}">')
+            for _formula, style, _first_row in self._conditional_formats:
+                parts.append(_dxf_xml(style))
+            parts.append("</dxfs>")
+        parts.append("</styleSheet>")
+        return "".join(parts)
+
+
+def is_valid_table_header(names: Sequence[str]) -> bool:
+    """
+    ヘッダーがExcelテーブルの列名として使用できるか
+
+    テーブル列名は空でなく、大文字小文字を区別せず一意で、改行を含まない
+    必要がある（満たさない場合Excelがファイルを修復扱いにする）。
+
+    Args:
+        names: ヘッダー行の文字列
+
+    Returns:
+        使用できればTrue
+    """
+    seen: set[str] = set()
+    for name in names:
+        key = str(name).lower()
+        if not key.strip() or key in seen or "\n" in key or "\r" in key:
+            return False
+        seen.add(key)
+    return bool(names)
+
+
+def _dxf_xml(style: CellStyle) -> str:
+    """条件付き書式用の差分書式（dxf）"""
+    parts = ["<dxf>"]
+    if style.bold or style.font_color:
+        parts.append("<font>")
+        if style.bold:
+            parts.append("<b/>")
+        if style.font_color:
+            parts.append(f'<color rgb="FF{style.font_color}"/>')
+        parts.append("</font>")
+    if style.fill_color:
+        parts.append(
+            '<fill><patternFill patternType="solid">'
+            f'<bgColor rgb="FF{style.fill_color}"/></patternFill></fill>'
+        )
+    if style.border:
+        parts.append(
+            '<border><left style="thin"/><right style="thin"/>'
+            '<top style="thin"/><bottom style="thin"/></border>'
+        )
+    parts.append("</dxf>")
+    return "".join(parts)
+
+
+def _attr(value: str) -> str:
+    """XML属性値のエスケープ"""
+    return escape(_ILLEGAL_XML_CHARS.sub("", value), {'"': "&quot;"})
+
+
+def _column_index(letter: str) -> int:
+    """列記号→列番号（A=1）"""
+    index = 0
+    for char in letter:
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index
+
+
+def _to_excel_serial(value: Union[dt.datetime, dt.date]) -> float:
+    """日付・日時をExcelシリアル値に変換"""
+    if not isinstance(value, dt.datetime):
+        value = dt.datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    delta = value - _EXCEL_EPOCH
+    return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
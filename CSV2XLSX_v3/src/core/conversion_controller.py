@@ -1,11 +1,25 @@
 """
 変換処理のコントローラークラス
 変換エンジンの統合管理と非同期処理制御
+
+max_threads が2以上の場合は、複数ファイルをプロセスプールで並列に変換する
+（pandas・openpyxlの処理はGILを解放しないため、スレッドではなくプロセス）。
+行単位の進捗はキューで親プロセスに送り、ファイル単位の進捗・結果は
+変換が完了した順に、既存のコールバックへ通知する。
+大きなCSVの文字コード変換・全シート出力の変換エンジン内のプロセス数も
+max_threads に従う（並列変換のワーカー内では1にし、プロセスプールを入れ子にしない）。
+
+キャンセルは変換中のファイルにも変換エンジンのキャンセル要求（CancelToken）で
+伝わり、一定行数・ブロックごとに確認されるため1秒以内に停止する
+（並列変換ではワーカーとプロセス間で共有するイベントを使う）。
 """
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from enum import Enum
 import logging
+import multiprocessing
+from multiprocessing.queues import Queue
 from pathlib import Path
 import sys
 import threading
@@ -15,13 +29,25 @@ from typing import Any, Callable, Optional
 current_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(current_dir))
 
-from src.converter import CSVConverter, CSVEncodingConverter, ExcelToCSVConverter
-from src.converter.encoding import detect_encoding
+from src.converter import (
+    CancelToken,
+    ConversionContext,
+    CSVConverter,
+    CSVEncodingConverter,
+    ExcelToCSVConverter,
+    ProgressSink,
+)
+from src.converter.data_types import TableSchema
+from src.converter.metadata_cache import MetadataCache
+from src.converter.probe import FileProbe
 
 from .file_manager import ConversionDirection, FileInfo, FileType
 
 logger = logging.getLogger(__name__)
 
+# ワーカープロセスの変換コントローラー（_init_worker で設定）
+_worker_controller: Optional["ConversionController"] = None
+
 
 class ConversionStatus(Enum):
     """変換ステータス"""
@@ -56,6 +82,11 @@ class ConversionSettings:
     add_bom: bool = True
     auto_width: bool = True  # Excel列幅自動調整
     freeze_header: bool = True  # Excelヘッダー固定
+    style_banding: str = "cells"  # 罫線・交互色の出力方式（cells/table/conditional）
+    schema_file: Optional[Path] = None  # CSV→Excelの型指定（スキーマファイル）
+    export_all_sheets: bool = (
+        False  # Excel→CSVで全シートを<ファイル名>_<シート名>.csvに出力
+    )
     overwrite_existing: bool = False
     chunk_size: int = 10000
     max_threads: int = 1
@@ -64,17 +95,26 @@ class ConversionSettings:
 class ConversionController:
     """変換処理コントローラー"""
 
-    def __init__(self):
-        # 変換エンジン
-        self.csv_converter = CSVConverter()
+    def __init__(self, metadata_cache: Optional[MetadataCache] = None):
+        """
+        Args:
+            metadata_cache: 検出結果・行数・スキーマのキャッシュ（省略時は使わない）
+        """
+        # 変換エンジン（ジョブごとの状態を持たないため、全ファイルで共有する）
+        self.metadata_cache = metadata_cache
+        self.csv_converter = CSVConverter(metadata_cache=metadata_cache)
         self.excel_converter = ExcelToCSVConverter()
         self.encoding_converter = (
             CSVEncodingConverter()
         )  # 新規: CSV→CSV エンコーディング変換
+        # 変換エンジン内のプロセス数（Noneなら settings.max_threads）。
+        # 並列変換のワーカーでは1にして、プロセスプールを入れ子にしない
+        self.engine_max_workers: Optional[int] = None
 
         # 処理状態
         self.is_converting = False
         self.cancel_requested = False
+        self.cancel_token = CancelToken()
         self.current_results: list[ConversionResult] = []
 
         # コールバック
@@ -134,6 +174,9 @@ class ConversionController:
         # 状態初期化
         self.is_converting = True
         self.cancel_requested = False
+        # 並列変換ではワーカープロセスとキャンセル要求を共有する
+        parallel = min(settings.max_threads, len(files)) > 1
+        self.cancel_token = CancelToken(multiprocessing.Event() if parallel else None)
         self.current_results = []
 
         # バックグラウンドで変換実行
@@ -148,12 +191,17 @@ class ConversionController:
         """変換のキャンセル"""
         if self.is_converting:
             self.cancel_requested = True
+            self.cancel_token.cancel()
             logger.info("Conversion cancellation requested")
 
     def _perform_conversion(self, files: list[FileInfo], settings: ConversionSettings):
         """実際の変換処理（バックグラウンド）"""
         try:
             total_files = len(files)
+            workers = min(settings.max_threads, total_files)
+            if workers > 1:
+                self._perform_parallel_conversion(files, settings, workers)
+                return
 
             for i, file_info in enumerate(files):
                 if self.cancel_requested:
@@ -166,6 +214,8 @@ class ConversionController:
                 # ログ出力
                 if result.status == ConversionStatus.COMPLETED:
                     logger.info(f"Conversion successful: {file_info.name}")
+                elif result.status == ConversionStatus.CANCELLED:
+                    logger.info(f"Conversion cancelled: {file_info.name}")
                 else:
                     logger.error(
                         f"Conversion failed: {file_info.name} - {result.error_message}"
@@ -191,6 +241,112 @@ class ConversionController:
         finally:
             self.is_converting = False
 
+    def _perform_parallel_conversion(
+        self, files: list[FileInfo], settings: ConversionSettings, workers: int
+    ):
+        """
+        複数ファイルをプロセスプールで並列に変換
+
+        大きいファイルから投入し、完了した順に結果・進捗を通知する。
+        キャンセル時は未着手のファイルを取り消す（変換中のファイルは完了を待つ）。
+        """
+        logger.info(f"Converting {len(files)} files with {workers} processes")
+        total_files = len(files)
+        cache_file = self.metadata_cache.cache_file if self.metadata_cache else None
+
+        # 行単位の進捗はワーカーからキュー経由で受け取る
+        row_queue: Optional[Queue[Any]] = (
+            multiprocessing.Queue() if self.row_progress_callback else None
+        )
+        pump_thread = None
+        if row_queue is not None:
+            pump_thread = threading.Thread(
+                target=self._pump_row_progress, args=(row_queue,), daemon=True
+            )
+            pump_thread.start()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(cache_file, row_queue, self.cancel_token),
+            ) as pool:
+                futures = {
+                    pool.submit(_convert_in_worker, file_info, settings): file_info
+                    for file_info in sorted(files, key=lambda info: -info.size)
+                }
+                for future in as_completed(futures):
+                    file_info = futures[future]
+                    try:
+                        result, cache_entries = future.result()
+                        result = self._merge_worker_result(
+                            file_info, result, cache_entries
+                        )
+                    except Exception as e:
+                        result = ConversionResult(
+                            file_info=file_info,
+                            output_path=None,
+                            status=ConversionStatus.FAILED,
+                            error_message=str(e),
+                        )
+                    self.current_results.append(result)
+
+                    if result.status == ConversionStatus.COMPLETED:
+                        logger.info(f"Conversion successful: {file_info.name}")
+                    elif result.status == ConversionStatus.CANCELLED:
+                        logger.info(f"Conversion cancelled: {file_info.name}")
+                    else:
+                        logger.error(
+                            f"Conversion failed: {file_info.name} - {result.error_message}"
+                        )
+
+                    if self.progress_callback:
+                        self.progress_callback(
+                            len(self.current_results), total_files, file_info
+                        )
+
+                    if self.cancel_requested:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+        finally:
+            if row_queue is not None and pump_thread is not None:
+                row_queue.put(None)
+                pump_thread.join()
+                row_queue.close()
+
+        if not self.cancel_requested:
+            if self.completion_callback:
+                self.completion_callback(self.current_results.copy())
+        else:
+            logger.info("Conversion was cancelled")
+
+    def _pump_row_progress(self, row_queue: Any) -> None:
+        """ワーカーから届いた行進捗をコールバックに渡す（Noneで終了）"""
+        while True:
+            item = row_queue.get()
+            if item is None:
+                return
+            if self.row_progress_callback:
+                self.row_progress_callback(*item)
+
+    def _merge_worker_result(
+        self,
+        file_info: FileInfo,
+        result: ConversionResult,
+        cache_entries: list[tuple[Any, ...]],
+    ) -> ConversionResult:
+        """ワーカーの変換結果を呼び出し元のFileInfo・キャッシュに反映"""
+        worker_info = result.file_info
+        file_info.probe = worker_info.probe
+        file_info.schema = worker_info.schema
+        file_info.xlsx_probe = worker_info.xlsx_probe
+        file_info.detected_encoding = worker_info.detected_encoding
+        result.file_info = file_info
+        if self.metadata_cache is not None:
+            for entry in cache_entries:
+                self.metadata_cache.put(*entry)
+        return result
+
     def _convert_single_file(
         self, file_info: FileInfo, settings: ConversionSettings
     ) -> ConversionResult:
@@ -218,6 +374,16 @@ class ConversionController:
 
             processing_time = time.time() - start_time
 
+            if not success and self.cancel_token.cancelled:
+                # 変換エンジンが中断し、書きかけの出力は削除済み
+                return ConversionResult(
+                    file_info=file_info,
+                    output_path=None,
+                    status=ConversionStatus.CANCELLED,
+                    error_message="キャンセルされました",
+                    processing_time=processing_time,
+                )
+
             return ConversionResult(
                 file_info=file_info,
                 output_path=output_path if success else None,
@@ -271,6 +437,68 @@ class ConversionController:
         logger.debug("use_output_folder=False, 入力ファイルと同じディレクトリに出力")
         return file_info.path.parent / output_name
 
+    def _row_callback(
+        self, file_info: FileInfo
+    ) -> Optional[Callable[[int, int], None]]:
+        """行進捗コールバックをラップ（ファイル名を追加）"""
+        if not self.row_progress_callback:
+            return None
+        callback = self.row_progress_callback
+
+        def row_callback(current: int, total: int) -> None:
+            callback(current, total, file_info.name)
+
+        return row_callback
+
+    def _engine_workers(self, settings: ConversionSettings) -> int:
+        """変換エンジン内で使うプロセス数（大きなCSVの文字コード変換・全シート出力）"""
+        if self.engine_max_workers is not None:
+            return self.engine_max_workers
+        return max(settings.max_threads, 1)
+
+    def _job_context(self, file_info: FileInfo) -> ConversionContext:
+        """ファイルごとの変換コンテキスト（検出結果・キャンセル要求・進捗の通知先）"""
+        probe = xlsx_probe = None
+        if file_info.file_type == FileType.CSV:
+            probe = file_info.ensure_probe(self.metadata_cache)
+        elif file_info.is_xlsx:
+            xlsx_probe = file_info.ensure_xlsx_probe()
+        return ConversionContext(
+            probe=probe,
+            schema=file_info.schema,
+            xlsx_probe=xlsx_probe,
+            cancel_token=self.cancel_token,
+            progress=ProgressSink(row_progress=self._row_callback(file_info)),
+        )
+
+    def _convert_excel_to_csv(
+        self,
+        file_info: FileInfo,
+        output_path: Path,
+        settings: ConversionSettings,
+        encoding: str,
+    ) -> bool:
+        """Excel → CSV（設定に応じて最初のシートのみ、または全シート）"""
+        context = self._job_context(file_info)
+        if settings.export_all_sheets:
+            return bool(
+                self.excel_converter.convert_all_sheets(
+                    file_info.path,
+                    output_path,
+                    encoding=encoding,
+                    add_bom=settings.add_bom,
+                    max_workers=self._engine_workers(settings),
+                    context=context,
+                )
+            )
+        return self.excel_converter.convert_to_csv(
+            file_info.path,
+            output_path,
+            encoding=encoding,
+            add_bom=settings.add_bom,
+            context=context,
+        )
+
     def _execute_conversion(
         self, file_info: FileInfo, output_path: Path, settings: ConversionSettings
     ) -> bool:
@@ -282,34 +510,29 @@ class ConversionController:
 
                 if direction == ConversionDirection.CSV_TO_EXCEL:
                     # CSV → Excel
-                    style_options = {}
+                    style_options: dict[str, Any] = {}
                     if settings.apply_styles:
                         style_options["header_bold"] = True
                         style_options["borders"] = True
                         style_options["alternating_rows"] = True
+                        style_options["banding"] = settings.style_banding
                     if settings.auto_width:
                         style_options["auto_width"] = True
                     if settings.freeze_header:
                         style_options["freeze_header"] = True
 
-                    # 行進捗コールバックをラップ（ファイル名を追加）
-                    def row_callback(current: int, total: int) -> None:
-                        if self.row_progress_callback:
-                            self.row_progress_callback(current, total, file_info.name)
-
                     return self.csv_converter.convert_to_excel(
                         file_info.path,
                         output_path,
-                        row_progress_callback=row_callback
-                        if self.row_progress_callback
-                        else None,
                         style_options=style_options if style_options else None,
+                        schema_path=settings.schema_file,
+                        context=self._job_context(file_info),
                     )
 
                 if direction == ConversionDirection.EXCEL_TO_CSV:
                     # Excel → CSV
-                    return self.excel_converter.convert_to_csv(
-                        file_info.path, output_path, add_bom=settings.add_bom
+                    return self._convert_excel_to_csv(
+                        file_info, output_path, settings, encoding="utf-8"
                     )
 
                 if direction == ConversionDirection.CSV_TO_CSV_UTF8:
@@ -319,6 +542,8 @@ class ConversionController:
                         output_path,
                         output_encoding="utf-8",
                         add_bom=True,
+                        context=self._job_context(file_info),
+                        max_workers=self._engine_workers(settings),
                     )
 
                 if direction == ConversionDirection.CSV_TO_CSV_SJIS:
@@ -328,6 +553,8 @@ class ConversionController:
                         output_path,
                         output_encoding="shift_jis",
                         add_bom=False,
+                        context=self._job_context(file_info),
+                        max_workers=self._engine_workers(settings),
                     )
 
             # 従来の設定ベースの変換（後方互換性）
@@ -339,6 +566,7 @@ class ConversionController:
                         style_options["header_bold"] = True
                         style_options["borders"] = True
                         style_options["alternating_rows"] = True
+                        style_options["banding"] = settings.style_banding
                     if settings.auto_width:
                         style_options["auto_width"] = True
                     if settings.freeze_header:
@@ -348,34 +576,27 @@ class ConversionController:
                         file_info.path,
                         output_path,
                         style_options=style_options if style_options else None,
+                        schema_path=settings.schema_file,
+                        context=self._job_context(file_info),
                     )
                 # CSV → CSV (再エンコード)
-                import pandas as pd
-
-                # 入力エンコーディングは常に自動検出
-                input_encoding = detect_encoding(file_info.path)
-                df = pd.read_csv(file_info.path, encoding=input_encoding)
-
-                # 出力エンコーディングの設定（UIで選択された値を使用）
-                if settings.encoding == "utf-8":
-                    output_encoding = "utf-8-sig" if settings.add_bom else "utf-8"
-                elif settings.encoding == "shift_jis":
-                    output_encoding = "shift_jis"
-                else:
-                    # デフォルトはUTF-8
-                    output_encoding = "utf-8-sig" if settings.add_bom else "utf-8"
-
-                df.to_csv(output_path, index=False, encoding=output_encoding)
-                return True
+                # 出力エンコーディングはUIで選択された値（既定はUTF-8）
+                return self.encoding_converter.convert_encoding(
+                    file_info.path,
+                    output_path,
+                    output_encoding="shift_jis"
+                    if settings.encoding == "shift_jis"
+                    else "utf-8",
+                    add_bom=settings.add_bom,
+                    context=self._job_context(file_info),
+                    max_workers=self._engine_workers(settings),
+                )
 
             elif file_info.file_type == FileType.EXCEL:
                 if settings.output_format == "csv":
                     # Excel → CSV
-                    return self.excel_converter.convert_to_csv(
-                        file_info.path,
-                        output_path,
-                        encoding=settings.encoding,
-                        add_bom=settings.add_bom,
+                    return self._convert_excel_to_csv(
+                        file_info, output_path, settings, encoding=settings.encoding
                     )
                 # Excel → Excel (コピー)
                 import shutil
@@ -428,3 +649,54 @@ class ConversionController:
             self.conversion_thread.join(timeout)
             return not self.conversion_thread.is_alive()
         return True
+
+
+class _WorkerMetadataCache(MetadataCache):
+    """
+    ワーカープロセス用のメタデータキャッシュ
+
+    参照はキャッシュファイルから行い、登録は保存せずに記録する。
+    記録した登録は親プロセスが反映する（複数プロセスからの書き込みで
+    互いの更新を失わないため）。
+    """
+
+    def __init__(self, cache_file: Path):
+        super().__init__(cache_file)
+        self.pending: list[tuple[Any, ...]] = []
+
+    def put(
+        self,
+        file_path: Path,
+        probe: FileProbe,
+        schema: Optional[TableSchema] = None,
+    ) -> None:
+        self.pending.append((file_path, probe, schema))
+
+
+def _init_worker(
+    cache_file: Optional[Path], row_queue: Any, cancel_token: CancelToken
+) -> None:
+    """ワーカープロセスの初期化（変換コントローラーを作成）"""
+    global _worker_controller
+    metadata_cache = _WorkerMetadataCache(cache_file) if cache_file else None
+    _worker_controller = ConversionController(metadata_cache=metadata_cache)
+    _worker_controller.cancel_token = cancel_token
+    # バッチのワーカーが変換エンジン内でさらにプロセスプールを作らないようにする
+    _worker_controller.engine_max_workers = 1
+    if row_queue is not None:
+        _worker_controller.set_row_progress_callback(
+            lambda current, total, file_name: row_queue.put((current, total, file_name))
+        )
+
+
+def _convert_in_worker(
+    file_info: FileInfo, settings: ConversionSettings
+) -> tuple[ConversionResult, list[tuple[Any, ...]]]:
+    """1ファイルを変換（プロセスプールで実行）"""
+    assert _worker_controller is not None
+    result = _worker_controller._convert_single_file(file_info, settings)
+    metadata_cache = _worker_controller.metadata_cache
+    cache_entries: list[tuple[Any, ...]] = []
+    if isinstance(metadata_cache, _WorkerMetadataCache):
+        cache_entries, metadata_cache.pending = metadata_cache.pending, []
+    return result, cache_entries
@@ -98,6 +98,88 @@ class FileInfo:
     output_path: Optional[Path] = None  # 出力先パス
     conversion_direction: Optional[ConversionDirection] = None  # 変換方向
     detected_encoding: Optional[str] = None  # 検出されたエンコーディング
+    probe: Optional[Any] = None  # CSVの検出結果（FileProbe）
+    schema: Optional[Any] = None  # 前回の変換で確定した列の型（TableSchema）
+    xlsx_probe: Optional[Any] = None  # Excel（xlsx）のシート構成と大きさ（XlsxProbe）
+
+    def ensure_probe(self, metadata_cache: Optional[Any] = None) -> Any:
+        """
+        CSVの検出結果（FileProbe）を取得
+
+        ファイル追加時の検出結果があればそれを使い、未検出の場合やその後に
+        ファイルが変更された場合のみ検出する（キャッシュがあれば優先）。
+
+        Args:
+            metadata_cache: 検出結果のキャッシュ（MetadataCache）
+
+        Returns:
+            検出結果
+        """
+        stat = self.path.stat()
+        if self.probe is None or (self.probe.size, self.probe.mtime_ns) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            if metadata_cache is not None:
+                metadata = metadata_cache.lookup(self.path)
+                self.probe, self.schema = metadata.probe, metadata.schema
+            else:
+                from src.converter.probe import probe_file
+
+                self.probe, self.schema = probe_file(self.path), None
+            self.detected_encoding = self.probe.encoding
+        return self.probe
+
+    def ensure_xlsx_probe(self) -> Any:
+        """
+        Excel（xlsx）のシート構成と大きさ（XlsxProbe）を取得
+
+        ブックのメタデータのみを読むため、シートの大きさによらず高速。
+        ファイルが変更された場合のみ取得し直す。
+
+        Returns:
+            プローブ結果
+        """
+        stat = self.path.stat()
+        if self.xlsx_probe is None or (
+            self.xlsx_probe.size,
+            self.xlsx_probe.mtime_ns,
+        ) != (stat.st_size, stat.st_mtime_ns):
+            from src.converter.xlsx_reader import probe_xlsx
+
+            self.xlsx_probe = probe_xlsx(self.path)
+        return self.xlsx_probe
+
+    def validate_contents(self) -> bool:
+        """
+        検出結果を使って中身を検証し、変換できないファイルを無効にする
+
+        CSVは先頭の行を読み込めるか、Excel（xlsx）はデータ行があるかを
+        確認する。検出結果がない場合は検証しない。警告はログに記録する。
+
+        Returns:
+            有効なファイルか
+        """
+        from src.utils.validators import DataValidator
+
+        if self.file_type == FileType.CSV and self.probe is not None:
+            result = DataValidator.validate_csv_structure(self.path, probe=self.probe)
+        elif self.is_xlsx and self.xlsx_probe is not None:
+            result = DataValidator.validate_excel_file(self.path, probe=self.xlsx_probe)
+        else:
+            return self.is_valid
+
+        for warning in result["warnings"]:
+            logger.info(f"{self.name}: {warning}")
+        if not result["is_valid"]:
+            self.is_valid = False
+            self.error_message = " / ".join(result["errors"])
+        return self.is_valid
+
+    @property
+    def is_xlsx(self) -> bool:
+        """シート構成を読めるExcelファイル（.xlsx）か"""
+        return self.file_type == FileType.EXCEL and self.path.suffix.lower() == ".xlsx"
 
     @classmethod
     def from_path(cls, path: Path) -> "FileInfo":
@@ -147,7 +229,12 @@ class FileInfo:
 class FileManager:
     """ファイル管理クラス"""
 
-    def __init__(self):
+    def __init__(self, metadata_cache: Optional[Any] = None):
+        """
+        Args:
+            metadata_cache: 検出結果のキャッシュ（MetadataCache、省略時は使わない）
+        """
+        self.metadata_cache = metadata_cache
         self.files: list[FileInfo] = []
         self.supported_extensions = {".csv", ".xlsx", ".xls"}
         self.change_callbacks: list[Callable[[list[FileInfo]], None]] = []
@@ -210,11 +297,7 @@ class FileManager:
                 # CSVの場合はエンコーディング検出
                 if file_info.file_type == FileType.CSV:
                     try:
-                        from converter.encoding import (  # type: ignore[import-untyped]
-                            detect_encoding,
-                        )
-
-                        file_info.detected_encoding = detect_encoding(path)
+                        file_info.ensure_probe(self.metadata_cache)
                         logger.debug(
                             f"Detected encoding for {path.name}: {file_info.detected_encoding}"
                         )
@@ -224,6 +307,15 @@ class FileManager:
                         )
                         file_info.detected_encoding = "utf-8"  # デフォルト
 
+                # Excelの場合はシート構成を取得
+                elif file_info.is_xlsx:
+                    try:
+                        file_info.ensure_xlsx_probe()
+                    except Exception as e:
+                        logger.warning(f"Failed to read sheets of {path.name}: {e}")
+
+            # 検出結果を使って中身を検証（読み込めないファイルは追加しない）
+            if file_info.validate_contents():
                 # 変換方向の自動判定
                 file_info.conversion_direction = auto_detect_conversion_direction(
                     file_info
@@ -36,6 +36,9 @@ class AppSettings:
     overwrite_existing: bool = False
     max_threads: int = 1
     chunk_size: int = 10000
+    schema_file: str = ""  # CSV→Excelの型指定（スキーマファイル、空なら自動検出）
+    export_all_sheets: bool = False  # Excel→CSVで全シートを出力
+    style_banding: str = "cells"  # 罫線・交互色の出力方式（cells/table/conditional）
 
     # 詳細設定
     show_advanced_settings: bool = False
@@ -136,6 +139,11 @@ class SettingsManager:
             "overwrite_existing": self.settings.overwrite_existing,
             "max_threads": self.settings.max_threads,
             "chunk_size": self.settings.chunk_size,
+            "schema_file": (
+                Path(self.settings.schema_file) if self.settings.schema_file else None
+            ),
+            "export_all_sheets": self.settings.export_all_sheets,
+            "style_banding": self.settings.style_banding,
         }
 
     def get_ui_settings(self) -> dict[str, Any]:
@@ -5,6 +5,7 @@ PySide6 + PyInstaller One-File Mode対応
 """
 
 import logging
+import multiprocessing
 from pathlib import Path
 import sys
 
@@ -126,8 +127,9 @@ def main():
 
 
 if __name__ == "__main__":
+    # 並列変換のプロセスプール（変換コントローラー・transcode・excel_to_csv）用。
+    # PyInstallerでパッケージ化したWindows版では、ワーカープロセスが
+    # このエントリーポイントを再実行するため、GUIを起動する前に呼ぶ必要がある
+    # （呼ばないとワーカーごとにメインウィンドウが開く）
+    multiprocessing.freeze_support()
     sys.exit(main())
-
-
-if __name__ == "__main__":
-    main()
@@ -3,6 +3,7 @@ PySide6ベースのメインウィンドウ実装
 CSV2XLSX v3 (VERSION.txtから動的にバージョンを読み込み)
 """
 
+from dataclasses import replace
 import logging
 from pathlib import Path
 import sys
@@ -22,6 +23,7 @@ from PySide6.QtWidgets import (
 current_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(current_dir))
 
+from src.converter.metadata_cache import MetadataCache
 from src.core import (
     ConversionController,
     ConversionResult,
@@ -78,8 +80,12 @@ class MainWindow(QMainWindow):
         self.version = get_version()
 
         # コアコンポーネント初期化
-        self.file_manager = FileManager()
-        self.conversion_controller = ConversionController()
+        # 検出結果はセッションをまたいでキャッシュし、同じファイルの再追加を高速化
+        self.metadata_cache = MetadataCache()
+        self.file_manager = FileManager(metadata_cache=self.metadata_cache)
+        self.conversion_controller = ConversionController(
+            metadata_cache=self.metadata_cache
+        )
         self.settings_manager = SettingsManager()
 
         # バックグラウンドWorker管理
@@ -402,17 +408,7 @@ class MainWindow(QMainWindow):
                 if overwrite:
                     logger.info("ユーザーが上書きを選択")
                     # ユーザーが上書きを選択した場合、一時的に上書きを許可
-                    settings = ConversionSettings(
-                        output_format=settings.output_format,
-                        output_directory=settings.output_directory,
-                        use_output_folder=settings.use_output_folder,
-                        encoding=settings.encoding,
-                        apply_styles=settings.apply_styles,
-                        auto_width=settings.auto_width,
-                        freeze_header=settings.freeze_header,
-                        add_bom=settings.add_bom,
-                        overwrite_existing=True,  # 上書きを許可
-                    )
+                    settings = replace(settings, overwrite_existing=True)
                 else:
                     # キャンセルされた場合は変換を中止
                     logger.info("ユーザーが上書きをキャンセル")
@@ -766,7 +762,9 @@ class MainWindow(QMainWindow):
         existing_paths = self.file_manager.get_existing_paths()
 
         # Workerを作成
-        self.file_loader_worker = FileLoaderWorker(file_paths, existing_paths)
+        self.file_loader_worker = FileLoaderWorker(
+            file_paths, existing_paths, metadata_cache=self.metadata_cache
+        )
 
         # シグナル接続
         self.file_loader_worker.progress.connect(self._on_file_loading_progress)
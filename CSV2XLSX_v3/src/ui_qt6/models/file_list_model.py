@@ -104,6 +104,8 @@ class FileListModel(QAbstractTableModel):
                 return str(file_info.path)
             if col == self.COL_STATUS and not file_info.is_valid:
                 return file_info.error_message or "ファイルが無効です"
+            if col == self.COL_TYPE and file_info.xlsx_probe is not None:
+                return self._format_sheets(file_info.xlsx_probe)
 
         return None
 
@@ -201,6 +203,17 @@ class FileListModel(QAbstractTableModel):
 
     # ユーティリティメソッド
 
+    @staticmethod
+    def _format_sheets(probe: Any) -> str:
+        """Excelのシート構成をツールチップ用に整形"""
+        lines = []
+        for sheet in probe.sheets:
+            if sheet.rows is None:
+                lines.append(f"{sheet.name}: 行数不明")
+            else:
+                lines.append(f"{sheet.name}: {sheet.rows:,}行 × {sheet.columns}列")
+        return "\n".join(lines) or "シートがありません"
+
     @staticmethod
     def _format_file_type(file_type: FileType) -> str:
         """ファイルタイプを文字列に変換"""
@@ -23,6 +23,13 @@ from src.core import ConversionSettings, SettingsManager
 
 logger = logging.getLogger(__name__)
 
+# 罫線・交互色の出力方式（styles.BANDING_MODES）と表示名
+BANDING_LABELS = {
+    "cells": "罫線・交互色: セル書式",
+    "table": "罫線・交互色: テーブル",
+    "conditional": "罫線・交互色: 条件付き書式",
+}
+
 
 class CompactSettingsPanel(QWidget):
     """
@@ -116,6 +123,9 @@ class CompactSettingsPanel(QWidget):
         self.apply_styles_cb = QCheckBox("セルの装飾を適用")
         self.auto_width_cb = QCheckBox("列幅を自動調整")
         self.freeze_header_cb = QCheckBox("ヘッダー行を固定")
+        self.banding_combo = QComboBox()
+        for mode, label in BANDING_LABELS.items():
+            self.banding_combo.addItem(label, mode)
 
         # 共通オプション
         self.add_bom_cb = QCheckBox("UTF-8 BOMを追加")
@@ -123,6 +133,7 @@ class CompactSettingsPanel(QWidget):
 
         layout.addWidget(self.use_output_folder_cb)
         layout.addWidget(self.apply_styles_cb)
+        layout.addWidget(self.banding_combo)
         layout.addWidget(self.auto_width_cb)
         layout.addWidget(self.freeze_header_cb)
         layout.addWidget(self.add_bom_cb)
@@ -146,9 +157,13 @@ class CompactSettingsPanel(QWidget):
         # エンコーディング変更時
         self.encoding_combo.currentIndexChanged.connect(self._on_setting_changed)
 
+        # 罫線・交互色の出力方式変更時
+        self.banding_combo.currentIndexChanged.connect(self._on_setting_changed)
+
         # チェックボックス変更時
         self.use_output_folder_cb.stateChanged.connect(self._on_setting_changed)
-        self.apply_styles_cb.stateChanged.connect(self._on_setting_changed)
+        # セルの装飾の有無で罫線・交互色の出力方式の有効/無効が変わる
+        self.apply_styles_cb.stateChanged.connect(self._on_format_changed)
         self.auto_width_cb.stateChanged.connect(self._on_setting_changed)
         self.freeze_header_cb.stateChanged.connect(self._on_setting_changed)
         self.add_bom_cb.stateChanged.connect(self._on_setting_changed)
@@ -163,6 +178,7 @@ class CompactSettingsPanel(QWidget):
         self.apply_styles_cb.setEnabled(is_excel)
         self.auto_width_cb.setEnabled(is_excel)
         self.freeze_header_cb.setEnabled(is_excel)
+        self.banding_combo.setEnabled(is_excel and self.apply_styles_cb.isChecked())
 
         # CSV選択時はExcelオプションをグレーアウト
         if not is_excel:
@@ -200,6 +216,7 @@ class CompactSettingsPanel(QWidget):
 
         # オプション
         settings.apply_styles_by_default = self.apply_styles_cb.isChecked()
+        settings.style_banding = self.banding_combo.currentData()
         settings.add_bom_by_default = self.add_bom_cb.isChecked()
         settings.overwrite_existing = self.overwrite_cb.isChecked()
 
@@ -229,6 +246,9 @@ class CompactSettingsPanel(QWidget):
 
         # オプション
         self.apply_styles_cb.setChecked(settings.apply_styles_by_default)
+        self.banding_combo.setCurrentIndex(
+            max(self.banding_combo.findData(settings.style_banding), 0)
+        )
         self.auto_width_cb.setChecked(
             True
         )  # デフォルトON（AppSettingsに該当フィールドなし）
@@ -264,6 +284,7 @@ class CompactSettingsPanel(QWidget):
 
         use_output_folder = self.use_output_folder_cb.isChecked()
         output_directory = Path(self.settings_manager.settings.default_output_directory)
+        schema_file = self.settings_manager.settings.schema_file
 
         logger.debug(
             f"get_conversion_settings: use_output_folder={use_output_folder}, output_directory={output_directory}"
@@ -277,6 +298,10 @@ class CompactSettingsPanel(QWidget):
             apply_styles=self.apply_styles_cb.isChecked(),
             auto_width=self.auto_width_cb.isChecked(),
             freeze_header=self.freeze_header_cb.isChecked(),
+            style_banding=self.banding_combo.currentData(),
             add_bom=self.add_bom_cb.isChecked(),
             overwrite_existing=self.overwrite_cb.isChecked(),
+            schema_file=Path(schema_file) if schema_file else None,
+            export_all_sheets=self.settings_manager.settings.export_all_sheets,
+            max_threads=self.settings_manager.settings.max_threads,
         )
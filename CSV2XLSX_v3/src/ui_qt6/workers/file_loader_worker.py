@@ -5,6 +5,7 @@
 
 import logging
 from pathlib import Path
+from typing import Any, Optional
 
 from PySide6.QtCore import QThread, Signal
 
@@ -27,15 +28,22 @@ class FileLoaderWorker(QThread):
     finished = Signal(int)  # 読み込み完了ファイル数
     error = Signal(str, str)  # (filename, error_message)
 
-    def __init__(self, file_paths: list[Path], existing_paths: set[Path]):
+    def __init__(
+        self,
+        file_paths: list[Path],
+        existing_paths: set[Path],
+        metadata_cache: Optional[Any] = None,
+    ):
         """
         Args:
             file_paths: 読み込むファイルパスのリスト
             existing_paths: 既存のファイルパス（重複チェック用）
+            metadata_cache: 検出結果のキャッシュ（MetadataCache、省略時は使わない）
         """
         super().__init__()
         self.file_paths = file_paths
         self.existing_paths = existing_paths
+        self.metadata_cache = metadata_cache
         self._is_cancelled = False
 
     def cancel(self):
@@ -100,11 +108,9 @@ class FileLoaderWorker(QThread):
             # CSVの場合はエンコーディング検出（重い処理）
             if file_info.file_type == FileType.CSV:
                 try:
-                    from converter.encoding import (
-                        detect_encoding,  # type: ignore[import-untyped]
-                    )
-
-                    file_info.detected_encoding = detect_encoding(path)
+                    # 検出結果はFileInfoに保持し、変換時に再利用する
+                    # （キャッシュがあれば再検出しない）
+                    file_info.ensure_probe(self.metadata_cache)
                     logger.debug(
                         f"Detected encoding for {path.name}: {file_info.detected_encoding}"
                     )
@@ -112,6 +118,15 @@ class FileLoaderWorker(QThread):
                     logger.warning(f"Failed to detect encoding for {path.name}: {e}")
                     file_info.detected_encoding = "utf-8"  # デフォルト
 
+            # Excelの場合はシート構成を取得（ブックのメタデータのみ）
+            elif file_info.is_xlsx:
+                try:
+                    file_info.ensure_xlsx_probe()
+                except Exception as e:
+                    logger.warning(f"Failed to read sheets of {path.name}: {e}")
+
+            # 検出結果を使って中身を検証（読み込めないファイルは無効）
+            file_info.validate_contents()
             return file_info
 
         except Exception as e:
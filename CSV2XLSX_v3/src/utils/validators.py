@@ -6,10 +6,21 @@
 import logging
 from pathlib import Path
 import re
-from typing import Any
+from typing import Any, Optional
 
 import pandas as pd
 
+from src.converter.encoding import detect_text_delimiter
+from src.converter.probe import FileProbe, probe_file
+from src.converter.xlsx_reader import (
+    SheetInfo,
+    SheetReader,
+    WorkbookTables,
+    XlsxProbe,
+    probe_xlsx,
+    read_workbook_tables,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,12 +28,15 @@ class DataValidator:
     """データ検証クラス"""
 
     @staticmethod
-    def validate_csv_structure(file_path: Path) -> dict[str, Any]:
+    def validate_csv_structure(
+        file_path: Path, probe: Optional[FileProbe] = None
+    ) -> dict[str, Any]:
         """
         CSVファイルの構造を検証
 
         Args:
             file_path: 検証対象のCSVファイル
+            probe: 検出済みのプローブ結果（省略時はここでプローブする）
 
         Returns:
             検証結果の辞書
@@ -41,35 +55,23 @@ class DataValidator:
         }
 
         try:
-            # エンコーディング検出
-            import chardet
-
-            with open(file_path, "rb") as f:
-                raw_data = f.read(10000)
-                encoding_result = chardet.detect(raw_data)
-                encoding = encoding_result.get("encoding", "utf-8")
-                confidence = encoding_result.get("confidence", 0.0)
-
-            # encodingがNoneの場合のフォールバック
-            if encoding is None:
-                encoding = "utf-8"
-
+            # エンコーディング・区切り文字は一度のプローブで検出
+            probe = probe or probe_file(file_path)
+            encoding = probe.encoding
             result["info"]["encoding"] = encoding
 
-            if confidence < 0.7:
-                result["warnings"].append(
-                    f"エンコーディング検出の信頼度が低いです: {confidence:.2f}"
-                )
-
             # CSV読み込みテスト
             try:
-                # 区切り文字の検出
-                delimiter = DataValidator._detect_delimiter(file_path, encoding)
+                delimiter = probe.delimiter
                 result["info"]["delimiter"] = delimiter
 
                 # データ読み込み
                 df = pd.read_csv(
-                    file_path, encoding=encoding, sep=delimiter, nrows=1000
+                    file_path,
+                    encoding=encoding,
+                    sep=delimiter,
+                    quotechar=probe.quotechar,
+                    nrows=1000,
                 )
                 result["info"]["rows"] = len(df)
                 result["info"]["columns"] = len(df.columns)
@@ -108,23 +110,9 @@ class DataValidator:
         """区切り文字を検出"""
         try:
             with open(file_path, encoding=encoding) as f:
-                sample = f.read(1024)
-
-            delimiters = [",", "\t", ";", "|"]
-            delimiter_counts: dict[str, int] = {}
-
-            for delimiter in delimiters:
-                count = sample.count(delimiter)
-                if count > 0:
-                    delimiter_counts[delimiter] = count
-
-            if delimiter_counts:
-                return max(delimiter_counts, key=lambda x: delimiter_counts[x])
-
+                return detect_text_delimiter(f.read(1024))
         except Exception:
-            pass
-
-        return ","  # デフォルト
+            return ","  # デフォルト
 
     @staticmethod
     def _validate_header(df: pd.DataFrame) -> bool:
@@ -154,7 +142,9 @@ class DataValidator:
     @staticmethod
     def _check_data_consistency(df: pd.DataFrame) -> list[str]:
         """データの一貫性をチェック"""
-        inconsistent_columns = []
+        inconsistent_columns: list[str] = []
+        if df.empty:
+            return inconsistent_columns
 
         for column in df.columns:
             try:
@@ -162,8 +152,10 @@ class DataValidator:
                 numeric_conversion = pd.to_numeric(df[column], errors="coerce")
                 numeric_ratio = numeric_conversion.notna().sum() / len(df)
 
-                # 日付列として解釈できるかチェック
-                date_conversion = pd.to_datetime(df[column], errors="coerce")
+                # 日付列として解釈できるかチェック（書式は値ごとに推定）
+                date_conversion = pd.to_datetime(
+                    df[column], errors="coerce", format="mixed"
+                )
                 date_ratio = date_conversion.notna().sum() / len(df)
 
                 # 混在している場合
@@ -176,12 +168,18 @@ class DataValidator:
         return inconsistent_columns
 
     @staticmethod
-    def validate_excel_file(file_path: Path) -> dict[str, Any]:
+    def validate_excel_file(
+        file_path: Path, probe: Optional[XlsxProbe] = None
+    ) -> dict[str, Any]:
         """
         Excelファイルの検証
 
+        行数・列数はシートの範囲（dimension）の値で、書式だけが設定された
+        空行も含む。
+
         Args:
             file_path: 検証対象のExcelファイル
+            probe: 取得済みのプローブ結果（省略時はここでプローブする）
 
         Returns:
             検証結果の辞書
@@ -194,29 +192,42 @@ class DataValidator:
         }
 
         try:
-            # Excelファイル読み込み
-            excel_file = pd.ExcelFile(file_path, engine="openpyxl")
-            result["info"]["sheets"] = excel_file.sheet_names
+            # シート構成と行数・列数はブックのメタデータ（dimension）から取得
+            probe = probe or probe_xlsx(file_path)
+            result["info"]["sheets"] = probe.sheet_names
 
             total_rows = 0
             total_columns = 0
+            tables: Optional[WorkbookTables] = None
 
-            # 各シートの検証
-            for sheet_name in excel_file.sheet_names:
-                try:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    rows, columns = df.shape
-                    total_rows += rows
-                    total_columns = max(total_columns, columns)
-
-                    # 空のシートチェック
-                    if rows == 0:
-                        result["warnings"].append(f"空のシートがあります: {sheet_name}")
-
-                except Exception as e:
-                    result["warnings"].append(
-                        f"シート'{sheet_name}'の読み込みに失敗: {str(e)}"
-                    )
+            try:
+                for sheet in probe.sheets:
+                    try:
+                        if sheet.rows is not None:
+                            rows = max(sheet.rows - 1, 0)  # 1行目はヘッダー
+                            columns = sheet.columns or 0
+                        else:
+                            # dimension がないシートのみ行を順に読んで数える
+                            tables = tables or read_workbook_tables(file_path)
+                            rows, columns = DataValidator._sheet_shape(
+                                file_path, sheet.sheet, tables
+                            )
+                        total_rows += rows
+                        total_columns = max(total_columns, columns)
+
+                        # 空のシートチェック
+                        if rows == 0:
+                            result["warnings"].append(
+                                f"空のシートがあります: {sheet.name}"
+                            )
+
+                    except Exception as e:
+                        result["warnings"].append(
+                            f"シート'{sheet.name}'の読み込みに失敗: {str(e)}"
+                        )
+            finally:
+                if tables is not None:
+                    tables.close()
 
             result["info"]["total_rows"] = total_rows
             result["info"]["total_columns"] = total_columns
@@ -231,6 +242,27 @@ class DataValidator:
 
         return result
 
+    @staticmethod
+    def _sheet_shape(
+        file_path: Path, sheet: SheetInfo, tables: WorkbookTables
+    ) -> tuple[int, int]:
+        """
+        シートのデータ行数（ヘッダーを除く）と列数
+
+        末尾の空行・空列は数えない。
+        """
+        last_row = 0
+        columns = 0
+        with SheetReader(file_path, sheet, tables) as reader:
+            for row_number, row in enumerate(reader, 1):
+                width = len(row)
+                while width and row[width - 1] is None:
+                    width -= 1
+                if width:
+                    last_row = row_number
+                    columns = max(columns, width)
+        return max(last_row - 1, 0), columns
+
 
 class SecurityValidator:
     """セキュリティ検証クラス"""
@@ -0,0 +1,160 @@
+"""
+変換中のキャンセル（CancelToken）のテスト
+"""
+
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import (
+    CancelToken,
+    ConversionContext,
+    CSVConverter,
+    CSVEncodingConverter,
+    ExcelToCSVConverter,
+    ProgressSink,
+)
+from src.core import ConversionController, ConversionSettings, FileManager
+from src.core.conversion_controller import ConversionStatus
+
+# キャンセル要求から変換の停止までの上限（秒）
+CANCEL_LATENCY_LIMIT = 1.0
+
+
+def _write_csv(path: Path, rows: int) -> Path:
+    path.write_text(
+        "id,name,value\n" + "".join(f"{i},名前{i},{i * 1.5}\n" for i in range(rows)),
+        encoding="utf-8",
+    )
+    return path
+
+
+def _cancelling_context(cancel_token: CancelToken) -> ConversionContext:
+    """最初の進捗通知（変換開始後）でキャンセルするコンテキスト"""
+    return ConversionContext(
+        cancel_token=cancel_token,
+        progress=ProgressSink(
+            file_progress=lambda percent: cancel_token.cancel(),
+            row_progress=lambda current, total: cancel_token.cancel(),
+        ),
+    )
+
+
+class TestEngineCancellation:
+    """変換エンジンのファイル内キャンセルのテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_csv_to_excel(self, temp_dir):
+        """CSV→Excel: 変換途中で中断し、出力を残さない"""
+        csv_path = _write_csv(temp_dir / "data.csv", 5000)
+        cancel_token = CancelToken()
+        converter = CSVConverter()
+        converter.row_update_interval = 100
+
+        assert not converter.convert_to_excel(
+            csv_path, temp_dir / "data.xlsx", context=_cancelling_context(cancel_token)
+        )
+        assert cancel_token.cancelled
+        assert not (temp_dir / "data.xlsx").exists()
+
+    @pytest.mark.parametrize("all_sheets", [False, True])
+    def test_excel_to_csv(self, temp_dir, all_sheets):
+        """Excel→CSV: シートの途中で中断し、出力を残さない"""
+        excel_path = temp_dir / "data.xlsx"
+        assert CSVConverter().convert_to_excel(
+            _write_csv(temp_dir / "data.csv", 5000), excel_path
+        )
+        cancel_token = CancelToken()
+        converter = ExcelToCSVConverter()
+        converter.row_update_interval = 100
+        context = _cancelling_context(cancel_token)
+
+        if all_sheets:
+            assert (
+                converter.convert_all_sheets(
+                    excel_path, temp_dir / "out.csv", context=context
+                )
+                == []
+            )
+        else:
+            assert not converter.convert_to_csv(
+                excel_path, temp_dir / "out.csv", context=context
+            )
+        assert cancel_token.cancelled
+        assert list(temp_dir.glob("out*.csv")) == []
+
+    @pytest.mark.parametrize("output_encoding", ["utf-8", "shift_jis"])
+    def test_encoding(self, temp_dir, output_encoding):
+        """CSV→CSV: ブロックの区切りで中断し、出力を残さない"""
+        csv_path = _write_csv(temp_dir / "data.csv", 5000)
+        cancel_token = CancelToken()
+
+        assert not CSVEncodingConverter(max_workers=1).convert_encoding(
+            csv_path,
+            temp_dir / "out.csv",
+            output_encoding=output_encoding,
+            context=_cancelling_context(cancel_token),
+        )
+        assert cancel_token.cancelled
+        assert not (temp_dir / "out.csv").exists()
+
+
+class TestControllerCancellation:
+    """ConversionController のキャンセルのテスト"""
+
+    @pytest.mark.parametrize("max_threads", [1, 2])
+    def test_cancel_latency(self, max_threads):
+        """変換中のファイルも1秒以内に停止し、書きかけの出力を残さない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_dir = Path(tmpdir)
+            paths = [
+                _write_csv(temp_dir / f"data{i}.csv", 100_000)
+                for i in range(max_threads)
+            ]
+            file_manager = FileManager()
+            file_manager.add_files(paths)
+            files = file_manager.get_files()
+
+            started = threading.Event()
+            controller = ConversionController()
+            controller.set_row_progress_callback(
+                lambda current, total, file_name: started.set()
+            )
+            settings = ConversionSettings(
+                output_format="xlsx",
+                output_directory=temp_dir / "out",
+                max_threads=max_threads,
+            )
+            assert controller.start_conversion(files, settings)
+            assert started.wait(timeout=60)
+
+            cancel_time = time.perf_counter()
+            controller.cancel_conversion()
+            assert controller.wait_for_completion(timeout=30)
+            latency = time.perf_counter() - cancel_time
+
+            assert latency < CANCEL_LATENCY_LIMIT
+            assert not controller.is_busy()
+            assert controller.current_results
+            assert all(
+                result.status == ConversionStatus.CANCELLED
+                for result in controller.current_results
+            )
+            assert list((temp_dir / "out").glob("*.xlsx")) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -7,9 +7,12 @@ import logging
 from pathlib import Path
 import time
 
+import pandas as pd
 import pytest
 
+from scripts.generate_test_data import generate_large_csv
 from src.converter.csv_to_excel import CSVConverter
+from src.converter.data_types import apply_schema, detect_date_format, infer_schema
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -203,6 +206,96 @@ class TestConversionPerformance:
             f"(許容範囲: 15%以内)"
         )
 
+    def test_banding_mode_output_size(self, output_dir: Path):
+        """
+        罫線・交互色の出力方式ごとのファイルサイズ・変換時間比較（20K行）
+
+        Args:
+            output_dir: 出力ディレクトリ
+        """
+        rows = 20_000
+        csv_path = output_dir / "banding.csv"
+        pd.DataFrame(
+            {
+                "ID": range(1, rows + 1),
+                "名前": [f"ユーザー{i:06d}" for i in range(rows)],
+                "部署": [f"部署{(i % 20) + 1}" for i in range(rows)],
+                "入社日": [
+                    f"{2000 + (i % 25)}-{(i % 12) + 1:02d}-01" for i in range(rows)
+                ],
+                "給与": [250000 + (i % 500000) for i in range(rows)],
+            }
+        ).to_csv(csv_path, index=False, encoding="utf-8")
+
+        sizes: dict[str, int] = {}
+        logger.info("\n========== 出力方式比較 (20K行) ==========")
+        for banding in ("cells", "table", "conditional"):
+            excel_path = output_dir / f"banding_{banding}.xlsx"
+            start = time.time()
+            assert CSVConverter().convert_to_excel(
+                csv_path,
+                excel_path,
+                style_options={
+                    "header_bold": True,
+                    "borders": True,
+                    "alternating_rows": True,
+                    "banding": banding,
+                },
+            )
+            elapsed = time.time() - start
+            sizes[banding] = excel_path.stat().st_size
+            logger.info(f"{banding}: {sizes[banding]:,} bytes, {elapsed:.2f}秒")
+
+        # ネイティブ書式はセル単位のスタイル属性を持たない分だけ小さい
+        assert sizes["table"] <= sizes["cells"]
+        assert sizes["conditional"] <= sizes["cells"]
+
+    def test_date_parsing_with_cached_format(self, output_dir: Path):
+        """
+        入社日列の日付解析ベンチマーク（書式指定なし vs 検出済み書式）
+
+        Args:
+            output_dir: 出力ディレクトリ
+        """
+        csv_path = output_dir / "dates.csv"
+        generate_large_csv(100_000, csv_path)
+        chunks = list(
+            pd.read_csv(
+                csv_path,
+                usecols=["入社日"],
+                dtype=str,
+                chunksize=10_000,
+                encoding="utf-8-sig",
+            )
+        )
+
+        # 1. チャンクごとに書式指定なしで解析（従来方式）
+        start = time.time()
+        legacy = [pd.to_datetime(chunk["入社日"], errors="coerce") for chunk in chunks]
+        elapsed_legacy = time.time() - start
+
+        # 2. 先頭チャンクで書式を検出し、以降は書式指定の一括変換
+        start = time.time()
+        schema = infer_schema(chunks[0])
+        cached = [apply_schema(chunk.copy(), schema)["入社日"] for chunk in chunks]
+        elapsed_cached = time.time() - start
+
+        # 3. 同じ形の列の書式検出（サンプル1000行、キャッシュヒット）
+        start = time.time()
+        date_format = detect_date_format(chunks[1]["入社日"].head(1000))
+        elapsed_detect = time.time() - start
+
+        logger.info("\n========== 日付解析比較 (入社日 100K行) ==========")
+        logger.info(f"書式指定なし: {elapsed_legacy:.3f}秒")
+        logger.info(
+            f"検出済み書式: {elapsed_cached:.3f}秒 ({schema['入社日'].date_format})"
+        )
+        logger.info(f"書式検出（キャッシュ）: {elapsed_detect * 1000:.1f}ms")
+
+        assert date_format == "%Y-%m-%d"
+        for expected, actual in zip(legacy, cached):
+            pd.testing.assert_series_equal(expected, actual)
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-s"])
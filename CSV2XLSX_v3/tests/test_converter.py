@@ -2,6 +2,7 @@
 変換エンジンのテスト
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 import tempfile
@@ -13,7 +14,13 @@ import pytest
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.converter import CSVConverter, ExcelToCSVConverter
+from src.converter import (
+    CancelToken,
+    ConversionContext,
+    CSVConverter,
+    ExcelToCSVConverter,
+    ProgressSink,
+)
 from src.converter.encoding import detect_delimiter, detect_encoding
 
 
@@ -108,28 +115,52 @@ class TestCSVConverter:
         finally:
             excel_path.unlink(missing_ok=True)
 
-    def test_large_file_detection(self, csv_converter):
-        """大容量ファイル検出のテスト"""
+    def test_output_independent_of_chunk_size(self, csv_converter):
+        """チャンクサイズ（ファイルサイズ）に関わらず同じ出力になること"""
+        from openpyxl import load_workbook
 
-        # モックファイルサイズ
-        class MockPath:
-            def __init__(self, size):
-                self._size = size
-                self.suffix = ".csv"
-
-            def stat(self):
-                class MockStat:
-                    def __init__(self, size):
-                        self.st_size = size
-
-                return MockStat(self._size)
-
-        # 大容量ファイル（100MB）のモック
-        large_file = MockPath(100 * 1024 * 1024)
+        style_options = {
+            "header_bold": True,
+            "borders": True,
+            "alternating_rows": True,
+            "auto_width": True,
+            "freeze_header": True,
+        }
 
-        # プライベートメソッドのテストは実際の実装に依存
-        # ここでは大容量ファイル処理のロジックが存在することを確認
-        assert hasattr(csv_converter, "_convert_large_file")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            csv_path = temp_path / "input.csv"
+            pd.DataFrame(
+                {
+                    "id": [str(i) for i in range(1, 26)],
+                    "name": [f"ユーザー{i:03d}" for i in range(1, 26)],
+                    "joined": [f"2024-01-{i:02d}" for i in range(1, 26)],
+                }
+            ).to_csv(csv_path, index=False, encoding="utf-8")
+
+            sheets = []
+            for chunk_size in [4, 10000]:
+                excel_path = temp_path / f"chunk_{chunk_size}.xlsx"
+                csv_converter.chunk_size = chunk_size
+                assert csv_converter.convert_to_excel(
+                    csv_path, excel_path, style_options=style_options
+                )
+                sheets.append(load_workbook(excel_path).active)
+
+            small, large = sheets
+            assert small.max_row == large.max_row == 26
+            for small_row, large_row in zip(small.iter_rows(), large.iter_rows()):
+                for small_cell, large_cell in zip(small_row, large_row):
+                    assert small_cell.value == large_cell.value
+                    assert small_cell.number_format == large_cell.number_format
+                    assert small_cell.fill.fgColor.rgb == large_cell.fill.fgColor.rgb
+                    assert small_cell.border.left.style == large_cell.border.left.style
+            assert small["C2"].number_format == "YYYY/M/D"
+            assert small["A2"].fill.fill_type == "solid"
+            assert small["A3"].fill.fill_type is None
+            assert small.column_dimensions["B"].width == (
+                large.column_dimensions["B"].width
+            )
 
     def test_data_type_inference(self):
         """データ型推定テスト"""
@@ -262,6 +293,46 @@ class TestExcelToCSVConverter:
         finally:
             csv_path.unlink(missing_ok=True)
 
+    def test_row_progress(self, excel_converter, temp_excel_file):
+        """行単位の進捗を報告し、最後は書き出した行数になる"""
+        excel_converter.row_update_interval = 1
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / "out.csv"
+            assert excel_converter.convert_to_csv(
+                temp_excel_file,
+                csv_path,
+                row_progress_callback=lambda current, total: calls.append(
+                    (current, total)
+                ),
+            )
+
+        assert calls[0] == (1, 4)
+        assert calls[-1] == (4, 4)
+
+    def test_empty_rows_and_shift_jis(self, excel_converter):
+        """途中の空行は残し末尾の空行は出力しない。Shift_JISはcp932で出力する"""
+        from openpyxl import Workbook
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            excel_path = Path(tmpdir) / "in.xlsx"
+            workbook = Workbook()
+            sheet = workbook.active
+            sheet.append(["名前", "金額"])
+            sheet.append(["髙﨑①", 1.5])
+            sheet.append([])
+            sheet.append(["田中, 太郎", 1000])
+            sheet["A6"] = None  # 末尾の空行（シートの範囲のみ広がる）
+            workbook.save(excel_path)
+
+            csv_path = Path(tmpdir) / "out.csv"
+            assert excel_converter.convert_to_csv(
+                excel_path, csv_path, encoding="shift_jis"
+            )
+            assert csv_path.read_bytes() == (
+                '名前,金額\r\n髙﨑①,1.5\r\n,\r\n"田中, 太郎",1000\r\n'.encode("cp932")
+            )
+
 
 class TestIntegration:
     """統合テスト"""
@@ -332,6 +403,66 @@ class TestIntegration:
 
             assert successful_conversions == 2
 
+    def test_shared_converter_across_threads(self):
+        """1つのコンバーターで、文字コード・区切り文字の異なるファイルを同時に変換"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            jobs = []
+            for i in range(6):
+                encoding, delimiter = ("cp932", "|") if i % 2 else ("utf-8", ",")
+                csv_file = temp_path / f"file{i}.csv"
+                csv_file.write_bytes(
+                    (
+                        f"名前{delimiter}番号\n"
+                        + "".join(f"田中{i}{delimiter}{j}\n" for j in range(2000))
+                    ).encode(encoding)
+                )
+                jobs.append((csv_file, temp_path / f"file{i}.xlsx", i))
+
+            csv_converter = CSVConverter()
+            csv_converter.chunk_size = 100  # チャンクの読み込みを交互に行わせる
+            with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+                assert all(
+                    pool.map(
+                        lambda job: csv_converter.convert_to_excel(job[0], job[1]),
+                        jobs,
+                    )
+                )
+
+            for _, excel_file, i in jobs:
+                df = pd.read_excel(excel_file)
+                assert list(df.columns) == ["名前", "番号"]
+                assert len(df) == 2000
+                assert set(df["名前"]) == {f"田中{i}"}
+
+    def test_context(self):
+        """コンテキストの進捗の通知先に進捗が届き、キャンセル済みなら変換しない"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            csv_file = temp_path / "data.csv"
+            csv_file.write_text("a,b\n1,2\n3,4\n", encoding="utf-8")
+
+            rows = []
+            context = ConversionContext(
+                progress=ProgressSink(row_progress=lambda c, t: rows.append((c, t)))
+            )
+            assert CSVConverter().convert_to_excel(
+                csv_file, temp_path / "a.xlsx", context=context
+            )
+            assert rows[-1] == (2, 2)
+
+            cancel_token = CancelToken()
+            cancel_token.cancel()
+            context = ConversionContext(cancel_token=cancel_token)
+            assert not CSVConverter().convert_to_excel(
+                csv_file, temp_path / "b.xlsx", context=context
+            )
+            assert not ExcelToCSVConverter().convert_to_csv(
+                temp_path / "a.xlsx", temp_path / "b.csv", context=context
+            )
+            assert not (temp_path / "b.xlsx").exists()
+            assert not (temp_path / "b.csv").exists()
+
     def test_error_handling(self):
         """エラーハンドリングテスト"""
         csv_converter = CSVConverter()
@@ -0,0 +1,320 @@
+"""
+型推論（スキーマ）のテスト
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import datetime as dt
+import json
+from pathlib import Path
+import sys
+import tempfile
+
+from openpyxl import load_workbook
+import pandas as pd
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CSVConverter, data_types
+from src.converter.data_types import (
+    ColumnType,
+    apply_schema,
+    detect_date_format,
+    infer_data_types,
+    infer_schema,
+    load_schema,
+    parse_wareki,
+)
+
+
+class TestSchemaInference:
+    """infer_schema / apply_schema のテスト"""
+
+    def test_infer_schema(self):
+        """サンプルから列ごとの型を確定する"""
+        df = pd.DataFrame(
+            {
+                "id": ["1", "2", None],
+                "score": ["1.5", "2", "3"],
+                "date": ["2023-01-01", "2023-02-01", "2023-03-01"],
+                "name": ["a", "b", "c"],
+                "empty": [None, None, None],
+            }
+        )
+        schema = infer_schema(df)
+        assert [column.type for column in schema.columns] == [
+            ColumnType.INTEGER,
+            ColumnType.FLOAT,
+            ColumnType.DATETIME,
+            ColumnType.STRING,
+            ColumnType.STRING,
+        ]
+
+    def test_sample_is_bounded(self):
+        """型推論はサンプル行のみを見る"""
+        df = pd.DataFrame({"value": ["1", "2", "x"]})
+        assert infer_schema(df, sample_rows=2)["value"].type == ColumnType.INTEGER
+
+    def test_widening_across_chunks(self):
+        """後続チャンクに合わない値があれば型を広げる"""
+        schema = infer_schema(
+            pd.DataFrame({"a": ["1"], "b": ["1"], "c": ["2023-01-01"]})
+        )
+        chunk = apply_schema(
+            pd.DataFrame({"a": ["2.5"], "b": ["x"], "c": ["不明"]}), schema
+        )
+
+        assert schema["a"].type == ColumnType.FLOAT
+        assert schema["b"].type == ColumnType.STRING
+        assert schema["c"].type == ColumnType.STRING
+        assert chunk["a"].tolist() == [2.5]
+        assert chunk["b"].tolist() == ["x"]
+        assert chunk["c"].tolist() == ["不明"]
+
+    def test_mixed_values_are_kept(self):
+        """変換できない値を欠損値にしない"""
+        df = infer_data_types(pd.DataFrame({"code": ["1", "A-2", "3"]}))
+        assert df["code"].tolist() == ["1", "A-2", "3"]
+
+    def test_large_integers_stay_strings(self):
+        """Excelで精度が失われる桁数の整数は文字列のまま"""
+        df = infer_data_types(pd.DataFrame({"id": ["12345678901234567890"]}))
+        assert df["id"].tolist() == ["12345678901234567890"]
+
+
+class TestDateFormatDetection:
+    """detect_date_format のテスト"""
+
+    @pytest.mark.parametrize(
+        "values,expected",
+        [
+            (["2023-01-05", "2023-12-25"], "%Y-%m-%d"),
+            (["2023/1/5", "2023/12/25"], "%Y/%m/%d"),
+            (["2023/01/05 10:20", "2023/12/25 23:59"], "%Y/%m/%d %H:%M"),
+            (["ユーザー000001", "ユーザー000002"], None),
+            (["2023-01-05", "不明"], None),
+        ],
+    )
+    def test_detect(self, values, expected):
+        """値の列から書式を検出する"""
+        assert detect_date_format(pd.Series(values)) == expected
+
+    def test_format_is_cached_by_shape(self, monkeypatch):
+        """同じ形の値の列では書式の検出を省略する"""
+        calls = []
+        find = data_types._find_date_format
+        monkeypatch.setattr(
+            data_types,
+            "_find_date_format",
+            lambda text: calls.append(len(text)) or find(text),
+        )
+        detect_date_format(pd.Series(["1999.01.02", "1999.03.04"]))
+        detect_date_format(pd.Series(["2000.05.06", "2001.07.08"]))
+        assert len(calls) == 1
+
+    def test_cache_shared_by_threads(self, monkeypatch):
+        """複数スレッドから同時に検出しても結果とキャッシュの上限は崩れない"""
+        monkeypatch.setattr(data_types, "DATE_FORMAT_CACHE_SIZE", 4)
+        monkeypatch.setattr(data_types, "_date_format_cache", OrderedDict())
+        columns = [
+            (pd.Series(["2023-01-05", "2023-12-25"]), "%Y-%m-%d"),
+            (pd.Series(["2023/1/5", "2023/12/25"]), "%Y/%m/%d"),
+            (pd.Series(["2023/01/05 10:20"]), "%Y/%m/%d %H:%M"),
+            (pd.Series(["20230105"]), "%Y%m%d"),
+            (pd.Series(["2023年1月5日"]), "%Y年%m月%d日"),
+            (pd.Series(["ユーザー000001"]), None),
+        ] * 20
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda column: detect_date_format(column[0]), columns)
+            )
+
+        assert results == [expected for _, expected in columns]
+        assert len(data_types._date_format_cache) == 4
+
+    def test_mixed_formats_across_chunks(self):
+        """後続チャンクの書式が異なっても日時として変換する"""
+        schema = infer_schema(pd.DataFrame({"d": ["2023-01-05"]}))
+        chunk = apply_schema(pd.DataFrame({"d": ["2023/02/06"]}), schema)
+        assert schema["d"].type == ColumnType.DATETIME
+        assert chunk["d"].tolist() == [pd.Timestamp(2023, 2, 6)]
+
+
+class TestJapaneseFormats:
+    """和暦・年月日表記・全角数字のテスト"""
+
+    def test_parse_wareki(self):
+        """元号表で西暦に変換する（元年・略記・合字を含む）"""
+        values = pd.Series(["令和5年4月1日", "平成元年1月8日", "R5.4.1", None, "不明"])
+        assert parse_wareki(values).tolist()[:3] == [
+            pd.Timestamp(2023, 4, 1),
+            pd.Timestamp(1989, 1, 8),
+            pd.Timestamp(2023, 4, 1),
+        ]
+        assert parse_wareki(values)[3:].isna().all()
+
+    def test_japanese_columns(self):
+        """和暦・年月日表記・全角数字の列を日時・数値として扱う"""
+        df = pd.DataFrame(
+            {
+                "和暦": ["令和5年4月1日", "㋿2年12月31日", "昭和64年1月7日"],
+                "年月日": ["2024年1月2日", "２０２４年１２月３１日", None],
+                "数量": ["１２３", "４５６", "7"],
+                "名前": ["田中", "ＡＢＣ", "１号"],
+            }
+        )
+        schema = infer_schema(df)
+        result = apply_schema(df, schema)
+
+        assert schema["和暦"].date_format == "wareki"
+        assert result["和暦"].tolist() == [
+            pd.Timestamp(2023, 4, 1),
+            pd.Timestamp(2020, 12, 31),
+            pd.Timestamp(1989, 1, 7),
+        ]
+        assert schema["年月日"].type == ColumnType.DATETIME
+        assert result["年月日"][1] == pd.Timestamp(2024, 12, 31)
+        assert result["数量"].tolist() == [123, 456, 7]
+        # 文字列列は正規化しない
+        assert result["名前"].tolist() == ["田中", "ＡＢＣ", "１号"]
+
+    def test_full_width_digits_in_later_chunk(self):
+        """後続チャンクの全角数字は正規化して同じ型で変換する"""
+        schema = infer_schema(pd.DataFrame({"n": ["1", "2"]}))
+        chunk = apply_schema(pd.DataFrame({"n": ["３", "4"]}), schema)
+        assert schema["n"].type == ColumnType.INTEGER
+        assert schema["n"].normalize is True
+        assert chunk["n"].tolist() == [3, 4]
+
+
+class TestChunkStableSchema:
+    """チャンクをまたいだスキーマの一貫性のテスト"""
+
+    def test_later_chunk_widens_column(self):
+        """先頭チャンク以降の値もスキーマの型で書き込まれる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_path = Path(tmpdir)
+            csv_path = temp_path / "drift.csv"
+            csv_path.write_text(
+                "数量,日付\n1,2023-01-01\n2,2023-01-02\n3.5,2023-01-03\n4,未定\n",
+                encoding="utf-8",
+            )
+            excel_path = temp_path / "drift.xlsx"
+
+            converter = CSVConverter()
+            converter.chunk_size = 2
+            assert converter.convert_to_excel(csv_path, excel_path)
+
+            ws = load_workbook(excel_path).active
+            assert [row[0] for row in ws.iter_rows(min_row=2, values_only=True)] == [
+                1,
+                2,
+                3.5,
+                4,
+            ]
+            assert ws["B2"].value == dt.datetime(2023, 1, 1)
+            assert ws["B5"].value == "未定"
+
+
+class TestSchemaFile:
+    """スキーマファイルのテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_load_json(self, temp_dir):
+        """JSONのスキーマファイルから型・書式・表示形式を読み込む"""
+        schema_path = temp_dir / "feed.schema.json"
+        schema_path.write_text(
+            json.dumps(
+                {
+                    "columns": {
+                        "ID": "integer",
+                        "入社日": {"type": "datetime", "format": "%Y/%m/%d"},
+                        "給与": {"type": "float", "number_format": "#,##0"},
+                    }
+                }
+            ),
+            encoding="utf-8",
+        )
+        schema = load_schema(schema_path)
+
+        assert schema["ID"].type == ColumnType.INTEGER
+        assert schema["入社日"].date_format == "%Y/%m/%d"
+        assert schema["給与"].number_format == "#,##0"
+        options = schema.read_csv_options()
+        assert options["dtype"]["ID"] == "Int64"
+        assert options["dtype"]["未指定"] is str
+        assert options["parse_dates"] == ["入社日"]
+
+    @pytest.mark.skipif(sys.version_info < (3, 11), reason="tomllib is 3.11+")
+    def test_load_toml(self, temp_dir):
+        """TOMLのスキーマファイルも読み込める"""
+        schema_path = temp_dir / "feed.schema.toml"
+        schema_path.write_text(
+            '[columns]\nID = "integer"\n[columns."和暦"]\ntype = "datetime"\n'
+            'format = "wareki"\n',
+            encoding="utf-8",
+        )
+        schema = load_schema(schema_path)
+        assert schema["ID"].type == ColumnType.INTEGER
+        assert schema["和暦"].normalize is True
+
+    def test_invalid_type(self, temp_dir):
+        """不明な型はエラー"""
+        schema_path = temp_dir / "feed.schema.json"
+        schema_path.write_text('{"columns": {"ID": "number"}}', encoding="utf-8")
+        with pytest.raises(ValueError, match="ID"):
+            load_schema(schema_path)
+
+    def test_known_schema_skips_inference(self, temp_dir, monkeypatch):
+        """スキーマファイルで全列の型が既知なら型推論を行わない"""
+        csv_path = temp_dir / "feed.csv"
+        csv_path.write_text(
+            "ID,入社日,給与,備考\n1,2023/01/02,250000,a\n2,2023/02/03,300000,b\n",
+            encoding="utf-8",
+        )
+        (temp_dir / "feed.schema.json").write_text(
+            json.dumps(
+                {
+                    "columns": {
+                        "ID": "integer",
+                        "入社日": {
+                            "type": "datetime",
+                            "format": "%Y/%m/%d",
+                            "number_format": "yyyy-mm-dd",
+                        },
+                        "給与": {"type": "integer", "number_format": "#,##0"},
+                        "備考": "string",
+                    }
+                }
+            ),
+            encoding="utf-8",
+        )
+        classified = []
+        classify = data_types._classify
+        monkeypatch.setattr(
+            data_types,
+            "_classify",
+            lambda name, values: classified.append(name) or classify(name, values),
+        )
+
+        excel_path = temp_dir / "feed.xlsx"
+        assert CSVConverter().convert_to_excel(csv_path, excel_path)
+
+        assert classified == []
+        ws = load_workbook(excel_path).active
+        assert [c.value for c in ws[2]] == [1, dt.datetime(2023, 1, 2), 250000, "a"]
+        assert ws["B2"].number_format == "yyyy-mm-dd"
+        assert ws["C2"].number_format == "#,##0"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
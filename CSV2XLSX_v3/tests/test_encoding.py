@@ -0,0 +1,77 @@
+"""
+エンコーディング検出のテスト
+"""
+
+from pathlib import Path
+import sys
+import tempfile
+
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import encoding
+from src.converter.encoding import detect_encoding
+
+JAPANESE_TEXT = "名前,住所,備考\n" + "".join(
+    f"田中{i},東京都千代田区{i}丁目,テストです\n" for i in range(200)
+)
+
+
+class TestDetectEncoding:
+    """detect_encoding のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    @pytest.fixture
+    def small_samples(self, monkeypatch):
+        """サンプルサイズを小さくして大きなファイルを模擬"""
+        monkeypatch.setattr(encoding, "HEAD_SAMPLE_SIZE", 256)
+        monkeypatch.setattr(encoding, "SAMPLE_BLOCK_SIZE", 128)
+
+    @pytest.mark.parametrize(
+        "file_encoding,expected",
+        [
+            ("utf-8", "utf-8"),
+            ("utf-8-sig", "utf-8-sig"),
+            ("utf-16", "utf-16"),
+            ("cp932", "cp932"),
+            ("euc_jp", "euc_jp"),
+        ],
+    )
+    def test_cascade(self, temp_dir, file_encoding, expected):
+        """BOM → UTF-8 → cp932 / EUC-JP の順に判定する"""
+        path = temp_dir / "data.csv"
+        path.write_bytes(JAPANESE_TEXT.encode(file_encoding))
+        assert detect_encoding(path) == expected
+
+    def test_ascii_is_utf8(self, temp_dir):
+        """ASCIIのみのファイルはUTF-8"""
+        path = temp_dir / "data.csv"
+        path.write_bytes(b"a,b\n1,2\n")
+        assert detect_encoding(path) == "utf-8"
+
+    def test_non_utf8_near_end(self, temp_dir, small_samples):
+        """ファイル末尾のみにあるcp932の文字も検出する"""
+        path = temp_dir / "data.csv"
+        path.write_bytes(b"a,b\n" + b"1,2\n" * 2000 + "3,髙﨑\n".encode("cp932"))
+        assert detect_encoding(path) == "cp932"
+
+    def test_bounded_sample(self, temp_dir, small_samples):
+        """読み込むのはファイルサイズによらず一定量のサンプルのみ"""
+        path = temp_dir / "data.csv"
+        path.write_bytes(JAPANESE_TEXT.encode("utf-8") * 50)
+
+        samples = encoding.read_samples(path)
+        assert sum(len(sample) for sample in samples) <= 256 + 9 * 128
+        assert detect_encoding(path) == "utf-8"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
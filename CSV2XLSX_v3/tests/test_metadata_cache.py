@@ -0,0 +1,101 @@
+"""
+ファイルメタデータキャッシュのテスト
+"""
+
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CSVConverter, csv_to_excel, data_types, metadata_cache
+from src.converter.data_types import ColumnType
+from src.converter.metadata_cache import MetadataCache
+from src.converter.probe import probe_file
+
+
+class TestMetadataCache:
+    """MetadataCache のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def _write_csv(self, path: Path, rows: int = 3) -> Path:
+        path.write_text(
+            "id,name\n" + "".join(f"{i},n{i}\n" for i in range(rows)),
+            encoding="utf-8",
+        )
+        return path
+
+    def test_persists_across_instances(self, temp_dir, monkeypatch):
+        """別のセッション（インスタンス）でもプローブを再実行しない"""
+        csv_path = self._write_csv(temp_dir / "a.csv")
+        cache_file = temp_dir / "cache.json"
+        MetadataCache(cache_file).lookup(csv_path)
+
+        monkeypatch.setattr(metadata_cache, "probe_file", None)
+        probe = MetadataCache(cache_file).lookup(csv_path).probe
+        assert probe.encoding == "utf-8"
+        assert probe.path == csv_path
+
+    def test_invalidated_by_change(self, temp_dir):
+        """サイズ・更新時刻・内容が変わればキャッシュは無効"""
+        csv_path = self._write_csv(temp_dir / "a.csv")
+        cache = MetadataCache(temp_dir / "cache.json")
+        cache.put(csv_path, probe_file(csv_path))
+        assert cache.get(csv_path) is not None
+
+        # 同じサイズ・同じ更新時刻で内容だけ変更
+        stat = csv_path.stat()
+        csv_path.write_text("id,name\n0,n0\n1,n1\n2,nX\n", encoding="utf-8")
+        os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert cache.get(csv_path) is None
+
+    def test_lru_eviction(self, temp_dir):
+        """上限を超えると最も長く使われていないエントリから削除する"""
+        paths = [self._write_csv(temp_dir / f"{i}.csv") for i in range(3)]
+        cache = MetadataCache(temp_dir / "cache.json", max_entries=2)
+        cache.lookup(paths[0])
+        cache.lookup(paths[1])
+        cache.get(paths[0])  # paths[1] が最も古くなる
+        cache.lookup(paths[2])
+
+        assert len(cache) == 2
+        assert cache.get(paths[0]) is not None
+        assert cache.get(paths[1]) is None
+
+    def test_converter_reuses_rows_and_schema(self, temp_dir, monkeypatch):
+        """2回目の変換では検出・行数カウント・型推論を行わない"""
+        csv_path = self._write_csv(temp_dir / "a.csv", rows=50)
+        cache = MetadataCache(temp_dir / "cache.json")
+        converter = CSVConverter(metadata_cache=cache)
+        assert converter.convert_to_excel(csv_path, temp_dir / "a.xlsx")
+
+        cached = MetadataCache(temp_dir / "cache.json").get(csv_path)
+        assert cached is not None
+        assert cached.probe.estimated_rows == 50
+        assert cached.probe.rows_exact is True
+        assert cached.schema["id"].type == ColumnType.INTEGER
+
+        monkeypatch.setattr(csv_to_excel, "probe_file", None)
+        monkeypatch.setattr(csv_to_excel, "BackgroundRowCounter", None)
+        monkeypatch.setattr(data_types, "_classify", None)
+        calls = []
+        assert converter.convert_to_excel(
+            csv_path,
+            temp_dir / "b.xlsx",
+            row_progress_callback=lambda current, total: calls.append(total),
+        )
+        assert set(calls) == {50}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
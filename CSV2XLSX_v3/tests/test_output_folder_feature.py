@@ -17,6 +17,7 @@ sys.path.insert(0, str(project_root))
 
 from src.core.conversion_controller import ConversionController, ConversionSettings
 from src.core.file_manager import ConversionDirection, FileInfo, FileType
+from src.core.settings_manager import SettingsManager
 
 
 class TestOutputFolderFeature:
@@ -174,6 +175,16 @@ class TestOutputFolderFeature:
         # デフォルトで use_output_folder=True
         assert settings.use_output_folder == True
 
+    def test_style_banding_from_settings(self, temp_dir):
+        """罫線・交互色の出力方式はアプリ設定から変換設定に渡る"""
+        manager = SettingsManager(temp_dir / "config.json")
+        assert manager.get_conversion_settings()["style_banding"] == "cells"
+
+        manager.update(style_banding="table")
+        reloaded = SettingsManager(temp_dir / "config.json")
+        settings = ConversionSettings(**reloaded.get_conversion_settings())
+        assert settings.style_banding == "table"
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+"""
+複数ファイルの並列変換（max_threads）のテスト
+"""
+
+import ast
+from pathlib import Path
+import sys
+import tempfile
+
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CancelToken, csv_encoding
+from src.converter.metadata_cache import MetadataCache
+from src.core import (
+    ConversionController,
+    ConversionSettings,
+    FileManager,
+    conversion_controller,
+)
+from src.core.conversion_controller import ConversionStatus
+
+
+class TestParallelConversion:
+    """プロセスプールでの並列変換のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def _add_files(self, temp_dir: Path, file_manager: FileManager, count: int = 4):
+        paths = []
+        for i in range(count):
+            path = temp_dir / f"data{i}.csv"
+            path.write_bytes(
+                (
+                    "名前,年齢\r\n" + "".join(f"田中{j},{j}\r\n" for j in range(50 * i))
+                ).encode("cp932")
+            )
+            paths.append(path)
+        file_manager.add_files(paths)
+        return file_manager.get_files()
+
+    def _run(self, controller: ConversionController, files, settings):
+        progress, rows, results = [], [], []
+        controller.set_progress_callback(
+            lambda current, total, file_info: progress.append(
+                (current, total, file_info)
+            )
+        )
+        controller.set_row_progress_callback(
+            lambda current, total, file_name: rows.append(file_name)
+        )
+        controller.set_completion_callback(results.extend)
+        assert controller.start_conversion(files, settings)
+        assert controller.wait_for_completion(timeout=120)
+        return progress, rows, results
+
+    def test_results_and_progress(self, temp_dir):
+        """全ファイルの結果・ファイル単位進捗・行進捗が既存のコールバックに届く"""
+        files = self._add_files(temp_dir, FileManager())
+        settings = ConversionSettings(
+            output_format="xlsx", output_directory=temp_dir / "out", max_threads=2
+        )
+        progress, rows, results = self._run(ConversionController(), files, settings)
+
+        assert len(results) == len(files)
+        assert all(r.status == ConversionStatus.COMPLETED for r in results)
+        assert all((temp_dir / "out" / f"{f.path.stem}.xlsx").exists() for f in files)
+        # 結果・進捗のFileInfoは呼び出し元のオブジェクト
+        assert {id(r.file_info) for r in results} == {id(f) for f in files}
+        assert [current for current, _, _ in progress] == [1, 2, 3, 4]
+        assert {file_info.name for _, _, file_info in progress} == {
+            f.name for f in files
+        }
+        assert set(rows) == {f.name for f in files}
+
+    def test_metadata_cache_updated_by_parent(self, temp_dir):
+        """ワーカーで確定した行数・スキーマは親プロセスのキャッシュに登録される"""
+        cache = MetadataCache(temp_dir / "cache.json")
+        files = self._add_files(temp_dir, FileManager(metadata_cache=cache))
+        settings = ConversionSettings(
+            output_format="xlsx", output_directory=temp_dir / "out", max_threads=2
+        )
+        _, _, results = self._run(
+            ConversionController(metadata_cache=cache), files, settings
+        )
+
+        assert len(results) == len(files)
+        for i, file_info in enumerate(sorted(files, key=lambda f: f.name)):
+            cached = MetadataCache(temp_dir / "cache.json").get(file_info.path)
+            assert cached is not None
+            assert cached.probe.estimated_rows == 50 * i
+            assert cached.schema is not None
+
+    @pytest.mark.parametrize("max_threads", [1, 3])
+    def test_engine_workers_follow_max_threads(
+        self, temp_dir, monkeypatch, max_threads
+    ):
+        """変換エンジン内のプロセス数は max_threads に従う"""
+        calls = []
+        transcode_file = csv_encoding.transcode_file
+
+        def record(*args, **kwargs):
+            calls.append(kwargs["max_workers"])
+            return transcode_file(*args, **kwargs)
+
+        monkeypatch.setattr(csv_encoding, "transcode_file", record)
+        files = self._add_files(temp_dir, FileManager(), count=1)
+        files[0].conversion_direction = None  # 設定ベースのCSV→CSV変換
+        settings = ConversionSettings(
+            output_format="csv",
+            output_directory=temp_dir / "out",
+            max_threads=max_threads,
+        )
+        result = ConversionController()._convert_single_file(files[0], settings)
+
+        assert result.status == ConversionStatus.COMPLETED
+        assert calls == [max_threads]
+
+    def test_no_nested_pools_in_workers(self):
+        """並列変換のワーカー内では変換エンジンを並列化しない"""
+        settings = ConversionSettings(max_threads=4)
+        conversion_controller._init_worker(None, None, CancelToken())
+        try:
+            worker = conversion_controller._worker_controller
+            assert worker is not None
+            assert worker._engine_workers(settings) == 1
+        finally:
+            conversion_controller._worker_controller = None
+        assert ConversionController()._engine_workers(settings) == 4
+
+
+def test_entry_point_calls_freeze_support_first():
+    """
+    エントリーポイントはGUIの起動より前に multiprocessing.freeze_support() を呼ぶ
+
+    PyInstallerでパッケージ化したWindows版では、呼ばないとプロセスプールの
+    ワーカーがワーカーとして動かず、それぞれメインウィンドウを開く。
+    """
+    tree = ast.parse((project_root / "src" / "main_qt6.py").read_text(encoding="utf-8"))
+    main_blocks = [
+        node
+        for node in tree.body
+        if isinstance(node, ast.If) and "__main__" in ast.unparse(node.test)
+    ]
+    assert len(main_blocks) == 1
+    assert ast.unparse(main_blocks[0].body[0]) == "multiprocessing.freeze_support()"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
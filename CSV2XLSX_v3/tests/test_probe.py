@@ -0,0 +1,193 @@
+"""
+ファイルプローブのテスト
+"""
+
+from pathlib import Path
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CSVConverter, probe
+from src.converter.probe import probe_file
+from src.core import (
+    ConversionController,
+    ConversionDirection,
+    ConversionSettings,
+    FileManager,
+)
+from src.utils.validators import DataValidator
+
+
+class TestProbeFile:
+    """probe_file のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_dialect(self, temp_dir):
+        """エンコーディング・区切り文字・改行コード・列数を一度に検出する"""
+        path = temp_dir / "data.tsv"
+        path.write_bytes(
+            '名前\t住所\t備考\r\n田中\t"東京,千代田区"\t"a,b,c"\r\n'.encode("cp932")
+        )
+        probe = probe_file(path)
+
+        assert probe.encoding == "cp932"
+        assert probe.delimiter == "\t"
+        assert probe.quotechar == '"'
+        assert probe.line_terminator == "\r\n"
+        assert probe.column_count == 3
+
+    def test_exact_rows_for_small_file(self, temp_dir):
+        """先頭部分に収まるファイルは引用符内の改行を除いて数える"""
+        path = temp_dir / "data.csv"
+        path.write_text('a,b\n1,"x\ny"\n2,z', encoding="utf-8")
+        probe = probe_file(path)
+
+        assert probe.estimated_rows == 2
+        assert probe.rows_exact is True
+
+    def test_estimated_rows_for_large_file(self, temp_dir, monkeypatch):
+        """先頭部分に収まらないファイルは平均行長から推定する"""
+        from src.converter import encoding
+
+        monkeypatch.setattr(encoding, "HEAD_SAMPLE_SIZE", 1024)
+        path = temp_dir / "data.csv"
+        path.write_text("id,name\n" + "".join(f"{i:05},x\n" for i in range(5000)))
+        probe = probe_file(path)
+
+        assert probe.rows_exact is False
+        assert 4500 < probe.estimated_rows < 5500
+        assert probe.column_count == 2
+
+    @pytest.mark.parametrize("text", ["a,b\n1,2\n3,4\n", "1,2\n3,4\n5,6\n"])
+    def test_rows_match_converted_rows(self, temp_dir, text):
+        """先頭のレコードは常にヘッダーとして除く（コンバーターの書き出す行数と一致）"""
+        path = temp_dir / "data.csv"
+        path.write_text(text, encoding="utf-8")
+        rows = []
+
+        assert CSVConverter().convert_to_excel(
+            path,
+            temp_dir / "data.xlsx",
+            row_progress_callback=lambda current, total: rows.append(current),
+        )
+        assert probe_file(path).estimated_rows == rows[-1] == 2
+
+    def test_cr_terminator(self, temp_dir):
+        """CRのみの改行コードも検出する"""
+        path = temp_dir / "data.csv"
+        path.write_bytes(b"a;b\r1;2\r")
+        probe = probe_file(path)
+        assert probe.line_terminator == "\r"
+        assert probe.delimiter == ";"
+
+
+class TestProbeReuse:
+    """コンバーター・バリデーターでのプローブ結果の再利用のテスト"""
+
+    @pytest.fixture
+    def csv_file(self):
+        """CRLF・cp932のCSVファイル"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "data.csv"
+            path.write_bytes("名前|年齢\r\n田中|25\r\n山田|30\r\n".encode("cp932"))
+            yield path
+
+    def test_validator_uses_probe(self, csv_file, monkeypatch):
+        """プローブ結果を渡せば検出をやり直さない"""
+        from src.utils import validators
+
+        probe = probe_file(csv_file)
+        monkeypatch.setattr(validators, "probe_file", None)
+
+        result = DataValidator.validate_csv_structure(csv_file, probe=probe)
+
+        assert result["info"]["encoding"] == "cp932"
+        assert result["info"]["delimiter"] == "|"
+        assert result["info"]["rows"] == 2
+        assert result["is_valid"] is True
+
+    def test_file_manager_validates_with_probe(self, csv_file, monkeypatch):
+        """ファイル追加時にプローブ結果で中身を検証し、読み込めないCSVは追加しない"""
+        from src.utils import validators
+
+        empty = csv_file.with_name("empty.csv")
+        empty.write_bytes(b"")
+        monkeypatch.setattr(validators, "probe_file", None)
+        file_manager = FileManager()
+
+        assert file_manager.add_files([csv_file, empty]) == 1
+        assert [file_info.path for file_info in file_manager.get_files()] == [csv_file]
+
+    def test_converter_probes_once(self, csv_file, monkeypatch):
+        """CSV→Excel変換での検出はプローブ一回のみ"""
+        from src.converter import csv_to_excel
+
+        probes = []
+        monkeypatch.setattr(
+            csv_to_excel,
+            "probe_file",
+            lambda path: probes.append(path) or probe_file(path),
+        )
+        converter = CSVConverter()
+        assert converter.convert_to_excel(csv_file, csv_file.with_suffix(".xlsx"))
+        assert probes == [csv_file]
+        df = pd.read_excel(csv_file.with_suffix(".xlsx"))
+        assert list(df.columns) == ["名前", "年齢"]
+
+
+class TestDetectionOnce:
+    """ファイル追加から変換までの検出回数のテスト"""
+
+    @pytest.fixture
+    def detections(self, monkeypatch):
+        """エンコーディング検出の回数を記録"""
+        calls: list[int] = []
+        detect = probe.detect_sample_encoding
+        monkeypatch.setattr(
+            probe,
+            "detect_sample_encoding",
+            lambda samples: calls.append(1) or detect(samples),
+        )
+        return calls
+
+    @pytest.mark.parametrize(
+        "direction,output_format",
+        [
+            (ConversionDirection.CSV_TO_EXCEL, "xlsx"),
+            (ConversionDirection.CSV_TO_CSV_SJIS, "csv"),
+            (None, "csv"),
+        ],
+    )
+    def test_detected_once_per_file(self, detections, direction, output_format):
+        """ファイル追加時の検出結果を変換時に再利用する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / "data.csv"
+            csv_path.write_bytes("名前;年齢\r\n田中;25\r\n".encode("cp932"))
+
+            file_manager = FileManager()
+            file_manager.add_files([csv_path])
+            file_info = file_manager.get_files()[0]
+            file_info.conversion_direction = direction
+            assert file_info.detected_encoding == "cp932"
+
+            controller = ConversionController()
+            settings = ConversionSettings(
+                output_format=output_format, output_directory=Path(tmpdir) / "out"
+            )
+            assert controller._convert_single_file(file_info, settings).output_path
+            assert len(detections) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,198 @@
+"""
+CSV行数カウントのテスト
+"""
+
+from dataclasses import replace
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CSVConverter, csv_to_excel
+from src.converter.probe import probe_file
+from src.converter.row_counter import BackgroundRowCounter, count_csv_records
+
+
+class TestCountCsvRecords:
+    """count_csv_records のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def _write(self, path: Path, data: bytes) -> Path:
+        path.write_bytes(data)
+        return path
+
+    def test_simple_lines(self, temp_dir):
+        """改行の数がレコード数になる"""
+        path = self._write(temp_dir / "a.csv", b"a,b\r\n1,2\r\n3,4\r\n")
+        assert count_csv_records(path) == 3
+
+    def test_missing_trailing_newline(self, temp_dir):
+        """末尾に改行のない最終行も数える"""
+        path = self._write(temp_dir / "a.csv", b"a,b\n1,2\n3,4")
+        assert count_csv_records(path) == 3
+
+    @pytest.mark.parametrize("data", [b"", b"\xef\xbb\xbf"])
+    @pytest.mark.parametrize("skip_blank_lines", [False, True])
+    def test_empty_file(self, temp_dir, data, skip_blank_lines):
+        """空ファイル・BOMだけのファイルは0件"""
+        path = self._write(temp_dir / "a.csv", data)
+        assert count_csv_records(path, skip_blank_lines=skip_blank_lines) == 0
+        assert (
+            count_csv_records(path, "utf-8-sig", skip_blank_lines=skip_blank_lines) == 0
+        )
+
+    @pytest.mark.parametrize("block_size", [1, 3, 7, 1024])
+    def test_quoted_newlines(self, temp_dir, block_size):
+        """引用符内の改行・エスケープされた引用符はブロック境界をまたいでも正しく扱う"""
+        data = 'a,b\n1,"複数\n行の""値"""\n2,"x\r\ny"\n3,z\n'.encode()
+        path = self._write(temp_dir / "a.csv", data)
+        assert count_csv_records(path, "utf-8", block_size=block_size) == 4
+
+    def test_cp932(self, temp_dir):
+        """cp932はデコードせずに数えられる"""
+        data = '名前,備考\n田中,"表\n示"\n'.encode("cp932")
+        path = self._write(temp_dir / "a.csv", data)
+        assert count_csv_records(path, "cp932") == 2
+
+    def test_utf16(self, temp_dir):
+        """UTF-16はデコードしてから数える"""
+        data = 'a,b\n1,"x\ny"\n2,3\n'.encode("utf-16")
+        path = self._write(temp_dir / "a.csv", data)
+        assert count_csv_records(path, "utf-16") == 3
+
+    @pytest.mark.parametrize("encoding", ["utf-8-sig", "cp932", "utf-16"])
+    @pytest.mark.parametrize("block_size", [1, 3, 7, 1024])
+    def test_skip_blank_lines(self, temp_dir, encoding, block_size):
+        """空行（空白・タブのみの行を含む）を除くと pandas.read_csv の行数と一致する"""
+        text = '\r\n名前,備考\r\n田中,"x\r\n\r\ny"\r\n\r\n \t\r\n山田,\r\n,\r\n  '
+        path = self._write(temp_dir / "a.csv", text.encode(encoding))
+        expected = len(pd.read_csv(path, encoding=encoding, dtype=str)) + 1
+
+        assert (
+            count_csv_records(
+                path, encoding, block_size=block_size, skip_blank_lines=True
+            )
+            == expected
+            == 4
+        )
+        assert count_csv_records(path, encoding, block_size=block_size) == 8
+
+    def test_skip_blank_lines_throughput(self, temp_dir):
+        """空行を除く数え方も空行を含めた数え方と同程度の速さで数える"""
+        row = b"12345,2024-01-01,tanaka,100.5,abcdefghij\n"
+        rows = 64 * 1024 * 1024 // len(row)
+        data = b"a,b,c,d,e\n" + row * rows + b"\n \n"
+        path = self._write(temp_dir / "a.csv", data)
+
+        def seconds(skip_blank_lines: bool) -> float:
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                count_csv_records(path, skip_blank_lines=skip_blank_lines)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        assert count_csv_records(path, skip_blank_lines=True) == rows + 1
+        assert count_csv_records(path) == rows + 3
+        # 空行の判定は改行の直後のバイトしか見ないため、全体の走査に比べてわずか
+        assert seconds(True) < seconds(False) * 2 + 0.05
+        assert seconds(True) / (len(data) / 1e9) < 2.0
+
+
+class TestBackgroundRowCounter:
+    """BackgroundRowCounter とコンバーターでの利用のテスト"""
+
+    def test_counts_data_rows(self):
+        """ヘッダーを除いたデータ行数を返す"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "a.csv"
+            path.write_text("a,b\n1,2\n3,4\n", encoding="utf-8")
+            assert BackgroundRowCounter(path).start().join() == 2
+
+    def test_counts_like_read_csv(self):
+        """検出した引用符を使い、空行を除いて数える"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "a.csv"
+            path.write_text("a,b\n1,'x\ny'\n\n2,3\n\n", encoding="utf-8")
+            assert BackgroundRowCounter(path, quotechar="'").start().join() == 2
+
+    def test_stop(self, monkeypatch):
+        """stop() でカウントを中断し、スレッドの終了を待つ"""
+        from src.converter import row_counter
+
+        monkeypatch.setattr(row_counter, "BLOCK_SIZE", 1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "a.csv"
+            path.write_text("a\n" * 100_000, encoding="utf-16")
+            counter = BackgroundRowCounter(path, "utf-16").start()
+            counter.stop()
+
+            assert not counter._thread.is_alive()
+            assert counter.result is None
+            counter.stop()  # 終了後に呼んでもよい
+
+    def test_stopped_after_conversion(self, monkeypatch):
+        """変換が終わった（失敗した）ファイルの行数カウントは止める"""
+        counters = []
+
+        class RecordingCounter(BackgroundRowCounter):
+            def start(self):
+                counters.append(self)
+                return self  # スレッドは開始しない
+
+            def stop(self):
+                self.stopped = True
+
+        monkeypatch.setattr(csv_to_excel, "BackgroundRowCounter", RecordingCounter)
+        monkeypatch.setattr(csv_to_excel, "apply_schema", None)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "a.csv"
+            path.write_text("a,b\n1,2\n", encoding="utf-8")
+            probe = replace(probe_file(path), rows_exact=False)
+
+            assert not CSVConverter().convert_to_excel(
+                path, Path(tmpdir) / "a.xlsx", probe=probe
+            )
+            assert [counter.stopped for counter in counters] == [True]
+
+    def test_progress_total_is_exact(self):
+        """行進捗の総行数は推定値ではなく実際の行数になる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_path = Path(tmpdir)
+            csv_path = temp_path / "wide.csv"
+            # 1行が長いファイル（1行100バイトの仮定では大きく外れる）
+            long_text = "x" * 500
+            lines = ["id,text"] + [f'{i},"{long_text}\n{i}"' for i in range(3000)]
+            csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            converter = CSVConverter()
+            converter.row_update_interval = 100
+            calls = []
+            assert converter.convert_to_excel(
+                csv_path,
+                temp_path / "wide.xlsx",
+                row_progress_callback=lambda current, total: calls.append(
+                    (current, total)
+                ),
+            )
+
+            assert calls[-1] == (3000, 3000)
+            assert all(current <= total for current, total in calls)
+            # 行数カウントの完了後は正確な総行数が通知される
+            assert calls[len(calls) // 2][1] == 3000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+"""
+スタイル計画のテスト
+"""
+
+from pathlib import Path
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter.styles import (
+    StylePlan,
+    build_style_plan,
+    column_display_widths,
+    display_width,
+    excel_column_width,
+)
+from src.converter.xlsx_writer import StreamingXlsxWriter
+
+
+class TestStylePlan:
+    """build_style_plan のテスト"""
+
+    @pytest.fixture
+    def writer(self):
+        """書き込み先ライター（保存はしない）"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = StreamingXlsxWriter(Path(tmpdir) / "plan.xlsx")
+            yield writer
+            writer.discard()
+
+    def test_no_style_options(self, writer):
+        """スタイルなしの場合は全列スタイルID 0"""
+        plan = build_style_plan(writer, None, [False, True])
+        assert plan.header_style == 0
+        assert plan.for_row(2) == (0, 0)
+        assert plan.for_row(3) == (0, 0)
+        assert plan.auto_filter is False
+        assert plan.freeze_panes is None
+
+    def test_full_style_options(self, writer):
+        """全スタイル有効時は列×行の偶奇ごとにスタイルIDが確定する"""
+        style_options = {
+            "header_bold": True,
+            "borders": True,
+            "alternating_rows": True,
+            "freeze_header": True,
+        }
+        plan = build_style_plan(writer, style_options, [False, True, False])
+
+        even, odd = plan.for_row(2), plan.for_row(3)
+        assert plan.for_row(4) == even
+        # 同じ種類の列は同じスタイルIDを共有する
+        assert even[0] == even[2]
+        assert odd[0] == odd[2]
+        # 偶数行（交互色）と奇数行、日付列と通常列はすべて別スタイル
+        assert len({even[0], even[1], odd[0], odd[1], plan.header_style}) == 5
+        assert plan.header_height == 41.25
+        assert plan.freeze_panes == "A2"
+        assert plan.auto_filter is True
+
+    @pytest.mark.parametrize("banding", ["table", "conditional"])
+    def test_native_banding_keeps_only_date_formats(self, writer, banding):
+        """ネイティブ書式モードではデータセルに日付書式以外を持たせない"""
+        style_options = {"borders": True, "alternating_rows": True, "banding": banding}
+        plan = build_style_plan(writer, style_options, [False, True], ["a", "b"])
+
+        assert plan.for_row(2) == plan.for_row(3)
+        assert plan.for_row(2)[0] == 0
+        assert plan.for_row(2)[1] != 0
+        if banding == "table":
+            assert plan.table_style == "TableStyleLight15"
+            assert plan.table_row_stripes is True
+            assert plan.auto_filter is False
+            assert plan.conditional_formats == ()
+        else:
+            assert plan.table_style is None
+            assert plan.auto_filter is True
+            assert len(plan.conditional_formats) == 2
+
+    def test_table_banding_falls_back_for_invalid_header(self, writer):
+        """テーブル列名に使えないヘッダーでは条件付き書式で代替する"""
+        style_options = {"alternating_rows": True, "banding": "table"}
+        plan = build_style_plan(writer, style_options, [False, False], ["a", "A"])
+
+        assert plan.table_style is None
+        assert [formula for formula, _ in plan.conditional_formats] == [
+            "MOD(ROW(),2)=0"
+        ]
+
+    def test_default_plan(self):
+        """既定のスタイル計画"""
+        plan = StylePlan()
+        assert plan.header_style == 0
+        assert plan.header_height is None
+
+
+class TestColumnWidths:
+    """列幅計算のテスト"""
+
+    def test_display_width(self):
+        """全角文字は半角2文字分として数える"""
+        assert display_width("abc") == 3
+        assert display_width("日本語") == 6
+        assert display_width("ﾃｽﾄ") == 3  # 半角カナは1
+        assert display_width("ＡＢ1") == 5
+
+    def test_column_display_widths(self):
+        """列ごとの最大表示幅（欠損値は除外、日付は表示書式の幅）"""
+        df = pd.DataFrame(
+            {
+                "名前": ["田中太郎", None, "abc"],
+                "年齢": pd.array([25, None, 1234], dtype="Int64"),
+                "入社日": pd.to_datetime(["2023-01-01", None, "2023-12-31"]),
+                "空": [None, None, None],
+            }
+        )
+        assert column_display_widths(df) == [8, 4, 10, 0]
+
+    def test_excel_column_width(self):
+        """余白2文字を加え、12〜50の範囲に収める"""
+        assert excel_column_width(0) == 12
+        assert excel_column_width(20) == 22
+        assert excel_column_width(100) == 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
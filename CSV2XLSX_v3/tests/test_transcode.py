@@ -0,0 +1,288 @@
+"""
+ストリーミング文字コード変換のテスト
+"""
+
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import (
+    CancelToken,
+    ConversionCancelledError,
+    CSVEncodingConverter,
+    transcode,
+)
+from src.converter.transcode import transcode_file
+from src.core import (
+    ConversionController,
+    ConversionSettings,
+    ConversionStatus,
+    FileManager,
+)
+
+# キャンセル要求から変換の停止までの上限（秒）
+CANCEL_LATENCY_LIMIT = 0.5
+
+CSV_TEXT = '名前|コード|金額\r\n"田中, 太郎"|00123|1.50\r\n髙﨑①|007|"1,000"\r\n'
+
+
+class TestTranscodeFile:
+    """transcode_file のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    @pytest.mark.parametrize("block_size", [1, 2, 3, 7, 1024])
+    def test_split_multibyte(self, temp_dir, block_size):
+        """ブロック境界で分断されたマルチバイト文字も正しく変換する"""
+        src = temp_dir / "in.csv"
+        src.write_bytes(CSV_TEXT.encode("cp932"))
+        dst = temp_dir / "out.csv"
+
+        transcode_file(src, dst, "cp932", "utf-8", block_size=block_size)
+        assert dst.read_bytes() == CSV_TEXT.encode("utf-8")
+
+    @pytest.mark.parametrize(
+        "input_encoding,output_encoding,expected",
+        [
+            ("utf-8-sig", "utf-8", b""),
+            ("utf-8", "utf-8-sig", b"\xef\xbb\xbf"),
+            ("utf-8-sig", "utf-8-sig", b"\xef\xbb\xbf"),
+            ("utf-16", "utf-8-sig", b"\xef\xbb\xbf"),
+        ],
+    )
+    def test_bom(self, temp_dir, input_encoding, output_encoding, expected):
+        """入力のBOMは除き、出力のBOMは出力エンコーディングに従う"""
+        src = temp_dir / "in.csv"
+        src.write_bytes(CSV_TEXT.encode(input_encoding))
+        dst = temp_dir / "out.csv"
+
+        transcode_file(src, dst, input_encoding, output_encoding)
+        assert dst.read_bytes() == expected + CSV_TEXT.encode("utf-8")
+
+    def test_progress(self, temp_dir):
+        """読み込んだバイト数で進捗を通知する"""
+        src = temp_dir / "in.csv"
+        src.write_bytes(CSV_TEXT.encode("cp932") * 10)
+        calls = []
+        transcode_file(
+            src,
+            temp_dir / "out.csv",
+            "cp932",
+            "utf-8",
+            progress_callback=lambda done, total: calls.append((done, total)),
+            block_size=64,
+        )
+        size = src.stat().st_size
+        assert calls[-1] == (size, size)
+        assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+
+
+class TestParallelTranscode:
+    """改行で区切った断片の並列変換のテスト"""
+
+    @pytest.fixture
+    def small_pieces(self, monkeypatch):
+        """小さなファイルでも断片に分けて並列変換する"""
+        monkeypatch.setattr(transcode, "PARALLEL_MIN_SIZE", 1)
+        monkeypatch.setattr(transcode, "PARALLEL_PIECE_SIZE", 100)
+
+    @pytest.mark.parametrize(
+        "input_encoding,output_encoding",
+        [("cp932", "utf-8-sig"), ("utf-8-sig", "cp932"), ("utf-8", "euc_jp")],
+    )
+    def test_same_as_serial(self, small_pieces, input_encoding, output_encoding):
+        """並列変換の結果は1プロセスでの変換と同じ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_path = Path(tmpdir)
+            src = temp_path / "in.csv"
+            # EUC-JPにないWindows機種依存文字は除く
+            src.write_bytes(
+                (CSV_TEXT.replace("髙﨑①", "高崎") * 20).encode(input_encoding)
+            )
+            serial = temp_path / "serial.csv"
+            parallel = temp_path / "parallel.csv"
+
+            transcode_file(src, serial, input_encoding, output_encoding)
+            transcode_file(
+                src, parallel, input_encoding, output_encoding, max_workers=4
+            )
+
+            assert parallel.read_bytes() == serial.read_bytes()
+            assert sorted(path.name for path in temp_path.iterdir()) == [
+                "in.csv",
+                "parallel.csv",
+                "serial.csv",
+            ]
+
+    def test_converter_serial_by_default(self, small_pieces, monkeypatch):
+        """CSVEncodingConverter は max_workers を指定しなければ並列化しない"""
+
+        def fail(*args, **kwargs):
+            raise AssertionError("parallel transcode should not be used")
+
+        monkeypatch.setattr(transcode, "_transcode_parallel", fail)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src = Path(tmpdir) / "in.csv"
+            src.write_bytes(CSV_TEXT.encode("cp932") * 20)
+
+            assert CSVEncodingConverter().convert_encoding(
+                src, Path(tmpdir) / "out.csv"
+            )
+
+    def test_cancel_latency(self, monkeypatch):
+        """キャンセル要求は変換中の断片にも届き、断片の完了を待たずに停止する"""
+        monkeypatch.setattr(transcode, "PARALLEL_MIN_SIZE", 1)
+        monkeypatch.setattr(transcode, "PARALLEL_PIECE_SIZE", 8 * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_path = Path(tmpdir)
+            src = temp_path / "in.csv"
+            data = CSV_TEXT.encode("cp932")
+            src.write_bytes(data * (16 * 1024 * 1024 // len(data)))
+            dst = temp_path / "out.csv"
+            cancel_token = CancelToken()
+            cancelled_at = []
+
+            def cancel_when_started():
+                # 断片の一時ファイルができたら変換中
+                while not list(temp_path.glob("out.csv.part*")):
+                    time.sleep(0.01)
+                cancelled_at.append(time.perf_counter())
+                cancel_token.cancel()
+
+            canceller = threading.Thread(target=cancel_when_started)
+            canceller.start()
+            # 小さなブロックで変換し、1断片の変換に1秒程度かかるようにする
+            with pytest.raises(ConversionCancelledError):
+                transcode_file(
+                    src,
+                    dst,
+                    "cp932",
+                    "utf-8",
+                    block_size=16,
+                    max_workers=2,
+                    cancel_token=cancel_token,
+                )
+            latency = time.perf_counter() - cancelled_at[0]
+            canceller.join()
+
+            assert latency < CANCEL_LATENCY_LIMIT
+            assert sorted(path.name for path in temp_path.iterdir()) == ["in.csv"]
+
+    def test_split_at_newlines(self):
+        """断片の境界はすべて改行の直後"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src = Path(tmpdir) / "in.csv"
+            data = CSV_TEXT.encode("cp932") * 20
+            src.write_bytes(data)
+
+            bounds = transcode._split_at_newlines(src, len(data), 100)
+            assert bounds[0] == 0
+            assert bounds[-1] == len(data)
+            assert len(bounds) > 3
+            assert all(data[bound - 1 : bound] == b"\n" for bound in bounds[1:-1])
+
+
+class TestCSVEncodingConverter:
+    """CSVEncodingConverter のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_keeps_structure(self, temp_dir):
+        """区切り文字・引用符・改行コード・数値の表記をそのまま保つ"""
+        src = temp_dir / "in.csv"
+        src.write_bytes(CSV_TEXT.encode("cp932"))
+        dst = temp_dir / "out.csv"
+
+        assert CSVEncodingConverter().convert_encoding(src, dst)
+        assert dst.read_bytes() == b"\xef\xbb\xbf" + CSV_TEXT.encode("utf-8")
+
+    def test_to_shift_jis(self, temp_dir):
+        """Shift_JISへの変換はWindows機種依存文字も含めてcp932で出力する"""
+        src = temp_dir / "in.csv"
+        src.write_text(CSV_TEXT, encoding="utf-8", newline="")
+        dst = temp_dir / "out.csv"
+
+        assert CSVEncodingConverter().convert_encoding(
+            src, dst, output_encoding="shift_jis", add_bom=False
+        )
+        assert dst.read_bytes() == CSV_TEXT.encode("cp932")
+
+    def test_unencodable_character(self, temp_dir):
+        """出力で表現できない文字があれば失敗し、途中までの出力を残さない"""
+        src = temp_dir / "in.csv"
+        src.write_text("名前\r\n😀\r\n", encoding="utf-8")
+        dst = temp_dir / "out.csv"
+
+        assert not CSVEncodingConverter().convert_encoding(
+            src, dst, output_encoding="shift_jis"
+        )
+        assert not dst.exists()
+
+    def test_row_progress(self, temp_dir):
+        """行単位の進捗はプローブの行数で報告し、最後は全行になる"""
+        src = temp_dir / "in.csv"
+        src.write_bytes(CSV_TEXT.encode("cp932"))
+        rows, percents = [], []
+
+        assert CSVEncodingConverter().convert_encoding(
+            src,
+            temp_dir / "out.csv",
+            progress_callback=percents.append,
+            row_progress_callback=lambda current, total: rows.append((current, total)),
+        )
+        assert rows[-1] == (2, 2)
+        assert percents[-1] == 100
+        assert percents == sorted(percents)
+
+    @pytest.mark.parametrize(
+        "encoding,add_bom,expected",
+        [
+            ("utf-8", True, b"\xef\xbb\xbf" + CSV_TEXT.encode("utf-8")),
+            ("shift_jis", False, CSV_TEXT.encode("cp932")),
+        ],
+    )
+    def test_settings_based_conversion(self, temp_dir, encoding, add_bom, expected):
+        """設定ベースのCSV→CSV変換も同じエンジンで変換し、行進捗を報告する"""
+        src = temp_dir / "in.csv"
+        src.write_text(CSV_TEXT, encoding="utf-8", newline="")
+        file_manager = FileManager()
+        file_manager.add_files([src])
+        file_info = file_manager.get_files()[0]
+        file_info.conversion_direction = None  # 設定ベースの変換
+
+        controller = ConversionController()
+        rows = []
+        controller.set_row_progress_callback(
+            lambda current, total, name: rows.append((current, total, name))
+        )
+        settings = ConversionSettings(
+            output_format="csv",
+            output_directory=temp_dir / "out",
+            encoding=encoding,
+            add_bom=add_bom,
+        )
+        result = controller._convert_single_file(file_info, settings)
+
+        assert result.status == ConversionStatus.COMPLETED
+        assert result.output_path.read_bytes() == expected
+        assert rows[-1] == (2, 2, "in.csv")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
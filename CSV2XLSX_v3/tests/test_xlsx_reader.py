@@ -0,0 +1,493 @@
+"""
+XLSXブックのメタデータ読み取りのテスト
+"""
+
+import datetime as dt
+import multiprocessing
+from pathlib import Path
+import pickle
+import re
+import sys
+import tempfile
+import time
+import zipfile
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.chart import BarChart, Reference
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import ExcelToCSVConverter, excel_to_csv, xlsx_reader
+from src.converter.xlsx_reader import (
+    SharedStringTable,
+    SheetReader,
+    list_sheets,
+    probe_xlsx,
+    read_workbook_tables,
+    resolve_sheet,
+)
+from src.core import FileInfo, FileManager
+from src.utils.validators import DataValidator
+
+
+@pytest.fixture
+def workbook_path():
+    """グラフシート・非表示シートを含む複数シートのブック"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "book.xlsx"
+        workbook = Workbook()
+        workbook.active.title = "売上"
+        workbook.active.append(["月", "金額"])
+        workbook.active.append(["1月", 100])
+        chart = BarChart()
+        chart.add_data(Reference(workbook.active, min_col=2, min_row=1, max_row=2))
+        workbook.create_chartsheet("グラフ").add_chart(chart)
+        detail = workbook.create_sheet("明細")
+        detail.append(["品目", "数量"])
+        detail.append(["りんご", 3])
+        hidden = workbook.create_sheet("作業用")
+        hidden.sheet_state = "hidden"
+        workbook.save(path)
+        yield path
+
+
+_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_OFFICE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+@pytest.fixture
+def shared_strings_path():
+    """Excelと同じく共有文字列表（リッチテキスト・ふりがな付き）を使うブック"""
+    parts = {
+        "[Content_Types].xml": (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            "</Types>"
+        ),
+        "_rels/.rels": (
+            f'<Relationships xmlns="{_RELS}"><Relationship Id="rId1" '
+            f'Type="{_OFFICE}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'<workbook xmlns="{_MAIN}" xmlns:r="{_OFFICE}"><sheets>'
+            '<sheet name="一覧" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'<Relationships xmlns="{_RELS}">'
+            f'<Relationship Id="rId1" Type="{_OFFICE}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{_OFFICE}/sharedStrings" Target="sharedStrings.xml"/>'
+            "</Relationships>"
+        ),
+        "xl/sharedStrings.xml": (
+            f'<sst xmlns="{_MAIN}" count="4" uniqueCount="4">'
+            "<si><t>名前</t></si>"
+            '<si><t>田中</t><rPh sb="0" eb="2"><t>タナカ</t></rPh></si>'
+            "<si><r><t>太字</t></r><r><rPr><b/></rPr><t>部分</t></r></si>"
+            '<si><t xml:space="preserve"> 前後に空白 </t></si>'
+            "</sst>"
+        ),
+        "xl/worksheets/sheet1.xml": (
+            f'<worksheet xmlns="{_MAIN}"><dimension ref="A1:B4"/><sheetData>'
+            '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>3</v></c></row>'
+            '<row r="2"><c r="A2" t="s"><v>1</v></c><c r="B2"><v>42</v></c></row>'
+            '<row r="4"><c r="B4" t="s"><v>2</v></c></row>'
+            "</sheetData></worksheet>"
+        ),
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "shared.xlsx"
+        with zipfile.ZipFile(path, "w") as zf:
+            for name, xml in parts.items():
+                zf.writestr(name, xml)
+        yield path
+
+
+class TestListSheets:
+    """list_sheets / resolve_sheet のテスト"""
+
+    def test_worksheets_in_order(self, workbook_path):
+        """ワークシートのみをブックの順序で返す"""
+        sheets = list_sheets(workbook_path)
+
+        assert [sheet.name for sheet in sheets] == ["売上", "明細", "作業用"]
+        assert sheets[1].part.startswith("xl/worksheets/")
+        assert sheets[2].state == "hidden"
+
+    def test_resolve(self, workbook_path):
+        """シート名・インデックス・省略で対象シートを決める"""
+        sheets = list_sheets(workbook_path)
+
+        assert resolve_sheet(sheets).name == "売上"
+        assert resolve_sheet(sheets, 1).name == "明細"
+        assert resolve_sheet(sheets, "作業用").name == "作業用"
+
+    @pytest.mark.parametrize(
+        "sheet_name,message",
+        [
+            ("グラフ", re.escape("not found (available: '売上', '明細', '作業用')")),
+            (3, "out of range"),
+        ],
+    )
+    def test_resolve_error(self, workbook_path, sheet_name, message):
+        """該当するシートがない場合はシート一覧を含むエラー"""
+        with pytest.raises(ValueError, match=message):
+            resolve_sheet(list_sheets(workbook_path), sheet_name)
+
+    def test_not_xlsx(self):
+        """XLSXでないファイルはValueError"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "broken.xlsx"
+            path.write_text("a,b\n1,2\n", encoding="utf-8")
+            with pytest.raises(ValueError, match="Not a valid xlsx"):
+                list_sheets(path)
+
+
+class TestProbeXlsx:
+    """probe_xlsx のテスト"""
+
+    def test_sheets_and_sizes(self, workbook_path):
+        """シート名・行数・列数・サイズをメタデータから取得する"""
+        probe = probe_xlsx(workbook_path)
+
+        assert probe.sheet_names == ["売上", "明細", "作業用"]
+        assert [(sheet.rows, sheet.columns) for sheet in probe.sheets] == [
+            (2, 2),
+            (2, 2),
+            (1, 1),
+        ]
+        assert all(sheet.size >= sheet.compressed_size > 0 for sheet in probe.sheets)
+        assert probe.total_rows == 5
+        assert probe.size == workbook_path.stat().st_size
+
+    def test_reads_only_dimension(self, shared_strings_path):
+        """dimension より後ろ（sheetData）は読まない"""
+        broken = shared_strings_path.with_name("broken.xlsx")
+        with (
+            zipfile.ZipFile(shared_strings_path) as src,
+            zipfile.ZipFile(broken, "w") as dst,
+        ):
+            for item in src.infolist():
+                data = src.read(item)
+                if item.filename == "xl/worksheets/sheet1.xml":
+                    data = (
+                        f'<worksheet xmlns="{_MAIN}"><dimension ref="A1:C5000"/>'
+                        "<sheetData><row><<<"
+                    ).encode()
+                dst.writestr(item, data)
+
+        sheet = probe_xlsx(broken).sheets[0]
+        assert (sheet.name, sheet.rows, sheet.columns) == ("一覧", 5000, 3)
+
+    def test_validator_without_dimension(self, shared_strings_path):
+        """dimension のないシートは行を読んで数える"""
+        stripped = shared_strings_path.with_name("stripped.xlsx")
+        with (
+            zipfile.ZipFile(shared_strings_path) as src,
+            zipfile.ZipFile(stripped, "w") as dst,
+        ):
+            for item in src.infolist():
+                data = src.read(item)
+                if item.filename == "xl/worksheets/sheet1.xml":
+                    data = data.replace(b'<dimension ref="A1:B4"/>', b"")
+                dst.writestr(item, data)
+
+        assert probe_xlsx(stripped).total_rows is None
+        result = DataValidator.validate_excel_file(stripped)
+        assert result["info"]["total_rows"] == 3
+        assert result["info"]["total_columns"] == 2
+
+    def test_file_manager_probes_xlsx(self, workbook_path):
+        """ファイル追加時にシート構成を取得する"""
+        file_manager = FileManager()
+        file_manager.add_files([workbook_path])
+        file_info = file_manager.get_files()[0]
+
+        assert file_info.xlsx_probe.sheet_names == ["売上", "明細", "作業用"]
+        assert file_info.ensure_xlsx_probe() is file_info.xlsx_probe
+
+    def test_file_manager_rejects_empty_workbook(self, workbook_path):
+        """データ行のないブックはファイル追加時に無効にする"""
+        empty = workbook_path.with_name("empty.xlsx")
+        workbook = Workbook()
+        workbook.active.append(["見出し"])
+        workbook.save(empty)
+
+        file_info = FileInfo.from_path(empty)
+        file_info.ensure_xlsx_probe()
+        assert not file_info.validate_contents()
+        assert file_info.error_message == "有効なデータがありません"
+
+        file_manager = FileManager()
+        assert file_manager.add_files([workbook_path, empty]) == 1
+        assert [info.path for info in file_manager.get_files()] == [workbook_path]
+
+
+class TestSheetReader:
+    """SheetReader のテスト"""
+
+    def test_same_values_as_openpyxl(self):
+        """openpyxlの読み取り専用モードと同じ値・同じ行を返す"""
+        from openpyxl.cell.rich_text import CellRichText, TextBlock
+        from openpyxl.cell.text import InlineFont
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "values.xlsx"
+            workbook = Workbook()
+            sheet = workbook.active
+            sheet.append(["文字列", "整数", "小数", "日時", "真偽", "数式"])
+            sheet.append(
+                ["田中", 25, 1.5, dt.datetime(2024, 4, 1, 9, 30), True, "=B2*2"]
+            )
+            sheet["A4"] = CellRichText(["太字", TextBlock(InlineFont(b=True), "部分")])
+            sheet["C4"] = dt.date(2024, 12, 31)
+            sheet["D4"] = dt.time(12, 34)
+            sheet["F5"] = "=1/0"
+            sheet["B6"] = 1e20
+            workbook.save(path)
+
+            tables = read_workbook_tables(path)
+            sheet_info = list_sheets(path)[0]
+            with SheetReader(path, sheet_info, tables) as reader:
+                assert reader.max_row == 6
+                assert reader.max_column == 6
+                rows = list(reader)
+
+            expected = list(
+                load_workbook(path, read_only=True, data_only=True).active.iter_rows(
+                    values_only=True
+                )
+            )
+
+        assert [row or (None,) * 6 for row in rows] == expected
+        assert rows[3][0] == "太字部分"
+
+    @pytest.mark.parametrize("disk_backed", [False, True])
+    def test_shared_strings(self, shared_strings_path, disk_backed):
+        """共有文字列はふりがなを除き、リッチテキストを連結する（openpyxlと同じ）"""
+        tables = read_workbook_tables(shared_strings_path, disk_backed=disk_backed)
+        try:
+            assert isinstance(tables.shared_strings, SharedStringTable) is disk_backed
+            with SheetReader(
+                shared_strings_path, list_sheets(shared_strings_path)[0], tables
+            ) as reader:
+                rows = list(reader)
+        finally:
+            tables.close()
+
+        expected = list(
+            load_workbook(
+                shared_strings_path, read_only=True, data_only=True
+            ).active.iter_rows(values_only=True)
+        )
+        assert rows == [
+            ("名前", " 前後に空白 "),
+            ("田中", 42),
+            (),
+            (None, "太字部分"),
+        ]
+        assert [row or (None, None) for row in rows] == expected
+
+
+class TestSharedStringTable:
+    """ディスク上の共有文字列表のテスト"""
+
+    def test_lookup(self, monkeypatch):
+        """文字列を位置で参照でき、キャッシュを超えても正しく読める"""
+        monkeypatch.setattr(xlsx_reader, "SHARED_STRINGS_CACHE_SIZE", 2)
+        strings = ["", "田中", "髙﨑①", "a" * 1000, "😀"]
+        table = SharedStringTable.build(iter(strings))
+        try:
+            assert len(table) == len(strings)
+            assert [table[i] for i in (4, 0, 3, 1, 2, 1, -1)] == [
+                "😀",
+                "",
+                "a" * 1000,
+                "田中",
+                "髙﨑①",
+                "田中",
+                "😀",
+            ]
+            assert list(table) == strings
+            with pytest.raises(IndexError):
+                table[len(strings)]
+        finally:
+            table.close()
+
+    def test_pickle_and_close(self):
+        """pickleで同じファイルを参照し、作成元のcloseでファイルを削除する"""
+        table = SharedStringTable.build(["x", "y"])
+        copy = pickle.loads(pickle.dumps(table))
+        assert copy[1] == "y"
+        copy.close()
+        assert table.directory.exists()
+
+        table.close()
+        assert not table.directory.exists()
+
+    def test_empty(self):
+        """共有文字列がない場合も作成できる"""
+        table = SharedStringTable.build([])
+        assert len(table) == 0
+        table.close()
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_disk_backed_export(self, shared_strings_path, monkeypatch, max_workers):
+        """ワーカープロセスもディスク上の共有文字列表を参照して出力する"""
+        monkeypatch.setattr(xlsx_reader, "DISK_SHARED_STRINGS_MIN_SIZE", 0)
+        created = []
+        build = SharedStringTable.build.__func__
+
+        def record_build(cls, strings):
+            created.append(build(cls, strings))
+            return created[-1]
+
+        monkeypatch.setattr(SharedStringTable, "build", classmethod(record_build))
+
+        outputs = ExcelToCSVConverter().convert_all_sheets(
+            shared_strings_path,
+            shared_strings_path.with_name("out.csv"),
+            add_bom=False,
+            max_workers=max_workers,
+        )
+        assert outputs[0].read_bytes() == (
+            "名前, 前後に空白 \r\n田中,42\r\n,\r\n,太字部分\r\n".encode()
+        )
+        # 変換後は一時ファイルを削除する
+        assert len(created) == 1
+        assert not created[0].directory.exists()
+
+
+class TestSheetSelection:
+    """ExcelToCSVConverter のシート選択のテスト"""
+
+    def test_converts_requested_sheet(self, workbook_path):
+        """指定したシートだけを変換する"""
+        csv_path = workbook_path.with_suffix(".csv")
+        assert ExcelToCSVConverter().convert_to_csv(
+            workbook_path, csv_path, sheet_name="明細", add_bom=False
+        )
+        assert csv_path.read_bytes() == "品目,数量\r\nりんご,3\r\n".encode()
+
+    def test_missing_sheet_fails_before_loading(self, workbook_path, monkeypatch):
+        """存在しないシートはブックを読み込む前に失敗する"""
+        monkeypatch.setattr(excel_to_csv, "read_workbook_tables", None)
+        csv_path = workbook_path.with_suffix(".csv")
+
+        assert not ExcelToCSVConverter().convert_to_csv(
+            workbook_path, csv_path, sheet_name="存在しない"
+        )
+        assert not csv_path.exists()
+
+
+class TestAllSheets:
+    """ExcelToCSVConverter.convert_all_sheets のテスト"""
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_exports_every_sheet(self, workbook_path, max_workers):
+        """全ワークシートを <stem>_<シート名>.csv に出力する"""
+        rows = []
+        outputs = ExcelToCSVConverter().convert_all_sheets(
+            workbook_path,
+            workbook_path.with_name("out.csv"),
+            add_bom=False,
+            row_progress_callback=lambda current, total: rows.append(current),
+            max_workers=max_workers,
+        )
+
+        assert [path.name for path in outputs] == [
+            "out_売上.csv",
+            "out_明細.csv",
+            "out_作業用.csv",
+        ]
+        assert outputs[0].read_bytes() == "月,金額\r\n1月,100\r\n".encode()
+        assert outputs[1].read_bytes() == "品目,数量\r\nりんご,3\r\n".encode()
+        assert outputs[2].read_bytes() == b""
+        assert rows[-1] == 4
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_colliding_file_names(self, max_workers):
+        """使用できない文字の置き換えでファイル名が重なるシートは連番で区別する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "book.xlsx"
+            workbook = Workbook()
+            workbook.active.title = "A<B"
+            workbook.active.append(["1"])
+            for title in ["A_B", "a|b"]:
+                workbook.create_sheet(title).append([title])
+            workbook.save(path)
+
+            outputs = ExcelToCSVConverter().convert_all_sheets(
+                path, path.with_name("out.csv"), add_bom=False, max_workers=max_workers
+            )
+
+            assert [output.name for output in outputs] == [
+                "out_A_B.csv",
+                "out_A_B_2.csv",
+                "out_a_b_3.csv",
+            ]
+            assert [output.read_bytes() for output in outputs] == [
+                b"1\r\n",
+                b"A_B\r\n",
+                b"a|b\r\n",
+            ]
+
+    def test_failure_removes_outputs(self, workbook_path, monkeypatch):
+        """1シートでも失敗すれば出力をすべて削除する"""
+        write_sheet = ExcelToCSVConverter._write_sheet
+
+        def fail_on_second(self, excel_path, sheet, *args, **kwargs):
+            if sheet.name == "明細":
+                raise UnicodeEncodeError("cp932", "", 0, 1, "test")
+            return write_sheet(self, excel_path, sheet, *args, **kwargs)
+
+        monkeypatch.setattr(ExcelToCSVConverter, "_write_sheet", fail_on_second)
+        assert (
+            ExcelToCSVConverter().convert_all_sheets(
+                workbook_path, workbook_path.with_name("out.csv"), max_workers=1
+            )
+            == []
+        )
+        assert list(workbook_path.parent.glob("out_*.csv")) == []
+
+    @pytest.mark.skipif(
+        multiprocessing.get_start_method() != "fork",
+        reason="ワーカープロセスに差し替えた _write_sheet を引き継ぐためforkが必要",
+    )
+    def test_parallel_failure_stops_other_sheets(self, workbook_path, monkeypatch):
+        """並列変換で1シートが失敗すれば変換中の他のシートも中断する"""
+        write_sheet = ExcelToCSVConverter._write_sheet
+
+        def fail_or_wait(self, excel_path, sheet, *args, cancel_token=None, **kwargs):
+            if sheet.name == "明細":
+                raise UnicodeEncodeError("cp932", "", 0, 1, "test")
+            # 他のシートは中断されるまで変換中のまま
+            deadline = time.monotonic() + 10
+            while not cancel_token.cancelled and time.monotonic() < deadline:
+                time.sleep(0.01)
+            cancel_token.raise_if_cancelled()
+            return write_sheet(
+                self, excel_path, sheet, *args, cancel_token=cancel_token, **kwargs
+            )
+
+        monkeypatch.setattr(ExcelToCSVConverter, "_write_sheet", fail_or_wait)
+        start = time.perf_counter()
+        assert (
+            ExcelToCSVConverter().convert_all_sheets(
+                workbook_path, workbook_path.with_name("out.csv"), max_workers=3
+            )
+            == []
+        )
+        assert time.perf_counter() - start < 5
+        assert list(workbook_path.parent.glob("out_*.csv")) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,172 @@
+"""
+ストリーミングXLSXライターのテスト
+"""
+
+import datetime as dt
+from pathlib import Path
+import sys
+import tempfile
+
+from openpyxl import load_workbook
+import pandas as pd
+import pytest
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.converter import CSVConverter
+from src.converter.xlsx_writer import CellStyle, StreamingXlsxWriter
+
+
+class TestStreamingXlsxWriter:
+    """StreamingXlsxWriter のテスト"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """一時ディレクトリ"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_values_round_trip(self, temp_dir):
+        """各種の値が正しい型で読み戻せること"""
+        path = temp_dir / "values.xlsx"
+        with StreamingXlsxWriter(path) as writer:
+            writer.append_row(["文字列", "整数", "小数", "日時", "真偽", "欠損"])
+            writer.append_row(
+                ["a&b<c>", 42, 1.5, dt.datetime(2024, 1, 2, 3, 4, 5), True, None]
+            )
+            writer.append_row([" 前後空白 ", pd.NA, float("nan"), pd.NaT, False, ""])
+
+        ws = load_workbook(path).active
+        assert [c.value for c in ws[2]] == [
+            "a&b<c>",
+            42,
+            1.5,
+            dt.datetime(2024, 1, 2, 3, 4, 5),
+            True,
+            None,
+        ]
+        assert ws["A3"].value == " 前後空白 "
+        assert ws["B3"].value is None
+        assert ws["C3"].value is None
+        assert ws["E3"].value is False
+
+    def test_styles_freeze_and_filter(self, temp_dir):
+        """スタイル・ウィンドウ枠固定・オートフィルターの出力"""
+        path = temp_dir / "styled.xlsx"
+        with StreamingXlsxWriter(path) as writer:
+            header = writer.register_style(CellStyle(bold=True, fill_color="E0E0E0"))
+            # 同一スタイルは同じIDに集約される
+            assert writer.register_style(CellStyle(bold=True, fill_color="E0E0E0")) == (
+                header
+            )
+            writer.append_row(["名前", "年齢"], styles=header, height=41.25)
+            for i in range(10):
+                writer.append_row([f"ユーザー{i}", i])
+            writer.freeze_panes = "A2"
+            writer.auto_filter = True
+
+        ws = load_workbook(path).active
+        assert ws["A1"].font.b is True
+        assert ws["A1"].fill.fgColor.rgb.endswith("E0E0E0")
+        assert ws.row_dimensions[1].height == 41.25
+        assert ws.freeze_panes == "A2"
+        assert ws.auto_filter.ref == "A1:B11"
+        assert ws.max_row == 11
+
+    def test_table_output(self, temp_dir):
+        """テーブルスタイル指定時はExcelテーブルとして出力される"""
+        path = temp_dir / "table.xlsx"
+        with StreamingXlsxWriter(path) as writer:
+            writer.append_row(["名前", "年齢"])
+            for i in range(5):
+                writer.append_row([f"ユーザー{i}", i])
+            writer.auto_filter = True
+            writer.table_style = "TableStyleLight15"
+            writer.table_row_stripes = True
+
+        ws = load_workbook(path).active
+        table = ws.tables["Table1"]
+        assert table.ref == "A1:B6"
+        assert table.tableStyleInfo.name == "TableStyleLight15"
+        assert table.tableStyleInfo.showRowStripes is True
+        assert [c.name for c in table.tableColumns] == ["名前", "年齢"]
+        # テーブルのフィルターと重複するシートのオートフィルターは出力しない
+        assert ws.auto_filter.ref is None
+
+    def test_table_with_invalid_header_is_skipped(self, temp_dir):
+        """テーブル列名に使えないヘッダーではテーブルを出力しない"""
+        path = temp_dir / "duplicate.xlsx"
+        with StreamingXlsxWriter(path) as writer:
+            writer.append_row(["列", "列"])
+            writer.append_row([1, 2])
+            writer.table_style = "TableStyleLight1"
+
+        assert len(load_workbook(path).active.tables) == 0
+
+    def test_conditional_formatting(self, temp_dir):
+        """条件付き書式がデータ範囲に出力される"""
+        path = temp_dir / "conditional.xlsx"
+        with StreamingXlsxWriter(path) as writer:
+            writer.append_row(["a", "b", "c"])
+            for i in range(4):
+                writer.append_row([i, i, i])
+            writer.add_conditional_format("TRUE", CellStyle(border=True), first_row=2)
+            writer.add_conditional_format(
+                "MOD(ROW(),2)=0", CellStyle(fill_color="F5F5F5"), first_row=2
+            )
+
+        ws = load_workbook(path).active
+        (cf_range,) = list(ws.conditional_formatting)
+        assert str(cf_range.sqref) == "A2:C5"
+        rules = cf_range.rules
+        assert [rule.formula for rule in rules] == [["TRUE"], ["MOD(ROW(),2)=0"]]
+        assert rules[0].dxf.border.left.style == "thin"
+        assert rules[1].dxf.fill.bgColor.rgb.endswith("F5F5F5")
+
+    def test_discard_on_error(self, temp_dir):
+        """例外発生時は出力ファイルを作成しない"""
+        path = temp_dir / "broken.xlsx"
+        with pytest.raises(RuntimeError), StreamingXlsxWriter(path) as writer:
+            writer.append_row(["a"])
+            raise RuntimeError("中断")
+
+        assert not path.exists()
+
+
+class TestStreamingBackend:
+    """CSVConverter のストリーミング出力のテスト"""
+
+    def test_header_filter_and_freeze(self):
+        """ヘッダースタイル・オートフィルター・ウィンドウ枠固定の出力"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            temp_path = Path(tmpdir)
+            csv_path = temp_path / "input.csv"
+            pd.DataFrame(
+                {
+                    "名前": ["田中", "山田", "佐藤"],
+                    "年齢": ["25", "30", "35"],
+                    "入社日": ["2023-01-01", "2023-02-01", "2023-03-01"],
+                }
+            ).to_csv(csv_path, index=False, encoding="utf-8")
+
+            excel_path = temp_path / "output.xlsx"
+            assert CSVConverter().convert_to_excel(
+                csv_path,
+                excel_path,
+                style_options={"header_bold": True, "freeze_header": True},
+            )
+
+            ws = load_workbook(excel_path).active
+            assert [c.value for c in ws[1]] == ["名前", "年齢", "入社日"]
+            assert [c.value for c in ws[2]] == ["田中", 25, dt.datetime(2023, 1, 1)]
+            assert ws["A1"].font.b is True
+            assert ws.row_dimensions[1].height == 41.25
+            assert ws.freeze_panes == "A2"
+            assert ws.auto_filter.ref == "A1:C4"
+            assert ws["C2"].number_format == "YYYY/M/D"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])